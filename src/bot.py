@@ -5,7 +5,7 @@ import discord
 from aiohttp import AsyncResolver, ClientSession, TCPConnector
 from discord import (
     ApplicationContext, Cog, DiscordException, Embed, HTTPException, Forbidden, NotFound, Member,
-    User, Guild
+    User, Guild, Role
 )
 from discord.ext.commands import (
     Bot as DiscordBot, CommandNotFound, CommandOnCooldown, DefaultHelpCommand,
@@ -15,7 +15,10 @@ from sqlalchemy.exc import NoResultFound
 
 from src import trace_config
 from src.core import constants, settings
-from src.metrics import completed_commands, errored_commands, received_commands
+from src.helpers.htb_api import htb_api
+from src.helpers.schedule import timer_service
+from src.helpers.verification_queue import verification_queue
+from src.metrics import command_latency, completed_commands, errored_commands, received_commands
 
 logger = logging.getLogger(__name__)
 
@@ -58,6 +61,10 @@ class Bot(DiscordBot):
         except Exception as e:
             print(f"Failed to load ScheduledTasks cog: {e}")
 
+    async def on_guild_role_delete(self, role: Role) -> None:
+        """Stop handing out a deleted role from the resolved roles."""
+        settings.role_resolver.forget_guild(role.guild.id)
+
     async def on_application_command(self, ctx: ApplicationContext) -> None:
         """A global handler cog."""
         logger.debug(f"Command '{ctx.command}' received.")
@@ -101,6 +108,9 @@ class Bot(DiscordBot):
         """A global cog handler."""
         logger.debug(f"Command '{ctx.command}' completed.")
         completed_commands.labels(ctx.command.name).inc()
+        # Measured from the creation of the interaction, so it includes gateway delivery as seen by the user.
+        latency = (discord.utils.utcnow() - ctx.interaction.created_at).total_seconds()
+        command_latency.labels(ctx.command.name).observe(latency)
 
     async def on_error(self, event: any, *args, **kwargs) -> None:
         """Don't ignore the error, causing Sentry to capture it."""
@@ -145,6 +155,18 @@ class Bot(DiscordBot):
             logger.debug("Closing the HTTP session")
             await self.http_session.close()
 
+        await verification_queue.stop()
+        await htb_api.close()
+        await timer_service.stop()
+
+    def get_cached_member(self, id_: int) -> Member | None:
+        """Get a member of any of the configured guilds from the cache, without calling the Discord API."""
+        for guild_id in settings.guild_ids:
+            guild = self.get_guild(guild_id)
+            if guild and (member := guild.get_member(id_)):
+                return member
+        return None
+
     async def get_member_or_user(self, guild: Guild, id_: int) -> Member | User | None:
         """Get a member or a user from the guild or discord."""
         try:
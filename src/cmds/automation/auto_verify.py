@@ -1,13 +1,26 @@
+import asyncio
 import logging
+import time
+from datetime import timedelta
 
 from discord import Member, Message, User
-from discord.ext import commands
-from sqlalchemy import select
+from discord.ext import commands, tasks
 
 from src.bot import Bot
+from src.core import constants, settings
 from src.database.models import HtbDiscordLink
-from src.database.session import AsyncSessionLocal
+from src.helpers.circuit_breaker import CircuitOpenError
+from src.helpers.htb_api import IDENTIFIER_ENDPOINT, htb_api
+from src.helpers.links import (
+    get_htb_discord_link, get_stale_htb_discord_links, is_recently_verified, linked_users, load_linked_users,
+    mark_htb_discord_link_verified
+)
+from src.helpers.singleflight import SingleFlight
+from src.helpers.throttle import JoinFloodDetector, ListenerCooldown
+from src.helpers.tracing import stage, trace_verification
 from src.helpers.verification import get_user_details, process_identification
+from src.helpers.verification_queue import Priority, verification_queue
+from src.metrics import join_flood_deferred
 
 logger = logging.getLogger(__name__)
 
@@ -17,22 +30,61 @@ class MessageHandler(commands.Cog):
 
     def __init__(self, bot: Bot):
         self.bot = bot
+        # Listeners ignore `commands.cooldown`, so reverifications are rate limited per user here instead.
+        self.message_cooldown = ListenerCooldown(
+            "on_message", rate=1, per=settings.REVERIFY_MESSAGE_COOLDOWN, max_size=settings.LISTENER_COOLDOWN_MAX_SIZE
+        )
+        self.join_cooldown = ListenerCooldown(
+            "on_member_join", rate=1, per=settings.REVERIFY_JOIN_COOLDOWN, max_size=settings.LISTENER_COOLDOWN_MAX_SIZE
+        )
+        # Concurrent re-verifications of the same member, e.g. a message burst, share a single run.
+        self.reverification_flights = SingleFlight("reverification")
+        self.join_flood = JoinFloodDetector(threshold=settings.JOIN_FLOOD_THRESHOLD, window=settings.JOIN_FLOOD_WINDOW)
+        # IDs of members that joined during a flood, in join order, waiting to be re-verified by the drain.
+        self.deferred_joins: dict[int, None] = {}
+        self._drain_task: asyncio.Task | None = None
+        self.load_linked_users_index.start()
+        self.refresh_stale_links.start()
 
-    async def process_reverification(self, member: Member | User) -> None:
-        """Re-verifation process for a member."""
-        async with AsyncSessionLocal() as session:
-            stmt = (
-                select(HtbDiscordLink)
-                .where(HtbDiscordLink.discord_user_id == member.id)
-                .order_by(HtbDiscordLink.id)
-                .limit(1)
-            )
-            result = await session.scalars(stmt)
-            htb_discord_link: HtbDiscordLink = result.first()
+    def cog_unload(self) -> None:
+        """Stop the background tasks when the cog is unloaded."""
+        self.load_linked_users_index.cancel()
+        self.refresh_stale_links.cancel()
+        if self._drain_task is not None:
+            self._drain_task.cancel()
+
+    @staticmethod
+    def is_possibly_linked(user: Member | User) -> bool:
+        """Whether a user may have an HTB link. Answered from memory, and always True until the index is loaded."""
+        return not linked_users.loaded or user.id in linked_users
+
+    @tasks.loop(count=1)
+    async def load_linked_users_index(self) -> None:
+        """Load the index of linked users once, so unlinked message authors are skipped without touching the DB."""
+        await load_linked_users()
+
+    async def process_reverification(self, member: Member | User, force: bool = False) -> None:
+        """
+        Re-verifation process for a member.
+
+        Members verified within the freshness window are skipped, unless `force` is set.
+        """
+        with trace_verification("reverification", member.id):
+            await self.reverification_flights.do(member.id, lambda: self._process_reverification(member, force))
+
+    async def _process_reverification(self, member: Member | User, force: bool) -> None:
+        with stage("link_lookup") as current:
+            htb_discord_link: HtbDiscordLink = await get_htb_discord_link(member.id)
+            if not htb_discord_link:
+                current.outcome = "not_found"
 
         if not htb_discord_link:
             raise VerificationError(f"HTB Discord link for user {member.name} with ID {member}")
 
+        if not force and is_recently_verified(htb_discord_link):
+            logger.debug(f"Member {member.name} ({member.id}) was verified recently. Skipping re-verify.")
+            return
+
         member_token: str = htb_discord_link.account_identifier
 
         if member_token is None:
@@ -40,32 +92,167 @@ class MessageHandler(commands.Cog):
 
         logger.debug(f"Processing re-verify of member {member.name} ({member.id}).")
         htb_details = await get_user_details(member_token)
+        # Record the attempt even if the lookup failed, so a regenerated identifier is not retried on every message.
+        with stage("mark_verified"):
+            await mark_htb_discord_link_verified(htb_discord_link)
         if htb_details is None:
             raise VerificationError(f"Retrieving user details for user {member.name} with ID {member.id} failed")
 
         await process_identification(htb_details, user=member, bot=self.bot)
 
+    def queue_reverification(
+        self, member: Member | User, priority: Priority, force: bool = False, link: HtbDiscordLink = None
+    ) -> asyncio.Future:
+        """
+        Queue a re-verification of a member on the verification workers, instead of running it inline.
+
+        If `link` is given, it is marked as verified even when the re-verification fails, so it leaves the stale set.
+        """
+        return verification_queue.submit(member.id, lambda: self._reverify(member, priority, force, link), priority)
+
+    async def _reverify(
+        self, member: Member | User, priority: Priority, force: bool, link: HtbDiscordLink | None
+    ) -> None:
+        try:
+            await self.process_reverification(member, force=force)
+        except CircuitOpenError as exc:
+            # Unforced re-verifications are retried on the member's next message, forced ones are deferred here.
+            logger.debug(f"HTB API unavailable, skipping re-verification of member {member.id}.", exc_info=exc)
+            if force:
+                asyncio.get_running_loop().call_later(
+                    exc.retry_after, self.queue_reverification, member, priority, force, link
+                )
+        except VerificationError as exc:
+            logger.debug(f"HTB Discord link for user {member.name} with ID {member.id} not found", exc_info=exc)
+            if link is not None:
+                await mark_htb_discord_link_verified(link)
+
+    @tasks.loop(seconds=settings.STALE_REFRESH_INTERVAL)
+    async def refresh_stale_links(self) -> None:
+        """Re-verify the least recently verified members at a steady rate."""
+        if htb_api.retry_after(IDENTIFIER_ENDPOINT):
+            logger.debug("HTB API unavailable, skipping stale link refresh.")
+            return
+
+        links = await get_stale_htb_discord_links(settings.STALE_REFRESH_BATCH_SIZE)
+        logger.debug(f"Refreshing {len(links)} stale HTB Discord links.")
+
+        for link in links:
+            member = self.bot.get_cached_member(link.discord_user_id_as_int)
+            if member is None:
+                # Members that left are only re-verified when they join again, so push them to the back of the line.
+                await mark_htb_discord_link_verified(link)
+                continue
+
+            self.queue_reverification(member, Priority.LOW, force=True, link=link)
+
+    @refresh_stale_links.before_loop
+    async def before_refresh_stale_links(self) -> None:
+        """Wait for the member cache to be populated before refreshing links."""
+        await self.bot.wait_until_ready()
+
+    def defer_join(self, member: Member) -> None:
+        """Defer the re-verification of a member that joined during a flood to the rate-limited drain."""
+        self.deferred_joins[member.id] = None
+        join_flood_deferred.set(len(self.deferred_joins))
+        self._start_drain()
+
+    def _start_drain(self) -> None:
+        if self._drain_task is None or self._drain_task.done():
+            self._drain_task = asyncio.create_task(self.drain_deferred_joins())
+            self._drain_task.add_done_callback(self._on_drain_done)
+
+    def _on_drain_done(self, task: asyncio.Task) -> None:
+        if task.cancelled() or task.exception() is None:
+            return
+
+        logger.error("Join flood drain failed.", exc_info=task.exception())
+        # Deferred members are popped before they are processed, so a restarted drain always makes progress.
+        if self.deferred_joins:
+            self._start_drain()
+
+    async def drain_deferred_joins(self) -> None:
+        """
+        Re-verify the members deferred during a join flood at `JOIN_FLOOD_DRAIN_RATE` per second.
+
+        The rate is capped at the member edit budget of a guild, as drained members usually need their roles set:
+        draining faster would only queue edits in the rate limiter, and hold up verification workers with them.
+
+        The drain runs until the flood is over and every deferred member was queued, then posts a single summary to the
+        devlog.
+        """
+        started_at = time.monotonic()
+        rate = min(settings.JOIN_FLOOD_DRAIN_RATE, settings.MEMBER_EDIT_RATE / settings.MEMBER_EDIT_PER)
+        interval = 1 / rate
+        joins = drained = 0
+        logger.warning("Join flood detected, deferring the re-verification of joining members.")
+
+        while self.deferred_joins or self.join_flood.is_flooding():
+            joins = max(joins, self.join_flood.joins)
+            if not self.deferred_joins:
+                await asyncio.sleep(interval)
+                continue
+
+            if retry_after := htb_api.retry_after(IDENTIFIER_ENDPOINT):
+                await asyncio.sleep(retry_after)
+                continue
+
+            member_id = next(iter(self.deferred_joins))
+            del self.deferred_joins[member_id]
+            join_flood_deferred.set(len(self.deferred_joins))
+            # Members that already left are re-verified when they join again.
+            if member := self.bot.get_cached_member(member_id):
+                self.queue_reverification(member, Priority.LOW, force=True)
+                drained += 1
+            await asyncio.sleep(interval)
+
+        duration = timedelta(seconds=round(time.monotonic() - started_at))
+        await self.bot.send_log(
+            f"Join flood over after {duration}: {joins} members joined, {drained} linked members were "
+            f"re-verified at {rate:g} per second.",
+            colour=constants.colours.soft_orange,
+        )
+
     @commands.Cog.listener()
-    @commands.cooldown(1, 60, commands.BucketType.user)
     async def on_message(self, ctx: Message) -> None:
         """Run commands in the context of a message."""
         # Return if the message was sent by the bot to avoid recursion.
         if ctx.author.bot:
             return
 
-        try:
-            await self.process_reverification(ctx.author)
-        except VerificationError as exc:
-            logger.debug(f"HTB Discord link for user {ctx.author.name} with ID {ctx.author.id} not found", exc_info=exc)
+        if not settings.REVERIFY_ON_MESSAGE:
+            return
+
+        if not self.is_possibly_linked(ctx.author):
+            return
+
+        # While HTB is unavailable, messages are skipped without spending the author's cooldown.
+        if htb_api.retry_after(IDENTIFIER_ENDPOINT):
+            return
+
+        if not self.message_cooldown.is_allowed(ctx.author.id):
+            return
+
+        self.queue_reverification(ctx.author, Priority.LOW)
 
     @commands.Cog.listener()
-    @commands.cooldown(1, 3600, commands.BucketType.user)
     async def on_member_join(self, member: Member) -> None:
         """Run commands in the context of a member join."""
-        try:
-            await self.process_reverification(member)
-        except VerificationError as exc:
-            logger.debug(f"HTB Discord link for user {member.name} with ID {member.id} not found", exc_info=exc)
+        # Every join counts towards the flood, linked or not, as raids are mostly new accounts.
+        flooding = self.join_flood.record()
+
+        if not self.is_possibly_linked(member):
+            return
+
+        if not self.join_cooldown.is_allowed(member.id):
+            return
+
+        if flooding:
+            self.defer_join(member)
+            return
+
+        # Roles are lost when leaving the guild, so a rejoining member is re-verified regardless of freshness.
+        self.queue_reverification(member, Priority.NORMAL, force=True)
 
 
 class VerificationError(Exception):
@@ -13,7 +13,7 @@ from src.database.models import Ban, Infraction
 from src.database.session import AsyncSessionLocal
 from src.helpers.ban import add_infraction, ban_member, unban_member
 from src.helpers.duration import validate_duration
-from src.helpers.schedule import schedule
+from src.helpers.schedule import job_registry
 
 logger = logging.getLogger(__name__)
 
@@ -101,8 +101,8 @@ class BanCog(commands.Cog):
         if not member:
             return await ctx.respond(f"User {ban.user_id} not found.")
 
-        self.bot.loop.create_task(
-            schedule(unban_member(ctx.guild, member), run_at=datetime.fromtimestamp(ban.unban_time))
+        job_registry.schedule(
+            "unban", ban.id, datetime.fromtimestamp(ban.unban_time), lambda: unban_member(ctx.guild, member)
         )
 
         return await ctx.respond("Ban approval has been recorded.")
@@ -136,7 +136,10 @@ class BanCog(commands.Cog):
         if not member:
             return await ctx.respond(f"User {ban.user_id} not found in guild.")
 
-        self.bot.loop.create_task(schedule(unban_member(ctx.guild, member), run_at=new_unban_at))
+        # The ban may already have a job for its previous end.
+        job_registry.schedule(
+            "unban", ban.id, new_unban_at, lambda: unban_member(ctx.guild, member), replace=True
+        )
         return await ctx.respond(
             f"Ban duration updated and approved. "
             f"The member will be unbanned on {new_unban_at.strftime('%B %d, %Y')} UTC."
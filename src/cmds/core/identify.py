@@ -1,4 +1,5 @@
 import logging
+from math import ceil
 from typing import Sequence
 
 import discord
@@ -11,7 +12,10 @@ from src.bot import Bot
 from src.core import settings
 from src.database.models import HtbDiscordLink
 from src.database.session import AsyncSessionLocal
-from src.helpers.verification import get_user_details, process_identification
+from src.helpers.circuit_breaker import CircuitOpenError
+from src.helpers.links import invalidate_htb_discord_link, linked_users, mark_htb_discord_link_verified
+from src.helpers.verification import get_user_details, invalidate_user_details, process_identification
+from src.helpers.verification_queue import Priority, verification_queue
 
 logger = logging.getLogger(__name__)
 
@@ -37,7 +41,16 @@ class IdentifyCog(commands.Cog):
             )
 
         await ctx.respond("Identification initiated, please wait...", ephemeral=True)
-        htb_user_details = await get_user_details(account_identifier)
+        # Always identify against fresh details from HTB; the result repopulates the cache for re-verification.
+        invalidate_user_details(account_identifier)
+        try:
+            htb_user_details = await get_user_details(account_identifier)
+        except CircuitOpenError as exc:
+            logger.debug("HTB API unavailable during identification.", exc_info=exc)
+            return await ctx.respond(
+                f"Hack The Box cannot be reached right now, please try again in {ceil(exc.retry_after)} seconds.",
+                ephemeral=True
+            )
         if htb_user_details is None:
             embed = discord.Embed(title="Error: Invalid account identifier.", color=0xFF0000)
             return await ctx.respond(embed=embed, ephemeral=True)
@@ -134,8 +147,17 @@ class IdentifyCog(commands.Cog):
         async with AsyncSessionLocal() as session:
             session.add(htb_discord_link)
             await session.commit()
-
-        await process_identification(htb_user_details, user=member, bot=self.bot)
+        invalidate_htb_discord_link(member.id)
+        linked_users.add(member.id)
+
+        # Identifications jump ahead of passive re-verifications on the shared verification workers. They are keyed
+        # by HTB account too, so identifying with another account is not answered by a queued job for the first one.
+        await verification_queue.submit(
+            (member.id, json_htb_user_id),
+            lambda: process_identification(htb_user_details, user=member, bot=self.bot),
+            Priority.HIGH,
+        )
+        await mark_htb_discord_link_verified(htb_discord_link)
 
         return await ctx.respond(
             f"Your Discord user has been successfully identified as HTB user {json_htb_user_id}.", ephemeral=True
@@ -12,7 +12,8 @@ from src.database.session import AsyncSessionLocal
 from src.helpers.ban import unmute_member
 from src.helpers.checks import member_is_staff
 from src.helpers.duration import validate_duration
-from src.helpers.schedule import schedule
+from src.helpers.rate_limit import add_roles
+from src.helpers.schedule import job_registry
 
 
 class MuteCog(commands.Cog):
@@ -55,9 +56,9 @@ class MuteCog(commands.Cog):
 
         if isinstance(member, Member):
             role = ctx.guild.get_role(settings.roles.MUTED)
-            await member.add_roles(role)
+            await add_roles(member, role)
         timestamp=datetime.fromtimestamp(dur)
-        self.bot.loop.create_task(schedule(unmute_member(ctx.guild, member), run_at=timestamp))
+        job_registry.schedule("unmute", mute_.id, timestamp, lambda: unmute_member(ctx.guild, member))
         await member.timeout(timestamp, reason=reason if reason else "Time to shush, innit?")
         try:
             await member.send(f"You have been muted for {duration}. Reason:\n>>> {reason}")
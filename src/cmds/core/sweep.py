@@ -0,0 +1,91 @@
+import logging
+
+from discord import ApplicationContext, Interaction, SlashCommandGroup, WebhookMessage
+from discord.ext import commands, tasks
+from discord.ext.commands import has_any_role
+
+from src.bot import Bot
+from src.core import settings
+from src.database.models import ReverificationSweep
+from src.helpers.sweep import ReverificationSweeper, SweepAlreadyRunningError
+
+logger = logging.getLogger(__name__)
+
+
+class SweepCog(commands.Cog):
+    """Re-verify every linked member, e.g. after a season rollover."""
+
+    def __init__(self, bot: Bot):
+        self.bot = bot
+        self.sweeper = ReverificationSweeper(bot)
+        self.resume_sweep.start()
+
+    def cog_unload(self) -> None:
+        """Suspend the running sweep, so it is resumed when the cog is loaded again."""
+        self.resume_sweep.cancel()
+        self.sweeper.suspend()
+
+    @tasks.loop(count=1)
+    async def resume_sweep(self) -> None:
+        """Resume a sweep that was interrupted by a restart."""
+        await self.sweeper.resume()
+
+    @resume_sweep.before_loop
+    async def before_resume_sweep(self) -> None:
+        """Wait for the member cache to be populated before sweeping."""
+        await self.bot.wait_until_ready()
+
+    sweep = SlashCommandGroup("sweep", "Re-verify the roles of every linked member.", guild_ids=settings.guild_ids)
+
+    @sweep.command(description="Start re-verifying every linked member.")
+    @has_any_role(*settings.role_groups.get("ALL_ADMINS"))
+    async def start(self, ctx: ApplicationContext) -> Interaction | WebhookMessage:
+        """Start re-verifying every linked member."""
+        try:
+            sweep = await self.sweeper.start(ctx.user.id)
+        except SweepAlreadyRunningError as exc:
+            return await ctx.respond(
+                f"Sweep #{exc.sweep.id} is already running: {self._describe_progress(exc.sweep)}"
+            )
+
+        return await ctx.respond(f"Started sweep #{sweep.id} over {sweep.total} links. ETA {self.sweeper.eta()}.")
+
+    @sweep.command(description="Show the progress of the current or last sweep.")
+    @has_any_role(*settings.role_groups.get("ALL_ADMINS"))
+    async def status(self, ctx: ApplicationContext) -> Interaction | WebhookMessage:
+        """Show the progress of the current or last sweep."""
+        sweep = await self.sweeper.latest()
+        if sweep is None:
+            return await ctx.respond("No sweep has been run yet.")
+
+        if self.sweeper.running:
+            return await ctx.respond(
+                f"Sweep #{sweep.id} running: {self._describe_progress(sweep)} ETA {self.sweeper.eta()}."
+            )
+
+        state = "stopped" if sweep.cancelled else "finished"
+        if sweep.error:
+            state = f"failed ({sweep.error})"
+        elif sweep.finished_at is None:
+            state = "interrupted, and will resume on the next start"
+        return await ctx.respond(f"Sweep #{sweep.id} {state}: {self._describe_progress(sweep)}")
+
+    @sweep.command(description="Stop the running sweep.")
+    @has_any_role(*settings.role_groups.get("ALL_ADMINS"))
+    async def stop(self, ctx: ApplicationContext) -> Interaction | WebhookMessage:
+        """Stop the running sweep."""
+        sweep = await self.sweeper.stop()
+        if sweep is None:
+            return await ctx.respond("No sweep is running.")
+
+        return await ctx.respond(f"Stopped sweep #{sweep.id}: {self._describe_progress(sweep)}")
+
+    @staticmethod
+    def _describe_progress(sweep: ReverificationSweep) -> str:
+        percentage = sweep.processed / sweep.total * 100 if sweep.total else 100
+        return f"{sweep.processed}/{sweep.total} links processed ({percentage:.1f}%), {sweep.failed} failed."
+
+
+def setup(bot: Bot) -> None:
+    """Load the `SweepCog` cog."""
+    bot.add_cog(SweepCog(bot))
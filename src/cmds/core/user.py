@@ -18,6 +18,8 @@ from src.database.models import HtbDiscordLink
 from src.database.session import AsyncSessionLocal
 from src.helpers.checks import member_is_staff
 from src.helpers.ban import add_infraction
+from src.helpers.links import invalidate_htb_discord_link, linked_users
+from src.helpers.rate_limit import add_roles, edit_member, remove_roles
 
 logger = logging.getLogger(__name__)
 
@@ -44,7 +46,7 @@ class UserCog(commands.Cog):
         new_name = random.choice(self._get_baby_names()) + " McVerify"
 
         try:
-            await member.edit(nick=new_name)
+            await edit_member(member, nick=new_name)
         except Forbidden:
             return await ctx.respond(f"Cannot rename {member.mention} ({member.id}). Am I even allowed to?")
 
@@ -133,7 +135,7 @@ class UserCog(commands.Cog):
 
         if role_id:
             guild_role = ctx.guild.get_role(role_id)
-            await ctx.user.add_roles(guild_role)
+            await add_roles(ctx.user, guild_role)
             return await ctx.respond(f"Welcome to {guild_role.name}!", ephemeral=True)
 
     @slash_command(guild_ids=settings.guild_ids, description="Removes the vanity role from your user.")
@@ -149,7 +151,7 @@ class UserCog(commands.Cog):
             return await ctx.respond(exc, ephemeral=True)
 
         guild_role = ctx.guild.get_role(role_id)
-        await ctx.user.remove_roles(guild_role)
+        await remove_roles(ctx.user, guild_role)
         return await ctx.respond(f"You have left {guild_role.name}.")
 
     @slash_command(
@@ -178,6 +180,11 @@ class UserCog(commands.Cog):
                 await session.delete(link)
             await session.commit()
 
+        for link in htb_discord_links:
+            invalidate_htb_discord_link(link.discord_user_id_as_int)
+        # Links matched by HTB ID may belong to other users with further links, so only this member is dropped.
+        linked_users.discard(member.id)
+
         return await ctx.respond(f"All tokens related to Discord or HTB ID '{member.id}' have been deleted.")
 
     @slash_command(guild_ids=settings.guild_ids, description="Show the associated HTB user.")
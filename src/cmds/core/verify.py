@@ -1,14 +1,25 @@
+import asyncio
+import io
 import logging
+from collections import Counter
+from math import ceil
 
 import discord
-from discord import ApplicationContext, Interaction, WebhookMessage, slash_command
+from aiohttp import ClientError
+from discord import ApplicationContext, Attachment, Interaction, WebhookMessage, slash_command
+from discord.commands import Option
 from discord.errors import Forbidden, HTTPException
 from discord.ext import commands
-from discord.ext.commands import cooldown
+from discord.ext.commands import cooldown, has_any_role
 
 from src.bot import Bot
 from src.core import settings
-from src.helpers.verification import process_certification
+from src.helpers.certificates import (
+    certification_report, parse_certification_csv, process_certification, verify_certifications
+)
+from src.helpers.circuit_breaker import CircuitOpenError
+from src.helpers.rate_limit import add_roles
+
 logger = logging.getLogger(__name__)
 
 
@@ -23,20 +34,57 @@ class VerifyCog(commands.Cog):
         description="Verify your HTB Certifications!"
     )
     @cooldown(1, 60, commands.BucketType.user)
-    async def verifycertification(self, ctx: ApplicationContext, certid: str, fullname: str) -> Interaction | WebhookMessage:
+    async def verifycertification(
+        self, ctx: ApplicationContext, certid: str, fullname: str
+    ) -> Interaction | WebhookMessage:
+        """Verify your HTB Certifications."""
         if not certid or not fullname:
             await ctx.respond("You must supply a cert id!", ephemeral=True)
             return
         if not certid.startswith("HTBCERT-"):
             await ctx.respond("CertID must start with HTBCERT-", ephemeral=True)
             return
-        cert = await process_certification(certid, fullname)
+        try:
+            cert = await process_certification(certid, fullname)
+        except CircuitOpenError as exc:
+            logger.debug("HTB API unavailable during certification verification.", exc_info=exc)
+            return await ctx.respond(
+                f"Hack The Box cannot be reached right now, please try again in {ceil(exc.retry_after)} seconds.",
+                ephemeral=True
+            )
+        except (ClientError, asyncio.TimeoutError) as exc:
+            logger.warning(f"Could not look up certificate {certid}.", exc_info=exc)
+            return await ctx.respond(
+                "Hack The Box could not be reached, please try again in a minute.", ephemeral=True
+            )
         if cert:
-            to_add = settings.get_cert(cert)
-            await ctx.author.add_roles(ctx.guild.get_role(to_add))
+            to_add = settings.role_resolver.cert.get(cert)
+            await add_roles(ctx.author, settings.role_resolver.resolve(ctx.guild, to_add))
             await ctx.respond(f"Added {cert}!", ephemeral=True)
         else:
             await ctx.respond("Unable to find certification with provided details", ephemeral=True)
+
+    @slash_command(
+        guild_ids=settings.guild_ids,
+        description="Verify the HTB Certifications of many members from a CSV of discord_id,cert_id,full_name rows."
+    )
+    @has_any_role(*settings.role_groups.get("ALL_ADMINS"), *settings.role_groups.get("ALL_HTB_STAFF"))
+    async def bulkverifycertification(
+        self, ctx: ApplicationContext, csv_file: Option(Attachment, "A CSV of discord_id,cert_id,full_name rows")
+    ) -> Interaction | WebhookMessage:
+        """Verify the HTB Certifications of many members from a CSV."""
+        try:
+            rows = parse_certification_csv(await csv_file.read())
+        except ValueError as exc:
+            return await ctx.respond(f"Could not read the CSV: {exc}", ephemeral=True)
+
+        await ctx.defer()
+        results = await verify_certifications(ctx.guild, rows, concurrency=settings.CERTIFICATE_BULK_CONCURRENCY)
+
+        summary = ", ".join(f"{count} {status}" for status, count in Counter(r.status for r in results).items())
+        report = discord.File(io.BytesIO(certification_report(results)), filename="certifications.csv")
+        return await ctx.respond(f"Processed {len(results)} certificates: {summary or 'nothing to do'}.", file=report)
+
     @slash_command(
         guild_ids=settings.guild_ids,
         description="Receive instructions in a DM on how to identify yourself with your HTB account."
@@ -1,9 +1,11 @@
 import os
 import re
 from pathlib import Path
-from typing import Any, Optional
+from types import MappingProxyType
+from typing import Any, Iterable, Optional
 
 import toml
+from discord import Guild, Role
 from pydantic import BaseSettings, validator
 
 
@@ -157,6 +159,107 @@ class Roles(BaseSettings):
         env_prefix = "ROLE_"
 
 
+class RoleResolver:
+    """
+    Lookup tables from HTB ranks, season tiers and certifications to role IDs, built once when the settings load.
+
+    Tables are read-only mappings and role groups are frozensets, so membership checks in the verification path are
+    constant time and nothing is rebuilt per call. Role objects are resolved once per guild and reused until the
+    guild's roles change, see `forget_guild`.
+    """
+
+    RANKS = ("Omniscient", "Guru", "Elite Hacker", "Pro Hacker", "Hacker", "Script Kiddie", "Noob")
+    SEASON_TIERS = ("Holo", "Platinum", "Ruby", "Silver", "Bronze")
+
+    def __init__(
+        self, roles: Roles, academy_certificates: AcademyCertificates, role_groups: dict[str, list[int | str]]
+    ):
+        self.post_or_rank = MappingProxyType({
+            "1": roles.RANK_ONE,
+            "10": roles.RANK_TEN,
+            "Omniscient": roles.OMNISCIENT,
+            "Guru": roles.GURU,
+            "Elite Hacker": roles.ELITE_HACKER,
+            "Pro Hacker": roles.PRO_HACKER,
+            "Hacker": roles.HACKER,
+            "Script Kiddie": roles.SCRIPT_KIDDIE,
+            "Noob": roles.NOOB,
+            "vip": roles.VIP,
+            "dedivip": roles.VIP_PLUS,
+            "Challenge Creator": roles.CHALLENGE_CREATOR,
+            "Box Creator": roles.BOX_CREATOR,
+        })
+        self.season = MappingProxyType({
+            "Holo": roles.SEASON_HOLO,
+            "Platinum": roles.SEASON_PLATINUM,
+            "Ruby": roles.SEASON_RUBY,
+            "Silver": roles.SEASON_SILVER,
+            "Bronze": roles.SEASON_BRONZE,
+        })
+        self.cert = MappingProxyType({
+            "CPTS": roles.ACADEMY_CPTS,
+            "CBBH": roles.ACADEMY_CBBH,
+            "CDSA": roles.ACADEMY_CDSA,
+            "CWEE": roles.ACADEMY_CWEE,
+        })
+        self.academy_cert = MappingProxyType({
+            academy_certificates.CERTIFIED_BUG_BOUNTY_HUNTER: roles.ACADEMY_CBBH,
+            academy_certificates.CERTIFIED_PENETRATION_TESTING_SPECIALIST: roles.ACADEMY_CPTS,
+            academy_certificates.CERTIFIED_DEFENSIVE_SECURITY_ANALYST: roles.ACADEMY_CDSA,
+            academy_certificates.CERTIFIED_WEB_EXPLOITATION_EXPERT: roles.ACADEMY_CWEE,
+        })
+        self.groups = MappingProxyType({name: frozenset(role_ids) for name, role_ids in role_groups.items()})
+
+        self.season_tier_by_role_id = MappingProxyType({role_id: tier for tier, role_id in self.season.items()})
+        self.rank_role_ids = frozenset(self.post_or_rank[rank] for rank in self.RANKS)
+        self.season_role_ids = frozenset(self.season.values())
+        self.academy_cert_role_ids = frozenset(self.academy_cert.values())
+        # Roles owned by the HTB identification, i.e. removed when no longer earned.
+        self.identification_role_ids = self.groups.get("ALL_RANKS", frozenset()) | self.groups.get(
+            "ALL_POSITIONS", frozenset()
+        )
+
+        self._guild_roles: dict[int, tuple[Guild, dict[int, Role]]] = {}
+
+    def hof_role_id(self, hof_position: int | str) -> int | None:
+        """The ID of the Hall of Fame role for a position, or None if the position has no role."""
+        if hof_position == "unranked":
+            return None
+        position = int(hof_position)
+        if position == 1:
+            return self.post_or_rank["1"]
+        if position <= 10:
+            return self.post_or_rank["10"]
+        return None
+
+    def resolve(self, guild: Guild, role_id: int | None) -> Role | None:
+        """Get a role of a guild, resolving it only on the first call."""
+        if role_id is None:
+            return None
+
+        cached = self._guild_roles.get(guild.id)
+        # A guild that was re-synced (e.g. after an outage) is a new object holding new roles.
+        if cached is None or cached[0] is not guild:
+            cached = self._guild_roles[guild.id] = (guild, {})
+
+        roles = cached[1]
+        role = roles.get(role_id)
+        if role is None:
+            # Missing roles are not remembered, in case they only show up once the guild is fully loaded.
+            role = guild.get_role(role_id)
+            if role is not None:
+                roles[role_id] = role
+        return role
+
+    def resolve_many(self, guild: Guild, role_ids: Iterable[int | None]) -> list[Role]:
+        """Get the roles of a guild that exist, out of `role_ids`."""
+        return [role for role_id in role_ids if (role := self.resolve(guild, role_id)) is not None]
+
+    def forget_guild(self, guild_id: int) -> None:
+        """Drop the resolved roles of a guild. Must be called when its roles are created or deleted."""
+        self._guild_roles.pop(guild_id, None)
+
+
 class Global(BaseSettings):
     """The app settings."""
 
@@ -172,6 +275,7 @@ class Global(BaseSettings):
 
     roles_to_join: dict[str, tuple[int | str, str]] = {}
     role_groups: dict[str, list[int | str]] = {}
+    role_resolver: RoleResolver = None
 
     guild_ids: list[int]
     dev_guild_ids: list[int] = []
@@ -184,6 +288,67 @@ class Global(BaseSettings):
     API_URL: str = f"{HTB_URL}/api"
     API_V4_URL: str = f"{API_URL}/v4"
     HTB_API_SECRET: str | None = None
+    HTB_API_POOL_SIZE: int = 20
+    HTB_API_KEEPALIVE: int = 30
+    HTB_API_TIMEOUT: int = 10
+    HTB_API_RETRIES: int = 2
+    HTB_API_RETRY_BACKOFF: float = 0.5
+    HTB_API_BREAKER_FAILURE_RATE: float = 0.5
+    HTB_API_BREAKER_WINDOW: int = 20
+    HTB_API_BREAKER_MIN_CALLS: int = 10
+    HTB_API_BREAKER_RESET_TIMEOUT: float = 5
+    HTB_API_BREAKER_MAX_RESET_TIMEOUT: float = 300
+    HTB_SEASON_RANK_TIMEOUT: float = 5
+    HTB_BAN_CHECK_TIMEOUT: float = 5
+    VERIFICATION_WORKERS: int = 4
+    # Fraction of verifications whose stage timings are written to the debug log
+    VERIFICATION_TRACE_SAMPLE_RATE: float = 0.01
+    CERTIFICATE_BULK_CONCURRENCY: int = 5
+    # Expired bans and mutes lifted on Discord at the same time
+    EXPIRY_CONCURRENCY: int = 5
+    # Member edits and role changes sent per guild, kept below Discord's own limits
+    MEMBER_EDIT_RATE: int = 8
+    MEMBER_EDIT_PER: float = 10
+    MEMBER_ROLE_RATE: int = 8
+    MEMBER_ROLE_PER: float = 10
+    # Disable once main platform role changes are pushed through the webhook
+    REVERIFY_ON_MESSAGE: bool = True
+
+    # Links re-verified per second by the admin-triggered sweep. Its member edits wait behind all others
+    REVERIFY_SWEEP_RATE: float = 5
+    REVERIFY_SWEEP_CHUNK_SIZE: int = 100
+    # Joins within JOIN_FLOOD_WINDOW seconds at which joining members are re-verified by a rate-limited drain instead
+    JOIN_FLOOD_THRESHOLD: int = 30
+    # Capped at the member edit budget, MEMBER_EDIT_RATE / MEMBER_EDIT_PER
+    JOIN_FLOOD_DRAIN_RATE: float = 0.5
+
+    # In seconds
+    LINK_CACHE_TTL: int = 300
+    LINK_CACHE_NEGATIVE_TTL: int = 60
+    LINK_CACHE_MAX_SIZE: int = 50000
+    REVERIFY_MESSAGE_COOLDOWN: int = 60
+    REVERIFY_JOIN_COOLDOWN: int = 3600
+    JOIN_FLOOD_WINDOW: int = 60
+    LISTENER_COOLDOWN_MAX_SIZE: int = 100000
+    REVERIFY_FRESHNESS: int = 21600
+    STALE_REFRESH_INTERVAL: int = 60
+    STALE_REFRESH_BATCH_SIZE: int = 20
+    USER_DETAILS_CACHE_TTL: int = 600
+    USER_DETAILS_CACHE_NEGATIVE_TTL: int = 3600
+    USER_DETAILS_CACHE_MAX_SIZE: int = 20000
+    SEASON_RANK_CACHE_TTL: int = 86400
+    SEASON_RANK_CACHE_NEGATIVE_TTL: int = 3600
+    SEASON_RANK_CACHE_MAX_SIZE: int = 100000
+    SEASON_PROBE_INTERVAL: int = 900
+    CERTIFICATE_CACHE_TTL: int = 86400
+    CERTIFICATE_CACHE_NEGATIVE_TTL: int = 300
+    CERTIFICATE_CACHE_MAX_SIZE: int = 10000
+    # How long finished unbans and unmutes are remembered, so failed ones are only retried after this long
+    SCHEDULED_JOB_RETENTION: int = 600
+    SCHEDULED_JOB_MAX_SIZE: int = 10000
+
+    # Season ID, probed from HTB when not set
+    CURRENT_SEASON_ID: int | None = None
 
     START_WEBHOOK_SERVER: bool = False
     WEBHOOK_PORT: int = 1337
@@ -219,51 +384,22 @@ class Global(BaseSettings):
         return v
 
     def get_academy_cert_role(self, certificate: int) -> int:
-        return {
-            self.academy_certificates.CERTIFIED_BUG_BOUNTY_HUNTER: self.roles.ACADEMY_CBBH,
-            self.academy_certificates.CERTIFIED_PENETRATION_TESTING_SPECIALIST: self.roles.ACADEMY_CPTS,
-            self.academy_certificates.CERTIFIED_DEFENSIVE_SECURITY_ANALYST: self.roles.ACADEMY_CDSA,
-            self.academy_certificates.CERTIFIED_WEB_EXPLOITATION_EXPERT: self.roles.ACADEMY_CWEE,
-        }.get(certificate)
+        return self.role_resolver.academy_cert.get(certificate)
 
     def get_post_or_rank(self, what: str) -> Optional[int]:
-        return {
-            "1": self.roles.RANK_ONE,
-            "10": self.roles.RANK_TEN,
-            "Omniscient": self.roles.OMNISCIENT,
-            "Guru": self.roles.GURU,
-            "Elite Hacker": self.roles.ELITE_HACKER,
-            "Pro Hacker": self.roles.PRO_HACKER,
-            "Hacker": self.roles.HACKER,
-            "Script Kiddie": self.roles.SCRIPT_KIDDIE,
-            "Noob": self.roles.NOOB,
-            "vip": self.roles.VIP,
-            "dedivip": self.roles.VIP_PLUS,
-            "Challenge Creator": self.roles.CHALLENGE_CREATOR,
-            "Box Creator": self.roles.BOX_CREATOR,
-        }.get(what)
+        return self.role_resolver.post_or_rank.get(what)
 
     def get_season(self, what: str):
-        return {
-            "Holo": self.roles.SEASON_HOLO,
-            "Platinum": self.roles.SEASON_PLATINUM,
-            "Ruby": self.roles.SEASON_RUBY,
-            "Silver": self.roles.SEASON_SILVER,
-            "Bronze": self.roles.SEASON_BRONZE,
-        }.get(what)
+        return self.role_resolver.season.get(what)
 
     def get_cert(self, what: str):
-        return {
-            "CPTS": self.roles.ACADEMY_CPTS,
-            "CBBH": self.roles.ACADEMY_CBBH,
-            "CDSA": self.roles.ACADEMY_CDSA,
-            "CWEE": self.roles.ACADEMY_CWEE
-        }.get(what)
+        return self.role_resolver.cert.get(what)
 
     class Config:
         """The Pydantic settings configuration."""
 
         env_file = ".env"
+        arbitrary_types_allowed = True
 
 
 def load_settings(env_file: str | None = None):
@@ -343,6 +479,10 @@ def load_settings(env_file: str | None = None):
         ],
     }
 
+    global_settings.role_resolver = RoleResolver(
+        global_settings.roles, global_settings.academy_certificates, global_settings.role_groups
+    )
+
     return global_settings
 
 
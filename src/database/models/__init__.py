@@ -6,4 +6,6 @@ from .ctf import Ctf
 from .htb_discord_link import HtbDiscordLink
 from .infraction import Infraction
 from .mute import Mute
+from .reverification_sweep import ReverificationSweep
+from .season import Season
 from .user_note import UserNote
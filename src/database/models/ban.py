@@ -1,7 +1,7 @@
 # flake8: noqa: D101
 from datetime import datetime
 
-from sqlalchemy import Boolean, Integer
+from sqlalchemy import Boolean, Index, Integer
 from sqlalchemy.dialects.mysql import BIGINT, TEXT, TIMESTAMP
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -22,6 +22,12 @@ class Ban(Base):
         unbanned (bool): Whether the user has been unbanned or not, cannot be null, default is False.
         timestamp (datetime): The timestamp when the ban was issued, cannot be null.
     """
+    __table_args__ = (
+        # Due bans are looked up every minute, and active bans of a user on every ban.
+        Index("ix_ban_unbanned_unban_time", "unbanned", "unban_time"),
+        Index("ix_ban_user_id_unbanned", "user_id", "unbanned"),
+    )
+
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(BIGINT(18))
     reason: Mapped[str] = mapped_column(TEXT, nullable=False)
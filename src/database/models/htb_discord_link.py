@@ -1,6 +1,8 @@
 # flake8: noqa: D101
+from datetime import datetime
+
 from sqlalchemy import VARCHAR, Integer
-from sqlalchemy.dialects.mysql import BIGINT
+from sqlalchemy.dialects.mysql import BIGINT, DATETIME
 from sqlalchemy.orm import Mapped, mapped_column
 
 from . import Base
@@ -15,11 +17,13 @@ class HtbDiscordLink(Base):
         account_identifier (VARCHAR): A unique identifier for the account.
         discord_user_id (BIGINT): The Discord user ID (18 digits) associated with the HTB user.
         htb_user_id (BIGINT): The Hack The Box user ID associated with the Discord user.
+        last_verified_at (DATETIME): When the link was last checked against HTB (UTC, nullable).
     """
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    account_identifier: Mapped[str] = mapped_column(VARCHAR(255))
-    discord_user_id: Mapped[int] = mapped_column(BIGINT(18))
-    htb_user_id: Mapped[int] = mapped_column(BIGINT)
+    account_identifier: Mapped[str] = mapped_column(VARCHAR(255), index=True)
+    discord_user_id: Mapped[int] = mapped_column(BIGINT(18), index=True)
+    htb_user_id: Mapped[int] = mapped_column(BIGINT, index=True)
+    last_verified_at: Mapped[datetime | None] = mapped_column(DATETIME, nullable=True, index=True)
 
     @property
     def discord_user_id_as_int(self) -> int:
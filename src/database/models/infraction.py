@@ -10,7 +10,7 @@ from . import Base
 
 class Infraction(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    user_id: Mapped[int] = mapped_column(BIGINT(18), nullable=False)
+    user_id: Mapped[int] = mapped_column(BIGINT(18), nullable=False, index=True)
     reason = mapped_column(TEXT, nullable=False)
     weight: Mapped[int] = mapped_column(Integer, nullable=False)
     moderator_id: Mapped[int] = mapped_column(BIGINT(18), nullable=False)
@@ -8,7 +8,7 @@ from . import Base
 
 class Mute(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    user_id: Mapped[int] = mapped_column(BIGINT(18), nullable=False)
+    user_id: Mapped[int] = mapped_column(BIGINT(18), nullable=False, index=True)
     reason: Mapped[str] = mapped_column(TEXT, nullable=False)
     moderator_id: Mapped[int] = mapped_column(BIGINT(18), nullable=False)
-    unmute_time: Mapped[int] = mapped_column(BIGINT(11, unsigned=True), nullable=False)
+    unmute_time: Mapped[int] = mapped_column(BIGINT(11, unsigned=True), nullable=False, index=True)
@@ -0,0 +1,36 @@
+# flake8: noqa: D101
+from datetime import datetime
+
+from sqlalchemy import VARCHAR, Boolean, Integer
+from sqlalchemy.dialects.mysql import BIGINT, DATETIME
+from sqlalchemy.orm import Mapped, mapped_column
+
+from . import Base
+
+
+class ReverificationSweep(Base):
+    """
+    A checkpointed re-verification of every HTB Discord link, so an interrupted sweep resumes where it stopped.
+
+    Attributes:
+        id (int): The primary key for the table.
+        moderator_id (int): The Discord ID of the admin who started the sweep.
+        last_link_id (int): The ID of the last HtbDiscordLink processed. Links are swept in ID order.
+        processed (int): The number of links processed so far.
+        failed (int): The number of processed links that could not be verified.
+        total (int): The number of links when the sweep started.
+        cancelled (bool): Whether the sweep was stopped before it completed.
+        started_at (datetime): When the sweep was started (UTC).
+        finished_at (datetime): When the sweep completed, was stopped or failed (UTC, nullable while running).
+        error (str): Why the sweep failed, if it crashed (nullable).
+    """
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    moderator_id: Mapped[int] = mapped_column(BIGINT(18), nullable=False)
+    last_link_id: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    processed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    failed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    total: Mapped[int] = mapped_column(Integer, nullable=False)
+    cancelled: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    started_at: Mapped[datetime] = mapped_column(DATETIME, nullable=False)
+    finished_at: Mapped[datetime | None] = mapped_column(DATETIME, nullable=True, index=True)
+    error: Mapped[str | None] = mapped_column(VARCHAR(255), nullable=True)
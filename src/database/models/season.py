@@ -0,0 +1,20 @@
+# flake8: noqa: D101
+from datetime import datetime
+
+from sqlalchemy import Integer
+from sqlalchemy.dialects.mysql import DATETIME
+from sqlalchemy.orm import Mapped, mapped_column
+
+from . import Base
+
+
+class Season(Base):
+    """
+    An HTB season seen active by the bot, so a season change while the bot was down is noticed after a restart.
+
+    Attributes:
+        id (int): The HTB ID of the season.
+        detected_at (datetime): When the bot first saw the season active (UTC).
+    """
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    detected_at: Mapped[datetime] = mapped_column(DATETIME, nullable=False, index=True)
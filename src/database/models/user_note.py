@@ -10,7 +10,7 @@ from . import Base
 
 class UserNote(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    user_id: Mapped[int] = mapped_column(BIGINT(18), nullable=False)
+    user_id: Mapped[int] = mapped_column(BIGINT(18), nullable=False, index=True)
     note: Mapped[str] = mapped_column(TEXT, nullable=False)
     moderator_id: Mapped[int] = mapped_column(BIGINT(18), nullable=False)
     date: Mapped[date] = mapped_column(DATE, nullable=False)
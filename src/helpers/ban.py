@@ -1,5 +1,4 @@
 """Helper methods to handle bans, mutes and infractions. Bot or message responses are NOT allowed."""
-import asyncio
 import logging
 from datetime import datetime
 
@@ -14,8 +13,9 @@ from src.database.models import Ban, Infraction, Mute
 from src.database.session import AsyncSessionLocal
 from src.helpers.checks import member_is_staff
 from src.helpers.duration import validate_duration
+from src.helpers.rate_limit import add_roles, remove_roles
 from src.helpers.responses import SimpleResponse
-from src.helpers.schedule import schedule
+from src.helpers.schedule import job_registry
 
 logger = logging.getLogger(__name__)
 
@@ -123,8 +123,9 @@ async def ban_member(
             extra={"ban_requestor": author.name, "ban_receiver": member.id, "dm_banned_member": dm_banned_member}
         )
 
-        unban_task = schedule(unban_member(guild, member), run_at=ban.unban_time)
-        asyncio.create_task(unban_task)
+        job_registry.schedule(
+            "unban", ban_id, datetime.fromtimestamp(ban.unban_time), lambda: unban_member(guild, member)
+        )
         logger.debug("Unbanned sceduled for ban", extra={"ban_id": ban_id, "unban_time": ban.unban_time})
         return SimpleResponse(message=message, delete_after=0)
     else:
@@ -167,19 +168,24 @@ async def _dm_banned_member(end_date, guild, member, reason) -> bool:
     return False
 
 
-async def unban_member(guild: Guild, member: Member) -> Member:
-    """Unban a member from the guild."""
+async def unban_user(guild: Guild, user: discord.abc.Snowflake) -> None:
+    """Unban a user from the guild, logging why it failed if it did. Only the ID of the user is needed."""
     try:
-        await guild.unban(member)
-        logger.info(f"Unbanned user {member.id}.")
+        await guild.unban(user)
+        logger.info(f"Unbanned user {user.id}.")
     except Forbidden as ex:
-        logger.error(f"Permission denied when trying to unban user with ID {member.id}", exc_info=ex)
+        logger.error(f"Permission denied when trying to unban user with ID {user.id}", exc_info=ex)
     except NotFound as ex:
         logger.error(
-            f"NotFound when trying to unban user with ID {member.id}. "
+            f"NotFound when trying to unban user with ID {user.id}. "
             f"This could indicate that the user is not currently banned.", exc_info=ex, )
     except HTTPException as ex:
-        logger.error(f"HTTPException when trying to unban user with ID {member.id}", exc_info=ex)
+        logger.error(f"HTTPException when trying to unban user with ID {user.id}", exc_info=ex)
+
+
+async def unban_member(guild: Guild, member: Member) -> Member:
+    """Unban a member from the guild."""
+    await unban_user(guild, member)
 
     async with AsyncSessionLocal() as session:
         stmt = select(Ban).filter(Ban.user_id == member.id).filter(Ban.unbanned.is_(False)).limit(1)
@@ -220,7 +226,7 @@ async def mute_member(
     if member:
         # No longer on the server - cleanup, but don't attempt to remove a role
         logger.info(f"Add mute from {member.name}:{member.id}.")
-        await member.add_roles(role, reason=reason)
+        await add_roles(member, role, reason=reason)
 
         mute = Mute(
             user_id=member.id, reason=reason, moderator_id=author.id, date=datetime.fromtimestamp(dur)
@@ -237,7 +243,7 @@ async def unmute_member(guild: Guild, member: Member) -> Member:
     if isinstance(member, Member):
         # No longer on the server - cleanup, but don't attempt to remove a role
         logger.info(f"Remove mute from {member.name}:{member.id}.")
-        await member.remove_roles(role)
+        await remove_roles(member, role)
 
     async with AsyncSessionLocal() as session:
         stmt = select(Mute).filter(Mute.user_id == member.id)
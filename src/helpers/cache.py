@@ -0,0 +1,65 @@
+"""In-process caches used to keep hot lookups away from the database and the HTB API."""
+import time
+from collections import OrderedDict
+from typing import Generic, Hashable, TypeVar
+
+from src.metrics import cache_hits, cache_misses
+
+# Sentinel returned on a cache miss, so that `None` can be cached as a valid (negative) value.
+MISSING = object()
+
+V = TypeVar("V")
+D = TypeVar("D")
+
+
+class TTLCache(Generic[V]):
+    """
+    A bounded, least-recently-used cache whose entries expire after a time-to-live.
+
+    Args:
+        name (str): The name of the cache, used as the label of the hit/miss metrics.
+        ttl (float): The default time-to-live of an entry, in seconds.
+        max_size (int): The maximum number of entries. The least recently used entry is evicted first.
+    """
+
+    def __init__(self, name: str, ttl: float, max_size: int):
+        self.name = name
+        self.ttl = ttl
+        self.max_size = max_size
+        self._data: OrderedDict[Hashable, tuple[float, V]] = OrderedDict()
+
+    def get(self, key: Hashable, default: D = MISSING) -> V | D:
+        """Return the cached value for `key`, or `default` if it is missing or has expired."""
+        entry = self._data.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._data.move_to_end(key)
+                cache_hits.labels(self.name).inc()
+                return value
+            del self._data[key]
+
+        cache_misses.labels(self.name).inc()
+        return default
+
+    def set(self, key: Hashable, value: V, ttl: float | None = None) -> None:
+        """Cache `value` under `key` for `ttl` seconds, or the default TTL of the cache."""
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        """Remove `key` from the cache, if present."""
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove all entries from the cache."""
+        self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._data)
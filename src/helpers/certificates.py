@@ -0,0 +1,151 @@
+"""Cached lookups of HTB certificates, for single and bulk certification verification."""
+import asyncio
+import csv
+import io
+import logging
+from types import MappingProxyType
+from typing import Iterable, NamedTuple
+
+from aiohttp import ClientError
+from discord import Guild, HTTPException
+
+from src.core import settings
+from src.helpers.cache import MISSING, TTLCache
+from src.helpers.htb_api import CERTIFICATE_ENDPOINT, htb_api
+from src.helpers.roles import reconcile_roles
+from src.helpers.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Maps the full name of a certification, as returned by HTB, to the abbreviation the roles are configured by.
+CERTIFICATIONS = MappingProxyType({
+    "HTB Certified Bug Bounty Hunter": "CBBH",
+    "HTB Certified Penetration Testing Specialist": "CPTS",
+    "HTB Certified Defensive Security Analyst": "CDSA",
+    "HTB Certified Web Exploitation Expert": "CWEE",
+})
+
+# Maps a (certificate ID, full name) pair to the certification abbreviation, or to None if it matches no certificate.
+certificate_cache = TTLCache(
+    "certificates", ttl=settings.CERTIFICATE_CACHE_TTL, max_size=settings.CERTIFICATE_CACHE_MAX_SIZE
+)
+# Concurrent lookups of the same certificate, e.g. right after a cohort is announced, share a single request.
+certificate_flights = SingleFlight("certificates")
+
+
+class CertificationRow(NamedTuple):
+    """A row of a bulk certification CSV: who claims which certificate."""
+
+    discord_id: int
+    cert_id: str
+    full_name: str
+
+
+class CertificationResult(NamedTuple):
+    """The outcome of verifying a row of a bulk certification CSV."""
+
+    row: CertificationRow
+    cert: str | None
+    status: str
+
+
+async def process_certification(cert_id: str, full_name: str) -> str | None:
+    """Get the abbreviation of the certification a certificate is for, or None if it does not match any."""
+    key = (cert_id, full_name)
+    cert = certificate_cache.get(key)
+    if cert is not MISSING:
+        return cert
+
+    return await certificate_flights.do(key, lambda: _fetch_certification(cert_id, full_name))
+
+
+async def _fetch_certification(cert_id: str, full_name: str) -> str | None:
+    cert_api_url = f"{settings.API_V4_URL}/certificate/lookup"
+    params = {"id": cert_id, "name": full_name}
+    r = await htb_api.get(cert_api_url, params=params, endpoint=CERTIFICATE_ENDPOINT)
+    if r.status == 404:
+        # Typos are common, so unknown certificates are only remembered briefly.
+        certificate_cache.set((cert_id, full_name), None, ttl=settings.CERTIFICATE_CACHE_NEGATIVE_TTL)
+        return None
+    if r.status != 200:
+        logger.error(f"Non-OK HTTP status code returned from certificate lookup: {r.status}.")
+        return None
+
+    try:
+        cert_name = r.data["certificates"][0]["name"]
+    except (IndexError, KeyError, TypeError):
+        cert = None
+    else:
+        cert = CERTIFICATIONS.get(cert_name)
+        if cert is None:
+            logger.warning(f"Certification {cert_name} has no role configured.")
+
+    certificate_cache.set((cert_id, full_name), cert, ttl=None if cert else settings.CERTIFICATE_CACHE_NEGATIVE_TTL)
+    return cert
+
+
+def parse_certification_csv(content: bytes) -> list[CertificationRow]:
+    """
+    Parse a CSV of `discord_id,cert_id,full_name` rows. A header row is allowed.
+
+    Raises:
+        ValueError: If a row does not have three columns or its Discord ID is not a number.
+    """
+    rows = []
+    reader = csv.reader(io.StringIO(content.decode("utf-8-sig")))
+    for line, columns in enumerate(reader, start=1):
+        if not columns or not "".join(columns).strip():
+            continue
+        if len(columns) != 3:
+            raise ValueError(f"Line {line} must have 3 columns (discord_id, cert_id, full_name).")
+
+        discord_id, cert_id, full_name = (column.strip() for column in columns)
+        if line == 1 and not discord_id.isdigit():
+            continue
+        if not discord_id.isdigit():
+            raise ValueError(f"Line {line} has an invalid Discord ID: {discord_id}.")
+        rows.append(CertificationRow(int(discord_id), cert_id, full_name))
+    return rows
+
+
+async def verify_certifications(
+    guild: Guild, rows: Iterable[CertificationRow], concurrency: int
+) -> list[CertificationResult]:
+    """Verify the certificates of many members, with at most `concurrency` lookups in flight, and grant the roles."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def verify(row: CertificationRow) -> CertificationResult:
+        async with semaphore:
+            member = guild.get_member(row.discord_id)
+            if member is None:
+                return CertificationResult(row, None, "not in server")
+            if not row.cert_id.startswith("HTBCERT-"):
+                return CertificationResult(row, None, "invalid certificate ID")
+
+            try:
+                cert = await process_certification(row.cert_id, row.full_name)
+            except (ClientError, asyncio.TimeoutError) as exc:
+                logger.warning(f"Could not look up certificate {row.cert_id}.", exc_info=exc)
+                return CertificationResult(row, None, "lookup failed")
+            if cert is None:
+                return CertificationResult(row, None, "not found")
+
+            resolver = settings.role_resolver
+            try:
+                await reconcile_roles(member, add=[resolver.resolve(guild, resolver.cert.get(cert))])
+            except HTTPException as exc:
+                logger.warning(f"Could not add the {cert} role to member {member.id}.", exc_info=exc)
+                return CertificationResult(row, cert, "role update failed")
+            return CertificationResult(row, cert, "verified")
+
+    return await asyncio.gather(*(verify(row) for row in rows))
+
+
+def certification_report(results: Iterable[CertificationResult]) -> bytes:
+    """Render the results of a bulk verification as a CSV."""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(["discord_id", "cert_id", "full_name", "certification", "status"])
+    for result in results:
+        writer.writerow([*result.row, result.cert or "", result.status])
+    return output.getvalue().encode()
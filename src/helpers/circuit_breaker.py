@@ -0,0 +1,151 @@
+"""A circuit breaker, to stop calling an upstream service that keeps failing and probe it until it recovers."""
+import logging
+import random
+import time
+from collections import deque
+from enum import Enum
+
+from aiohttp import ClientError
+
+from src.metrics import circuit_breaker_rejected, circuit_breaker_state, circuit_breaker_transitions
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitState(Enum):
+    """The states of a circuit breaker. Values are exported as the state gauge."""
+
+    CLOSED = 0
+    HALF_OPEN = 1
+    OPEN = 2
+
+
+class CircuitOpenError(ClientError):
+    """A call was rejected without being attempted, since its circuit breaker is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuit breaker {name} is open, retry after {retry_after:.1f}s.")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Tracks the outcome of the last `window` calls and opens once too many of them failed.
+
+    While open, calls are rejected with `CircuitOpenError` without being attempted. Once the open period is over, the
+    breaker is half-open and lets a single probe call through: success closes it, failure opens it again for twice
+    as long as before, up to `max_reset_timeout`. Open periods are jittered so that several bots, or several
+    breakers, do not probe in lockstep. Outcomes of calls started in an earlier state, e.g. a slow call that was let
+    through before the breaker opened, are ignored.
+
+    Args:
+        name (str): The name of the breaker, used as the metrics label.
+        failure_rate (float): The fraction of failed calls in the window (0-1) at which the breaker opens.
+        window (int): The number of most recent calls the failure rate is computed over.
+        min_calls (int): The number of calls required in the window before the breaker may open.
+        reset_timeout (float): The base open period, in seconds.
+        max_reset_timeout (float): The maximum open period, in seconds.
+    """
+
+    def __init__(
+        self, name: str, failure_rate: float, window: int, min_calls: int, reset_timeout: float,
+        max_reset_timeout: float,
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self._outcomes: deque[bool] = deque(maxlen=window)
+        self._state = CircuitState.CLOSED
+        self._opened_count = 0
+        self._open_until = 0.0
+        self._probing = False
+        # Incremented on every transition, so outcomes can be matched to the state their call started in.
+        self._generation = 0
+        circuit_breaker_state.labels(name).set(self._state.value)
+
+    @property
+    def state(self) -> CircuitState:
+        """The current state, moving from open to half-open once the open period is over."""
+        if self._state is CircuitState.OPEN and time.monotonic() >= self._open_until:
+            self._transition(CircuitState.HALF_OPEN)
+        return self._state
+
+    def retry_after(self) -> float:
+        """The number of seconds until a call may be attempted, or 0 if one may be attempted now."""
+        state = self.state
+        if state is CircuitState.OPEN:
+            return self._open_until - time.monotonic()
+        if state is CircuitState.HALF_OPEN and self._probing:
+            return self.reset_timeout
+        return 0
+
+    def before_call(self) -> int:
+        """
+        Claim permission to make a call. Every permitted call must be followed by `record_success` or `record_failure`.
+
+        Returns:
+            int: The ticket of the call, to pass along with its outcome.
+
+        Raises:
+            CircuitOpenError: If the breaker is open, or half-open with a probe in flight.
+        """
+        retry_after = self.retry_after()
+        if retry_after > 0:
+            circuit_breaker_rejected.labels(self.name).inc()
+            raise CircuitOpenError(self.name, retry_after)
+
+        if self._state is CircuitState.HALF_OPEN:
+            self._probing = True
+        return self._generation
+
+    def record_success(self, ticket: int) -> None:
+        """Record a successful call, given the ticket `before_call` returned for it."""
+        if ticket != self._generation:
+            # Calls started before the last transition, e.g. before the breaker opened, do not count. While
+            # half-open, this leaves only the probe to decide the state.
+            return
+        if self._state is CircuitState.HALF_OPEN:
+            self._opened_count = 0
+            self._outcomes.clear()
+            self._transition(CircuitState.CLOSED)
+            return
+
+        self._outcomes.append(True)
+
+    def record_failure(self, ticket: int) -> None:
+        """Record a failed call, given the ticket `before_call` returned for it, opening the breaker if needed."""
+        if ticket != self._generation:
+            return
+        if self._state is CircuitState.HALF_OPEN:
+            self._open()
+            return
+
+        self._outcomes.append(False)
+        if len(self._outcomes) < self.min_calls:
+            return
+
+        failures = self._outcomes.count(False)
+        if failures / len(self._outcomes) >= self.failure_rate:
+            self._open()
+
+    def _open(self) -> None:
+        self._opened_count += 1
+        delay = min(self.reset_timeout * 2 ** (self._opened_count - 1), self.max_reset_timeout)
+        # Equal jitter: at least half the delay, so a failing service still gets a break.
+        delay = random.uniform(delay / 2, delay)
+        self._open_until = time.monotonic() + delay
+        self._outcomes.clear()
+        logger.warning(f"Circuit breaker {self.name} opened for {delay:.1f}s.")
+        self._transition(CircuitState.OPEN)
+
+    def _transition(self, state: CircuitState) -> None:
+        if state is not CircuitState.OPEN:
+            logger.info(f"Circuit breaker {self.name} is now {state.name.lower().replace('_', '-')}.")
+        self._state = state
+        self._probing = False
+        self._generation += 1
+        circuit_breaker_transitions.labels(self.name, state.name).inc()
+        circuit_breaker_state.labels(self.name).set(state.value)
@@ -0,0 +1,145 @@
+"""Set-based lifting of expired bans and mutes."""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Awaitable, Iterator, Sequence
+
+from discord import Guild, Member, NotFound, Object
+from sqlalchemy import delete, select, update
+
+from src.bot import Bot
+from src.core import settings
+from src.database.models import Ban, Mute
+from src.database.session import AsyncSessionLocal
+from src.helpers.ban import unban_user
+from src.helpers.rate_limit import remove_roles
+from src.helpers.schedule import JobState, job_registry
+
+logger = logging.getLogger(__name__)
+
+
+class ExpiryProcessor:
+    """
+    Lifts every expired ban and mute with a constant number of database round trips per run.
+
+    Due records are selected with one query per table, the Discord side is applied concurrently with at most
+    `concurrency` punishments in flight, and the results are committed at once with a bulk UPDATE of the bans and a
+    bulk DELETE of the mutes. Discord is only called for the unbans and for the role changes themselves: users are
+    unbanned by ID and muted members are taken from the member cache. Records with a job in the `job_registry`, e.g.
+    a timer set by a command, are left to it.
+
+    Args:
+        bot (Bot): The bot, to look up the guilds.
+        concurrency (int): The maximum number of punishments lifted on Discord at the same time.
+    """
+
+    def __init__(self, bot: Bot, concurrency: int):
+        self.bot = bot
+        self.concurrency = concurrency
+
+    async def run(self) -> tuple[int, int]:
+        """Lift the bans and mutes that are due. Returns the number of bans and mutes lifted."""
+        now = int(datetime.timestamp(datetime.now()))
+        bans: list[Ban] = []
+        mutes: list[Mute] = []
+        try:
+            async with AsyncSessionLocal() as session:
+                result = await session.scalars(
+                    select(Ban).filter(Ban.unbanned.is_(False)).filter(Ban.unban_time <= now)
+                )
+                bans = self._claim("unban", result.all())
+                result = await session.scalars(select(Mute).filter(Mute.unmute_time <= now))
+                mutes = self._claim("unmute", result.all())
+            if not bans and not mutes:
+                return 0, 0
+            logger.debug(f"Lifting {len(bans)} expired bans and {len(mutes)} expired mutes.")
+
+            semaphore = asyncio.Semaphore(self.concurrency)
+
+            async def limited(action: Awaitable) -> None:
+                async with semaphore:
+                    await action
+
+            results = await asyncio.gather(
+                *(limited(self._lift_ban(ban)) for ban in bans),
+                *(limited(self._lift_mute(mute)) for mute in mutes),
+                return_exceptions=True,
+            )
+            lifted_bans = self._succeeded("unban", bans, results[:len(bans)])
+            lifted_mutes = self._succeeded("unmute", mutes, results[len(bans):])
+
+            async with AsyncSessionLocal() as session:
+                if lifted_bans:
+                    await session.execute(update(Ban).where(Ban.id.in_(lifted_bans)).values(unbanned=True))
+                if lifted_mutes:
+                    await session.execute(delete(Mute).where(Mute.id.in_(lifted_mutes)))
+                await session.commit()
+            for ban_id in lifted_bans:
+                job_registry.finish("unban", ban_id, JobState.DONE)
+            for mute_id in lifted_mutes:
+                job_registry.finish("unmute", mute_id, JobState.DONE)
+        finally:
+            # Claims still running here were not lifted, e.g. a query failed or the run was cancelled. They are
+            # released as failed, to be retried by a later run.
+            self._release("unban", bans)
+            self._release("unmute", mutes)
+
+        logger.info(f"Lifted {len(lifted_bans)} expired bans and {len(lifted_mutes)} expired mutes.")
+        return len(lifted_bans), len(lifted_mutes)
+
+    @staticmethod
+    def _claim(kind: str, records: Sequence[Ban | Mute]) -> list[Ban | Mute]:
+        claimed = set(job_registry.claim(kind, (record.id for record in records)))
+        return [record for record in records if record.id in claimed]
+
+    @staticmethod
+    def _release(kind: str, records: Sequence[Ban | Mute]) -> None:
+        for record in records:
+            if job_registry.state(kind, record.id) is JobState.RUNNING:
+                job_registry.finish(kind, record.id, JobState.FAILED)
+
+    @staticmethod
+    def _succeeded(kind: str, records: Sequence[Ban | Mute], results: Sequence) -> list[int]:
+        """The IDs of the records lifted on Discord. The others are released as failed, to be retried later."""
+        succeeded = []
+        for record, result in zip(records, results):
+            if isinstance(result, Exception):
+                logger.error(f"Could not lift {kind} {record.id} of user {record.user_id}.", exc_info=result)
+                job_registry.finish(kind, record.id, JobState.FAILED)
+            else:
+                succeeded.append(record.id)
+        return succeeded
+
+    def _guilds(self) -> Iterator[Guild]:
+        for guild_id in settings.guild_ids:
+            guild = self.bot.get_guild(guild_id)
+            if not guild:
+                logger.warning(f"Unable to find guild with ID {guild_id}.")
+                continue
+            yield guild
+
+    async def _lift_ban(self, ban: Ban) -> None:
+        # Unbanning only needs the ID, so the banned user is not fetched first.
+        user = Object(id=ban.user_id)
+        for guild in self._guilds():
+            await unban_user(guild, user)
+
+    async def _lift_mute(self, mute: Mute) -> None:
+        for guild in self._guilds():
+            member = await self._get_member(guild, mute.user_id)
+            # No longer on the server, or no longer muted - cleanup, but don't attempt to remove a role
+            if member is None or not (role := member.get_role(settings.roles.MUTED)):
+                continue
+            logger.info(f"Remove mute from {member.name}:{member.id}.")
+            await remove_roles(member, role)
+
+    @staticmethod
+    async def _get_member(guild: Guild, user_id: int) -> Member | None:
+        """Get a member from the cache, and only fetch it while the member cache of the guild is incomplete."""
+        member = guild.get_member(user_id)
+        if member is None and not guild.chunked:
+            try:
+                member = await guild.fetch_member(user_id)
+            except NotFound:
+                return None
+        return member
@@ -0,0 +1,172 @@
+"""A pooled client for the HTB API, shared by all verification helpers."""
+import asyncio
+import logging
+import socket
+from typing import Any, NamedTuple
+
+from aiohttp import (
+    AsyncResolver, ClientConnectionError, ClientResponse, ClientSession, ClientTimeout, ContentTypeError, TCPConnector
+)
+
+from src import trace_config
+from src.core import settings
+from src.helpers.circuit_breaker import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying: the request never reached the API or the API asked us to come back later.
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+# Endpoints that go through their own circuit breaker.
+IDENTIFIER_ENDPOINT = "identifier"
+SEASON_ENDPOINT = "season"
+BAN_ENDPOINT = "ban"
+CERTIFICATE_ENDPOINT = "certificate"
+
+
+class HtbApiResponse(NamedTuple):
+    """The status of an HTB API response and its decoded JSON body, if the request succeeded."""
+
+    status: int
+    data: Any
+
+
+class HtbApiClient:
+    """
+    A client for the HTB API that keeps one long-lived HTTP session.
+
+    Reusing the session keeps connections alive between calls, so verifications no longer pay for a DNS lookup and
+    a TCP+TLS handshake every time. The session is created lazily, as it must be bound to the running event loop.
+
+    Every endpoint has its own circuit breaker, so an endpoint that keeps failing (after retries) or timing out is
+    not called at all for a while, and does not hold up calls to the other endpoints.
+
+    Args:
+        pool_size (int): The maximum number of simultaneous connections.
+        keepalive_timeout (float): How long idle connections are kept open, in seconds.
+        timeout (float): The total timeout of a single request, in seconds.
+        retries (int): How many times a request is retried on connection errors and retryable statuses.
+        retry_backoff (float): The delay before the first retry, in seconds. It doubles on every retry.
+        breaker_options (dict): The options of the circuit breakers, see `CircuitBreaker`.
+    """
+
+    def __init__(
+        self, pool_size: int, keepalive_timeout: float, timeout: float, retries: int, retry_backoff: float,
+        breaker_options: dict,
+    ):
+        self.pool_size = pool_size
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.breaker_options = breaker_options
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._session: ClientSession | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    @property
+    def session(self) -> ClientSession:
+        """The shared HTTP session, (re)created on first use in the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            logger.debug("Starting the HTB API HTTP session")
+            self._loop = loop
+            self._session = ClientSession(
+                connector=TCPConnector(
+                    limit=self.pool_size, keepalive_timeout=self.keepalive_timeout, resolver=AsyncResolver(),
+                    family=socket.AF_INET,
+                ),
+                timeout=ClientTimeout(total=self.timeout),
+                trace_configs=[trace_config],
+            )
+        return self._session
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        """The circuit breaker of an endpoint."""
+        if endpoint not in self._breakers:
+            self._breakers[endpoint] = CircuitBreaker(f"htb_api_{endpoint}", **self.breaker_options)
+        return self._breakers[endpoint]
+
+    def retry_after(self, endpoint: str) -> float:
+        """The number of seconds until an endpoint may be called again, or 0 if it may be called now."""
+        return self.breaker(endpoint).retry_after()
+
+    async def get(
+        self, url: str, params: dict = None, headers: dict = None, endpoint: str = "default"
+    ) -> HtbApiResponse:
+        """
+        Send a GET request to the HTB API, retrying transient failures.
+
+        Args:
+            url (str): The URL to request.
+            params (dict): The query parameters.
+            headers (dict): The request headers.
+            endpoint (str): The name of the endpoint, selecting the circuit breaker the request goes through.
+
+        Raises:
+            CircuitOpenError: If the circuit breaker of the endpoint is open. The request is not attempted.
+            ClientConnectionError: If the API could not be reached after all retries.
+            asyncio.TimeoutError: If the last attempt timed out.
+        """
+        breaker = self.breaker(endpoint)
+        ticket = breaker.before_call()
+        try:
+            response = await self._get(url, params, headers)
+        except BaseException:
+            # Callers giving up on a slow request (cancellation) count as a failure too.
+            breaker.record_failure(ticket)
+            raise
+
+        if response.status >= 500 or response.status == 429:
+            breaker.record_failure(ticket)
+        else:
+            breaker.record_success(ticket)
+        return response
+
+    async def _get(self, url: str, params: dict | None, headers: dict | None) -> HtbApiResponse:
+        for attempt in range(self.retries + 1):
+            is_last_attempt = attempt == self.retries
+            try:
+                async with self.session.get(url, params=params, headers=headers) as r:
+                    if r.status in RETRY_STATUSES and not is_last_attempt:
+                        logger.debug(f"HTB API returned {r.status} for {r.url.path}, retrying (attempt {attempt + 1}).")
+                    elif r.status == 200:
+                        return HtbApiResponse(r.status, await self._decode(r))
+                    else:
+                        return HtbApiResponse(r.status, None)
+            except (ClientConnectionError, asyncio.TimeoutError) as exc:
+                if is_last_attempt:
+                    raise
+                logger.debug(f"HTB API request failed, retrying (attempt {attempt + 1}).", exc_info=exc)
+
+            await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+
+    @staticmethod
+    async def _decode(response: ClientResponse) -> dict | list | None:
+        try:
+            return await response.json(content_type=None)
+        except (ContentTypeError, ValueError) as exc:
+            logger.error(f"Could not decode JSON returned from {response.url.path}.", exc_info=exc)
+            return None
+
+    async def close(self) -> None:
+        """Close the shared HTTP session."""
+        if self._session is not None and not self._session.closed:
+            logger.debug("Closing the HTB API HTTP session")
+            await self._session.close()
+
+
+htb_api = HtbApiClient(
+    pool_size=settings.HTB_API_POOL_SIZE,
+    keepalive_timeout=settings.HTB_API_KEEPALIVE,
+    timeout=settings.HTB_API_TIMEOUT,
+    retries=settings.HTB_API_RETRIES,
+    retry_backoff=settings.HTB_API_RETRY_BACKOFF,
+    breaker_options=dict(
+        failure_rate=settings.HTB_API_BREAKER_FAILURE_RATE,
+        window=settings.HTB_API_BREAKER_WINDOW,
+        min_calls=settings.HTB_API_BREAKER_MIN_CALLS,
+        reset_timeout=settings.HTB_API_BREAKER_RESET_TIMEOUT,
+        max_reset_timeout=settings.HTB_API_BREAKER_MAX_RESET_TIMEOUT,
+    ),
+)
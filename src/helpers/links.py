@@ -0,0 +1,167 @@
+"""Helper methods to look up the HTB <-> Discord links of members."""
+import heapq
+import logging
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from itertools import pairwise
+from typing import Iterable
+
+from sqlalchemy import or_, select, update
+
+from src.core import settings
+from src.database.models import HtbDiscordLink
+from src.database.session import AsyncSessionLocal
+from src.helpers.cache import MISSING, TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class LinkedUserIndex:
+    """
+    A compact, in-memory set of the Discord IDs of all users with an HTB link.
+
+    IDs are kept in a sorted array of unsigned 64-bit integers (8 bytes per ID, i.e. ~8 MB per million links) and
+    looked up by binary search. Changes are buffered in small sets and merged into the array once they grow, so
+    identify and unlink writes stay cheap. Changes made while the index is loading are preserved.
+
+    Until `load` completes, `loaded` is False and callers must fall back to the database.
+    """
+
+    def __init__(self, merge_threshold: int = 1024):
+        self.merge_threshold = merge_threshold
+        self.loaded = False
+        self._ids = array("Q")
+        self._added: set[int] = set()
+        self._removed: set[int] = set()
+
+    def load(self, ids: Iterable[int]) -> None:
+        """Replace the indexed IDs with `ids`, keeping changes recorded in the meantime. Sorted input is cheapest."""
+        ids = array("Q", ids)
+        if any(a >= b for a, b in pairwise(ids)):
+            ids = array("Q", sorted(set(ids)))
+        self._ids = ids
+        self.loaded = True
+        self._merge()
+
+    def add(self, discord_user_id: int) -> None:
+        """Record that a user has an HTB link."""
+        self._removed.discard(discord_user_id)
+        self._added.add(discord_user_id)
+        self._maybe_merge()
+
+    def discard(self, discord_user_id: int) -> None:
+        """Record that a user has no HTB link anymore."""
+        self._added.discard(discord_user_id)
+        self._removed.add(discord_user_id)
+        self._maybe_merge()
+
+    def _contains_sorted(self, discord_user_id: int) -> bool:
+        i = bisect_left(self._ids, discord_user_id)
+        return i < len(self._ids) and self._ids[i] == discord_user_id
+
+    def _maybe_merge(self) -> None:
+        if self.loaded and len(self._added) + len(self._removed) >= self.merge_threshold:
+            self._merge()
+
+    def _merge(self) -> None:
+        added = sorted(id_ for id_ in self._added if not self._contains_sorted(id_))
+        self._ids = array("Q", (id_ for id_ in heapq.merge(self._ids, added) if id_ not in self._removed))
+        self._added.clear()
+        self._removed.clear()
+
+    def __contains__(self, discord_user_id: int) -> bool:
+        if discord_user_id in self._added:
+            return True
+        if discord_user_id in self._removed:
+            return False
+        return self._contains_sorted(discord_user_id)
+
+    def __len__(self) -> int:
+        added = sum(1 for id_ in self._added if not self._contains_sorted(id_))
+        removed = sum(1 for id_ in self._removed if self._contains_sorted(id_))
+        return len(self._ids) + added - removed
+
+
+# Maps a Discord user ID to its first HtbDiscordLink, or to None if the user has no link at all.
+link_cache = TTLCache("htb_discord_link", ttl=settings.LINK_CACHE_TTL, max_size=settings.LINK_CACHE_MAX_SIZE)
+# All Discord IDs with a link, to skip the lookup entirely for the (many) users that never identified.
+linked_users = LinkedUserIndex()
+
+
+async def load_linked_users() -> None:
+    """Load the Discord IDs of all linked users into `linked_users`."""
+    ids = array("Q")
+    async with AsyncSessionLocal() as session:
+        stmt = select(HtbDiscordLink.discord_user_id).distinct().order_by(HtbDiscordLink.discord_user_id)
+        result = await session.stream_scalars(stmt)
+        async for discord_user_id in result:
+            ids.append(int(discord_user_id))
+
+    linked_users.load(ids)
+
+    logger.info(f"Loaded {len(linked_users)} linked Discord users.")
+
+
+async def get_htb_discord_link(discord_user_id: int) -> HtbDiscordLink | None:
+    """Get the first HTB Discord link of a Discord user, served from the cache when possible."""
+    link = link_cache.get(discord_user_id)
+    if link is not MISSING:
+        return link
+
+    async with AsyncSessionLocal() as session:
+        stmt = (
+            select(HtbDiscordLink)
+            .where(HtbDiscordLink.discord_user_id == discord_user_id)
+            .order_by(HtbDiscordLink.id)
+            .limit(1)
+        )
+        result = await session.scalars(stmt)
+        link = result.first()
+
+    # Users without a link are cached for a shorter period, since they are expected to identify eventually.
+    link_cache.set(discord_user_id, link, ttl=None if link else settings.LINK_CACHE_NEGATIVE_TTL)
+    return link
+
+
+def invalidate_htb_discord_link(discord_user_id: int) -> None:
+    """Drop the cached HTB Discord link of a Discord user. Must be called whenever their links change."""
+    logger.debug(f"Invalidating cached HTB Discord link for user {discord_user_id}.")
+    link_cache.invalidate(discord_user_id)
+
+
+def is_recently_verified(link: HtbDiscordLink) -> bool:
+    """Whether the link was checked against HTB within the reverification freshness window."""
+    if link.last_verified_at is None:
+        return False
+    return datetime.utcnow() - link.last_verified_at < timedelta(seconds=settings.REVERIFY_FRESHNESS)
+
+
+async def mark_htb_discord_link_verified(link: HtbDiscordLink) -> None:
+    """Record that the links of a Discord user were just checked against HTB."""
+    now = datetime.utcnow()
+    async with AsyncSessionLocal() as session:
+        stmt = (
+            update(HtbDiscordLink)
+            .where(HtbDiscordLink.discord_user_id == link.discord_user_id)
+            .values(last_verified_at=now)
+        )
+        await session.execute(stmt)
+        await session.commit()
+
+    # Keep the (possibly cached) instance in sync with the database.
+    link.last_verified_at = now
+
+
+async def get_stale_htb_discord_links(limit: int) -> list[HtbDiscordLink]:
+    """Get up to `limit` links that fell out of the freshness window, least recently verified first."""
+    threshold = datetime.utcnow() - timedelta(seconds=settings.REVERIFY_FRESHNESS)
+    async with AsyncSessionLocal() as session:
+        stmt = (
+            select(HtbDiscordLink)
+            .where(or_(HtbDiscordLink.last_verified_at.is_(None), HtbDiscordLink.last_verified_at < threshold))
+            .order_by(HtbDiscordLink.last_verified_at, HtbDiscordLink.id)
+            .limit(limit)
+        )
+        result = await session.scalars(stmt)
+        return list(result.all())
@@ -0,0 +1,156 @@
+"""Client-side rate limiting of member-modifying Discord requests, to smooth bursts instead of running into 429s."""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+from discord import Member, Role
+
+from src.core import settings
+from src.helpers.verification_queue import current_priority
+from src.metrics import discord_rate_limit_delayed, discord_rate_limit_queued, discord_rate_limits_received
+
+logger = logging.getLogger(__name__)
+
+# Routes of the member-modifying requests. Discord limits them per guild.
+MEMBER_EDIT_ROUTE = "member_edit"
+MEMBER_ROLE_ROUTE = "member_role"
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "wakeup")
+
+    def __init__(self, priority: int, seq: int):
+        self.priority = priority
+        self.seq = seq
+        self.wakeup = asyncio.Event()
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class TokenBucket:
+    """
+    Allows `rate` requests per `per` seconds, in bursts of up to `rate` requests.
+
+    Requests over the budget wait until a token is available, rather than being sent and rate limited by Discord. A
+    429 makes the library hold back every request in the bucket (or worse, globally) for a while. Waiting requests
+    are served by priority, lowest value first, and in arrival order within a priority, so a member running
+    /identify is not held up behind the edits of a background re-verification.
+
+    Args:
+        route (str): The name of the route, used as the metrics label.
+        rate (int): The number of requests allowed per period, and the size of a burst.
+        per (float): The length of the period, in seconds.
+    """
+
+    def __init__(self, route: str, rate: int, per: float):
+        self.route = route
+        self.rate = rate
+        self.per = per
+        self._tokens = float(rate)
+        self._updated_at = time.monotonic()
+        self._waiters: list[_Waiter] = []
+        self._seq = itertools.count()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.rate, self._tokens + (now - self._updated_at) * self.rate / self.per)
+        self._updated_at = now
+
+    async def acquire(self, tokens: int = 1, priority: int = 0) -> None:
+        """Wait until `tokens` requests may be sent, and spend them."""
+        self._refill()
+        if not self._waiters and self._tokens >= tokens:
+            self._tokens -= tokens
+            return
+
+        discord_rate_limit_delayed.labels(self.route).inc()
+        discord_rate_limit_queued.labels(self.route).inc()
+        waiter = _Waiter(priority, next(self._seq))
+        heapq.heappush(self._waiters, waiter)
+        try:
+            # Only the first waiter spends tokens. The others sleep until they get to the front.
+            while True:
+                if self._waiters[0] is not waiter:
+                    await waiter.wakeup.wait()
+                    waiter.wakeup.clear()
+                    continue
+                self._refill()
+                if self._tokens >= tokens:
+                    break
+                await asyncio.sleep((tokens - self._tokens) * self.per / self.rate)
+            self._tokens -= tokens
+        finally:
+            self._waiters.remove(waiter)
+            heapq.heapify(self._waiters)
+            if self._waiters:
+                self._waiters[0].wakeup.set()
+            discord_rate_limit_queued.labels(self.route).dec()
+
+
+class RouteLimiter:
+    """A token bucket per route and guild, created on first use."""
+
+    def __init__(self, limits: dict[str, tuple[int, float]]):
+        self.limits = limits
+        self._buckets: dict[tuple[str, int], TokenBucket] = {}
+
+    def bucket(self, route: str, guild_id: int) -> TokenBucket:
+        """The bucket of a route in a guild."""
+        key = (route, guild_id)
+        if key not in self._buckets:
+            rate, per = self.limits[route]
+            self._buckets[key] = TokenBucket(route, rate, per)
+        return self._buckets[key]
+
+    async def acquire(self, route: str, guild_id: int, tokens: int = 1, priority: int = 0) -> None:
+        """Wait until `tokens` requests of a route may be sent to a guild."""
+        # Requests can never be sent in bursts larger than the bucket.
+        await self.bucket(route, guild_id).acquire(min(tokens, self.limits[route][0]), priority)
+
+
+member_limiter = RouteLimiter({
+    MEMBER_EDIT_ROUTE: (settings.MEMBER_EDIT_RATE, settings.MEMBER_EDIT_PER),
+    MEMBER_ROLE_ROUTE: (settings.MEMBER_ROLE_RATE, settings.MEMBER_ROLE_PER),
+})
+
+
+async def edit_member(member: Member, **fields) -> None:
+    """
+    Edit a member (roles, nickname, ...) within the member edit budget of its guild.
+
+    Edits made by a job of the verification queue wait by the priority of its lane.
+    """
+    await member_limiter.acquire(MEMBER_EDIT_ROUTE, member.guild.id, priority=current_priority.get())
+    await member.edit(**fields)
+
+
+async def add_roles(member: Member, *roles: Role, reason: str | None = None) -> None:
+    """Add roles to a member within the role budget of its guild. Each role is a separate request."""
+    await member_limiter.acquire(MEMBER_ROLE_ROUTE, member.guild.id, len(roles), current_priority.get())
+    await member.add_roles(*roles, reason=reason)
+
+
+async def remove_roles(member: Member, *roles: Role, reason: str | None = None) -> None:
+    """Remove roles from a member within the role budget of its guild. Each role is a separate request."""
+    await member_limiter.acquire(MEMBER_ROLE_ROUTE, member.guild.id, len(roles), current_priority.get())
+    await member.remove_roles(*roles, reason=reason)
+
+
+class RateLimitLogCounter(logging.Filter):
+    """Counts the 429s Discord returned, which the library only reports by logging them before retrying."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Count rate limit records. Every record is logged as usual."""
+        if isinstance(record.msg, str) and record.msg.startswith("We are being rate limited"):
+            # The bucket is logged as "<channel ID>:<guild ID>:<route path>".
+            bucket = str(record.args[-1]) if record.args else ""
+            discord_rate_limits_received.labels(bucket.split(":", 2)[-1]).inc()
+        elif isinstance(record.msg, str) and record.msg.startswith("Global rate limit has been hit"):
+            discord_rate_limits_received.labels("global").inc()
+        return True
+
+
+logging.getLogger("discord.http").addFilter(RateLimitLogCounter())
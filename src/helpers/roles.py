@@ -0,0 +1,63 @@
+"""Helper methods to bring the roles of a member in line with what they should hold."""
+import logging
+from typing import Iterable
+
+from discord import Forbidden, Member, Role
+
+from src.helpers.rate_limit import edit_member
+
+logger = logging.getLogger(__name__)
+
+
+def desired_roles(member: Member, add: Iterable[Role | None] = (), remove: Iterable[Role | None] = ()) -> set[Role]:
+    """The roles `member` should hold after adding `add` and removing `remove`. Missing (None) roles are ignored."""
+    to_add = {role for role in add if role is not None}
+    to_remove = {role for role in remove if role is not None} - to_add
+    return (set(member.roles) - to_remove) | to_add
+
+
+async def reconcile_roles(
+    member: Member, add: Iterable[Role | None] = (), remove: Iterable[Role | None] = (), nick: str | None = None,
+    reason: str | None = None,
+) -> bool:
+    """
+    Apply a role (and optionally nickname) change to a member with as few Discord requests as possible.
+
+    The desired role set is computed against the roles the member already holds. Nothing is sent if neither the
+    roles nor the nickname change, otherwise a single `member.edit` replaces both. Roles in both `add` and `remove`
+    are kept.
+
+    Returns:
+        bool: Whether the member was edited.
+    """
+    current = set(member.roles)
+    desired = desired_roles(member, add, remove)
+
+    changes = {}
+    if desired != current:
+        # The @everyone role shares its ID with the guild and cannot be sent.
+        changes["roles"] = [role for role in desired if role.id != member.guild.id]
+    if nick is not None and member.nick != nick:
+        changes["nick"] = nick
+
+    if not changes:
+        logger.debug(f"Roles and nickname of member {member.id} are already up to date.")
+        return False
+
+    logger.debug(
+        f"Reconciling member {member.id}.", extra={
+            "added": [role.id for role in desired - current], "removed": [role.id for role in current - desired],
+            "nick": changes.get("nick"),
+        }
+    )
+    try:
+        await edit_member(member, **changes, reason=reason)
+    except Forbidden as exc:
+        # Nicknames of members above the bot cannot be edited, but their roles may still be.
+        if "nick" not in changes:
+            raise
+        logger.error(f"Exception whe trying to edit the nick-name of the user: {exc}")
+        if "roles" not in changes:
+            return False
+        await edit_member(member, roles=changes["roles"], reason=reason)
+    return True
@@ -1,39 +1,245 @@
 import asyncio
+import heapq
+import itertools
 import logging
+import time
 from datetime import datetime
-from typing import Coroutine
+from enum import Enum
+from typing import Awaitable, Callable, Hashable, Iterable
+
+from src.core import settings
+from src.helpers.cache import MISSING, TTLCache
+from src.metrics import scheduled_jobs_deduplicated, scheduled_jobs_finished
 
 logger = logging.getLogger(__name__)
 
 
-async def schedule(task: Coroutine, run_at: datetime) -> None:
+class _Timer:
+    """A scheduled job. Cancelled timers stay in the heap until they reach its top."""
+
+    __slots__ = ("key", "deadline", "fn", "cancelled")
+
+    def __init__(self, key: Hashable, deadline: float, fn: Callable[[], Awaitable]):
+        self.key = key
+        self.deadline = deadline
+        self.fn = fn
+        self.cancelled = False
+
+
+class TimerService:
     """
-    Schedule an "Awaitable" for future execution, i.e. an async function.
+    Runs jobs at a given time, e.g. unbans and unmutes, from a single task.
+
+    Timers are kept in a min-heap by deadline, and one task sleeps until the nearest deadline, instead of parking a
+    sleeping coroutine per job. Scheduling is O(log n). Cancelling marks the timer, which is dropped once it reaches
+    the top of the heap, or when cancelled timers make up most of it. Every timer has a key, and scheduling a key
+    again replaces its timer.
 
-    For example to schedule foo(1, 2) 421337 seconds into the future:
-    await schedule(foo(1, 2), at=(dt.datetime.now() + dt.timedelta(seconds=421337)))
+    Timers live in memory only: jobs backed by the database are picked up again by `ScheduledTasks` after a restart.
     """
-    now = datetime.now()
-    delay = int((run_at - now).total_seconds())
-    if delay < 0:
-        logger.debug(
-            "Target execution is in the past. Setting sleep timer to 0.",
-            extra={
-                "target_exec": repr(run_at),
-                "current_time": repr(now),
-            },
-        )
-        await task
-        return
-
-    logger.debug(
-        f"Task {task.__name__} will run after {delay} seconds.",
-        extra={
-            "target_exec": repr(run_at),
-            "current_time": repr(now),
-        },
-    )
-
-    await asyncio.sleep(delay)
-    await task
-    return
+
+    def __init__(self):
+        self._heap: list[tuple[float, int, _Timer]] = []
+        self._timers: dict[Hashable, _Timer] = {}
+        # Breaks deadline ties in scheduling order, so timers themselves are never compared.
+        self._counter = itertools.count()
+        self._wakeup: asyncio.Event | None = None
+        self._runner: asyncio.Task | None = None
+        self._running: set[asyncio.Task] = set()
+
+    def schedule(self, key: Hashable, run_at: datetime, fn: Callable[[], Awaitable]) -> None:
+        """
+        Run `fn()` at `run_at`, or right away if it is in the past.
+
+        For example, to unban a member at the end of their ban:
+        timer_service.schedule(("unban", ban.id), run_at, lambda: unban_member(guild, member))
+        """
+        self.cancel(key)
+        timer = _Timer(key, run_at.timestamp(), fn)
+        self._timers[key] = timer
+        heapq.heappush(self._heap, (timer.deadline, next(self._counter), timer))
+        logger.debug(f"Scheduled job {key} at {run_at}.", extra={"pending": len(self._timers)})
+
+        self._ensure_runner()
+        if self._heap[0][2] is timer:
+            # The new timer is the nearest, so the runner must wake up earlier than it planned to.
+            self._wakeup.set()
+
+    def cancel(self, key: Hashable) -> bool:
+        """Cancel the timer of a key. Returns whether one was pending."""
+        timer = self._timers.pop(key, None)
+        if timer is None:
+            return False
+        timer.cancelled = True
+        if len(self._heap) > 2 * len(self._timers) + 64:
+            # Mostly cancelled timers left, e.g. after many reschedules, so the heap is rebuilt with the live ones.
+            self._heap = [entry for entry in self._heap if not entry[2].cancelled]
+            heapq.heapify(self._heap)
+        return True
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._timers
+
+    def __len__(self) -> int:
+        """The number of pending timers."""
+        return len(self._timers)
+
+    def next_deadline(self) -> datetime | None:
+        """The time the next job is due, or None if no timer is pending."""
+        self._drop_cancelled()
+        return datetime.fromtimestamp(self._heap[0][0]) if self._heap else None
+
+    def _drop_cancelled(self) -> None:
+        while self._heap and self._heap[0][2].cancelled:
+            heapq.heappop(self._heap)
+
+    def _ensure_runner(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._runner is None or self._runner.done() or self._runner.get_loop() is not loop:
+            self._wakeup = asyncio.Event()
+            self._runner = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            self._drop_cancelled()
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, _, timer = heapq.heappop(self._heap)
+            del self._timers[timer.key]
+            task = asyncio.create_task(self._fire(timer))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    @staticmethod
+    async def _fire(timer: _Timer) -> None:
+        logger.debug(f"Running scheduled job {timer.key}.")
+        try:
+            await timer.fn()
+        except Exception as exc:
+            logger.error(f"Scheduled job {timer.key} failed.", exc_info=exc)
+
+    async def stop(self) -> None:
+        """Stop running timers. Pending timers are dropped."""
+        if self._runner is not None:
+            self._runner.cancel()
+            await asyncio.gather(self._runner, return_exceptions=True)
+            self._runner = None
+        self._heap.clear()
+        self._timers.clear()
+
+
+class JobState(Enum):
+    """The states of a job in the `JobRegistry`."""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class JobRegistry:
+    """
+    Tracks the jobs of database records, e.g. the unban of a ban, by (kind, record ID).
+
+    Scheduling a job for a record that already has one pending, running or recently finished is a no-op, so the
+    periodic passes over due records only schedule the new ones. Finished jobs are remembered for `retention` seconds:
+    a failed job is retried by the first pass after that, and a done one should no longer be due by then.
+
+    Args:
+        timers (TimerService): The timer service the jobs run on.
+        retention (float): How long finished jobs are remembered, in seconds.
+        max_size (int): The maximum number of finished jobs remembered.
+    """
+
+    def __init__(self, timers: TimerService, retention: float, max_size: int):
+        self.timers = timers
+        self._active: dict[tuple[str, int], JobState] = {}
+        self._finished = TTLCache("scheduled_jobs", ttl=retention, max_size=max_size)
+
+    def state(self, kind: str, record_id: int) -> JobState | None:
+        """The state of the job of a record, or None if it has none."""
+        key = (kind, record_id)
+        state = self._active.get(key)
+        if state is None:
+            state = self._finished.get(key)
+        return None if state is MISSING else state
+
+    def schedule(
+        self, kind: str, record_id: int, run_at: datetime, fn: Callable[[], Awaitable], replace: bool = False
+    ) -> bool:
+        """
+        Run `fn()` at `run_at` as the job of a record, unless it already has one. Returns whether it was scheduled.
+
+        With `replace`, e.g. when a ban is disputed and gets a new end, a pending job is rescheduled and a finished
+        one runs again. A running job is never replaced.
+        """
+        key = (kind, record_id)
+        state = self.state(kind, record_id)
+        if state is JobState.RUNNING or (state is not None and not replace):
+            scheduled_jobs_deduplicated.labels(kind).inc()
+            return False
+
+        self._finished.invalidate(key)
+        self._active[key] = JobState.PENDING
+        self.timers.schedule(key, run_at, lambda: self._run(key, fn))
+        return True
+
+    def cancel(self, kind: str, record_id: int) -> bool:
+        """Cancel the pending job of a record. Returns whether one was pending."""
+        key = (kind, record_id)
+        if self._active.get(key) is not JobState.PENDING:
+            return False
+        del self._active[key]
+        return self.timers.cancel(key)
+
+    def claim(self, kind: str, record_ids: Iterable[int]) -> list[int]:
+        """
+        Mark the records that have no job as running, so they can be processed outside the timers, e.g. in bulk.
+
+        Returns the IDs of the claimed records. Each of them must be released with `finish`.
+        """
+        claimed = []
+        for record_id in record_ids:
+            if self.state(kind, record_id) is None:
+                self._active[(kind, record_id)] = JobState.RUNNING
+                claimed.append(record_id)
+        return claimed
+
+    def finish(self, kind: str, record_id: int, state: JobState) -> None:
+        """Record that the running job of a record finished, as done or failed."""
+        key = (kind, record_id)
+        self._active.pop(key, None)
+        self._finished.set(key, state)
+        scheduled_jobs_finished.labels(kind, state.value).inc()
+
+    def __len__(self) -> int:
+        """The number of pending and running jobs."""
+        return len(self._active)
+
+    async def _run(self, key: tuple[str, int], fn: Callable[[], Awaitable]) -> None:
+        self._active[key] = JobState.RUNNING
+        state = JobState.FAILED
+        try:
+            await fn()
+            state = JobState.DONE
+        except Exception as exc:
+            logger.error(f"Job {key} failed, it will be retried by a later pass.", exc_info=exc)
+        finally:
+            self.finish(*key, state)
+
+
+timer_service = TimerService()
+job_registry = JobRegistry(
+    timer_service, retention=settings.SCHEDULED_JOB_RETENTION, max_size=settings.SCHEDULED_JOB_MAX_SIZE
+)
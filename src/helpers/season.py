@@ -0,0 +1,126 @@
+"""Helper methods to cache the season tiers of HTB users and track the active season."""
+import logging
+import random
+from datetime import datetime
+
+from discord import Bot
+from sqlalchemy import select
+
+from src.core import settings
+from src.database.models import HtbDiscordLink, Season
+from src.database.session import AsyncSessionLocal
+from src.helpers.cache import TTLCache
+from src.helpers.htb_api import SEASON_ENDPOINT, htb_api
+
+logger = logging.getLogger(__name__)
+
+# Maps an HTB user ID to their tier in the active season, or to None if they are unranked.
+season_rank_cache = TTLCache(
+    "season_rank", ttl=settings.SEASON_RANK_CACHE_TTL, max_size=settings.SEASON_RANK_CACHE_MAX_SIZE
+)
+
+_current_season_id: int | None = None
+# Whether the season roles members hold were assigned in the active season, i.e. it did not change while the bot was
+# down. Only then may they seed the season rank cache.
+_roles_match_season = False
+
+
+def set_current_season(season_id: int) -> None:
+    """Set the active season, dropping all cached tiers if it changed."""
+    global _current_season_id
+
+    if season_id == _current_season_id:
+        return
+
+    if _current_season_id is not None:
+        logger.info(
+            f"Season changed from {_current_season_id} to {season_id}. Flushing {len(season_rank_cache)} "
+            f"cached season ranks."
+        )
+        season_rank_cache.clear()
+    _current_season_id = season_id
+
+
+async def get_active_season_id() -> int | None:
+    """Get the ID of the active season from HTB."""
+    headers = {"Authorization": f"Bearer {settings.HTB_API_KEY}"}
+    r = await htb_api.get(f"{settings.API_V4_URL}/season/list", headers=headers, endpoint=SEASON_ENDPOINT)
+    if r.status != 200 or not r.data:
+        logger.error(f"Non-OK HTTP status code returned from season list: {r.status}.")
+        return None
+
+    for season in r.data.get("data") or []:
+        if season.get("active"):
+            return int(season["id"])
+    return None
+
+
+async def get_last_seen_season_id() -> int | None:
+    """Get the ID of the season the bot last saw active, before it was (re)started."""
+    async with AsyncSessionLocal() as session:
+        return await session.scalar(select(Season.id).order_by(Season.detected_at.desc()).limit(1))
+
+
+async def save_season_id(season_id: int) -> None:
+    """Remember `season_id` as the season last seen active."""
+    async with AsyncSessionLocal() as session:
+        await session.merge(Season(id=season_id, detected_at=datetime.utcnow()))
+        await session.commit()
+
+
+async def refresh_current_season() -> None:
+    """Track the active season, either from the configuration or by probing HTB."""
+    global _roles_match_season
+
+    season_id = settings.CURRENT_SEASON_ID or await get_active_season_id()
+    if season_id is None or season_id == _current_season_id:
+        return
+
+    if _current_season_id is None:
+        # First probe since the start: compare with the season seen before the restart, as the cache is empty.
+        last_seen_id = await get_last_seen_season_id()
+        _roles_match_season = season_id == last_seen_id
+        if not _roles_match_season:
+            logger.info(f"Season changed from {last_seen_id} to {season_id} while the bot was down.")
+    else:
+        last_seen_id = _current_season_id
+        _roles_match_season = False
+    if season_id != last_seen_id:
+        await save_season_id(season_id)
+    set_current_season(season_id)
+
+
+async def warm_up_season_ranks(bot: Bot) -> int:
+    """
+    Seed the season rank cache from the season roles linked members already hold, without calling HTB.
+
+    The roles were assigned by earlier verifications, so they are the best guess of the current tier until the
+    entry expires. Expiry times are spread over the TTL, so refreshes do not all land at once after a restart. Nothing
+    is seeded unless the active season is known to be the one the roles were assigned in.
+    """
+    if not _roles_match_season:
+        logger.info("Skipping the season rank warm-up, member roles may be from a previous season.")
+        return 0
+
+    tiers_by_role = settings.role_resolver.season_tier_by_role_id
+    guilds = [guild for guild_id in settings.guild_ids if (guild := bot.get_guild(guild_id))]
+
+    warmed_up = 0
+    async with AsyncSessionLocal() as session:
+        stmt = select(HtbDiscordLink.discord_user_id, HtbDiscordLink.htb_user_id)
+        result = await session.stream(stmt)
+        async for discord_user_id, htb_user_id in result:
+            member = next((m for guild in guilds if (m := guild.get_member(int(discord_user_id)))), None)
+            if member is None:
+                continue
+
+            tier = next((tiers_by_role[role.id] for role in member.roles if role.id in tiers_by_role), None)
+            if tier is None:
+                continue
+
+            ttl = random.uniform(0.5, 1) * season_rank_cache.ttl
+            season_rank_cache.set(int(htb_user_id), tier, ttl=ttl)
+            warmed_up += 1
+
+    logger.info(f"Warmed up {warmed_up} season ranks from member roles.")
+    return warmed_up
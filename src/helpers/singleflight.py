@@ -0,0 +1,46 @@
+"""Coalescing of concurrent, identical calls into a single in-flight execution."""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+from src.metrics import singleflight_calls, singleflight_deduplicated
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time; concurrent callers with the same key share its result.
+
+    The shared call runs in its own task, so a caller being cancelled does not cancel it for the others.
+
+    Args:
+        name (str): The name of the group, used as the label of the dedup metrics.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._in_flight: dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Await `fn()`, or the already in-flight call for `key` if there is one."""
+        singleflight_calls.labels(self.name).inc()
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._forget(key, task))
+        else:
+            logger.debug(f"Joining in-flight {self.name} call for key {key}.")
+            singleflight_deduplicated.labels(self.name).inc()
+
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
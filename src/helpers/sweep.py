@@ -0,0 +1,232 @@
+"""Admin-triggered re-verification of every HTB Discord link, checkpointed so it survives restarts."""
+import asyncio
+import logging
+import time
+from contextlib import suppress
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, update
+
+from src.bot import Bot
+from src.core import settings
+from src.database.models import HtbDiscordLink, ReverificationSweep
+from src.database.session import AsyncSessionLocal
+from src.helpers.htb_api import IDENTIFIER_ENDPOINT, htb_api
+from src.helpers.links import mark_htb_discord_link_verified
+from src.helpers.verification import get_user_details, process_identification
+from src.helpers.verification_queue import Priority, verification_queue
+
+logger = logging.getLogger(__name__)
+
+
+class SweepAlreadyRunningError(Exception):
+    """Raised when a sweep is started while another one is running."""
+
+    def __init__(self, sweep: ReverificationSweep):
+        super().__init__(f"Sweep {sweep.id} is already running.")
+        self.sweep = sweep
+
+
+class ReverificationSweeper:
+    """
+    Re-verifies every HTB Discord link in ID order, at no more than `rate` links per second.
+
+    Links are read in keyset-paginated chunks (`id > last_link_id ORDER BY id`), so every chunk is a primary key range
+    scan however far the sweep has progressed. Verifications run on the shared verification queue in the lowest lane,
+    so they never hold up members identifying themselves. Progress is checkpointed after each chunk, and an
+    interrupted sweep is picked up again by `resume`, redoing at most one chunk. A sweep that crashes is logged and
+    finished with its error, rather than resumed into the same failure.
+
+    Args:
+        bot (Bot): The bot, used to find the members of the swept links.
+        rate (float): The maximum number of links submitted per second.
+        chunk_size (int): The number of links read, and verified, between checkpoints.
+    """
+
+    def __init__(self, bot: Bot, rate: float = None, chunk_size: int = None):
+        self.bot = bot
+        self.rate = rate or settings.REVERIFY_SWEEP_RATE
+        self.chunk_size = chunk_size or settings.REVERIFY_SWEEP_CHUNK_SIZE
+        self.sweep: ReverificationSweep | None = None
+        self._task: asyncio.Task | None = None
+        self._failure: asyncio.Task | None = None
+        self._run_started_at = 0.0
+        self._run_processed = 0
+
+    @property
+    def running(self) -> bool:
+        """Whether a sweep is in progress."""
+        return self._task is not None and not self._task.done()
+
+    async def start(self, moderator_id: int) -> ReverificationSweep:
+        """Start a new sweep over all links. Raises SweepAlreadyRunningError while a sweep is running."""
+        if self.running:
+            raise SweepAlreadyRunningError(self.sweep)
+
+        async with AsyncSessionLocal() as session:
+            total = await session.scalar(select(func.count(HtbDiscordLink.id)))
+            sweep = ReverificationSweep(
+                moderator_id=moderator_id, last_link_id=0, processed=0, failed=0, total=total, cancelled=False,
+                started_at=datetime.utcnow(),
+            )
+            session.add(sweep)
+            await session.commit()
+
+        logger.info(f"Starting re-verification sweep {sweep.id} of {total} links.")
+        self._launch(sweep)
+        return sweep
+
+    async def resume(self) -> ReverificationSweep | None:
+        """Resume the unfinished sweep, if any, from its last checkpoint."""
+        if self.running:
+            return self.sweep
+
+        async with AsyncSessionLocal() as session:
+            stmt = (
+                select(ReverificationSweep)
+                .where(ReverificationSweep.finished_at.is_(None))
+                .order_by(ReverificationSweep.id.desc())
+                .limit(1)
+            )
+            result = await session.scalars(stmt)
+            sweep = result.first()
+
+        if sweep is not None:
+            logger.info(f"Resuming re-verification sweep {sweep.id} after link {sweep.last_link_id}.")
+            self._launch(sweep)
+        return sweep
+
+    async def stop(self) -> ReverificationSweep | None:
+        """Stop the running sweep for good. Links already queued are still verified."""
+        if not self.running:
+            return None
+
+        self._task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._task
+        await self._finish(self.sweep, cancelled=True)
+        logger.info(f"Stopped re-verification sweep {self.sweep.id} after {self.sweep.processed} links.")
+        return self.sweep
+
+    def suspend(self) -> None:
+        """Stop the running sweep without finishing it, so it is resumed on the next start."""
+        if self.running:
+            self._task.cancel()
+
+    async def latest(self) -> ReverificationSweep | None:
+        """Get the running sweep, or else the most recent one."""
+        if self.running:
+            return self.sweep
+
+        async with AsyncSessionLocal() as session:
+            stmt = select(ReverificationSweep).order_by(ReverificationSweep.id.desc()).limit(1)
+            result = await session.scalars(stmt)
+            return result.first()
+
+    def eta(self) -> timedelta | None:
+        """Estimate the time left for the running sweep from its throughput so far."""
+        if not self.running:
+            return None
+
+        remaining = max(self.sweep.total - self.sweep.processed, 0)
+        elapsed = time.monotonic() - self._run_started_at
+        rate = self._run_processed / elapsed if self._run_processed and elapsed else self.rate
+        return timedelta(seconds=round(remaining / rate))
+
+    def _launch(self, sweep: ReverificationSweep) -> None:
+        self.sweep = sweep
+        self._run_started_at = time.monotonic()
+        self._run_processed = 0
+        self._task = asyncio.create_task(self._run(sweep))
+        self._task.add_done_callback(lambda task: self._on_done(task, sweep))
+
+    def _on_done(self, task: asyncio.Task, sweep: ReverificationSweep) -> None:
+        if task.cancelled() or task.exception() is None:
+            return
+
+        exc = task.exception()
+        logger.error(f"Re-verification sweep {sweep.id} failed after {sweep.processed} links.", exc_info=exc)
+        self._failure = asyncio.create_task(self._fail(sweep, exc))
+
+    async def _fail(self, sweep: ReverificationSweep, exc: BaseException) -> None:
+        error = (str(exc) or type(exc).__name__)[:255]
+        try:
+            await self._update(sweep, {"cancelled": False, "finished_at": datetime.utcnow(), "error": error})
+        except Exception as update_exc:
+            # The sweep stays unfinished, so it is resumed on the next start.
+            logger.error(f"Could not mark re-verification sweep {sweep.id} as failed.", exc_info=update_exc)
+
+    async def _run(self, sweep: ReverificationSweep) -> None:
+        interval = 1 / self.rate
+        while links := await self._fetch_chunk(sweep.last_link_id):
+            futures = []
+            for link in links:
+                # While HTB is unavailable the sweep waits, rather than burning through links that cannot be verified.
+                while retry_after := htb_api.retry_after(IDENTIFIER_ENDPOINT):
+                    logger.debug(f"HTB API unavailable, pausing sweep {sweep.id} for {retry_after:.1f}s.")
+                    await asyncio.sleep(retry_after)
+                futures.append(
+                    verification_queue.submit(
+                        link.discord_user_id_as_int, lambda link=link: self._verify_link(link), Priority.SWEEP
+                    )
+                )
+                await asyncio.sleep(interval)
+
+            # Shielded, since a queued job may be shared with another submitter that must not see it cancelled.
+            results = await asyncio.gather(*(asyncio.shield(future) for future in futures), return_exceptions=True)
+            failed = sum(1 for result in results if result is False or isinstance(result, Exception))
+            await self._checkpoint(sweep, links[-1].id, len(links), failed)
+            self._run_processed += len(links)
+
+        await self._finish(sweep, cancelled=False)
+        logger.info(
+            f"Finished re-verification sweep {sweep.id}: {sweep.processed} links processed, {sweep.failed} failed."
+        )
+
+    async def _fetch_chunk(self, after_link_id: int) -> list[HtbDiscordLink]:
+        async with AsyncSessionLocal() as session:
+            stmt = (
+                select(HtbDiscordLink)
+                .where(HtbDiscordLink.id > after_link_id)
+                .order_by(HtbDiscordLink.id)
+                .limit(self.chunk_size)
+            )
+            result = await session.scalars(stmt)
+            return list(result.all())
+
+    async def _verify_link(self, link: HtbDiscordLink) -> bool:
+        """Re-verify the member of a link. Returns False if the link could not be verified."""
+        member = self.bot.get_cached_member(link.discord_user_id_as_int)
+        if member is None:
+            # Members that left are re-verified when they join again.
+            return True
+
+        htb_details = await get_user_details(link.account_identifier)
+        await mark_htb_discord_link_verified(link)
+        if htb_details is None:
+            logger.debug(f"Could not retrieve user details of link {link.id} during the sweep.")
+            return False
+
+        await process_identification(htb_details, user=member, bot=self.bot)
+        return True
+
+    async def _checkpoint(self, sweep: ReverificationSweep, last_link_id: int, processed: int, failed: int) -> None:
+        values = {
+            "last_link_id": last_link_id,
+            "processed": sweep.processed + processed,
+            "failed": sweep.failed + failed,
+        }
+        await self._update(sweep, values)
+
+    async def _finish(self, sweep: ReverificationSweep, cancelled: bool) -> None:
+        await self._update(sweep, {"cancelled": cancelled, "finished_at": datetime.utcnow()})
+
+    @staticmethod
+    async def _update(sweep: ReverificationSweep, values: dict) -> None:
+        async with AsyncSessionLocal() as session:
+            await session.execute(update(ReverificationSweep).where(ReverificationSweep.id == sweep.id).values(values))
+            await session.commit()
+
+        # Keep the in-memory instance in sync with the database.
+        for key, value in values.items():
+            setattr(sweep, key, value)
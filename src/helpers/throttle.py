@@ -0,0 +1,98 @@
+"""Rate limiting for gateway event listeners, which `commands.cooldown` does not apply to."""
+import time
+from collections import OrderedDict, deque
+
+from src.metrics import join_flood_active, reverifications_suppressed
+
+
+class ListenerCooldown:
+    """
+    A fixed-window cooldown per key (usually a Discord user ID) for an event listener.
+
+    Buckets are kept in a least-recently-used map bounded by `max_size`, so memory stays constant no matter how many
+    distinct users trigger the event. Evicting a bucket merely allows that user's next event through early.
+
+    Args:
+        event (str): The name of the event, used as the label of the suppression metric.
+        rate (int): The number of events allowed per window.
+        per (float): The length of the window, in seconds.
+        max_size (int): The maximum number of buckets kept in memory.
+    """
+
+    def __init__(self, event: str, rate: int, per: float, max_size: int):
+        self.event = event
+        self.rate = rate
+        self.per = per
+        self.max_size = max_size
+        self._buckets: OrderedDict[int, tuple[float, int]] = OrderedDict()
+
+    def is_allowed(self, key: int) -> bool:
+        """Record an event for `key` and return whether it should be processed."""
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+
+        if bucket is None or now - bucket[0] >= self.per:
+            self._buckets[key] = (now, 1)
+        elif bucket[1] < self.rate:
+            self._buckets[key] = (bucket[0], bucket[1] + 1)
+        else:
+            reverifications_suppressed.labels(self.event).inc()
+            return False
+
+        self._buckets.move_to_end(key)
+        if len(self._buckets) > self.max_size:
+            self._buckets.popitem(last=False)
+        return True
+
+    def reset(self, key: int) -> None:
+        """Forget the bucket of `key`, allowing its next event through."""
+        self._buckets.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class JoinFloodDetector:
+    """
+    Detects join floods, e.g. raids or big CTF launches, from the number of joins over a sliding window.
+
+    A flood starts once `threshold` joins happened within the last `window` seconds, and only ends once the count
+    drops below half the threshold, so a rate hovering around the threshold does not flap in and out of flood mode.
+
+    Args:
+        threshold (int): The number of joins within the window at which a flood starts.
+        window (float): The length of the sliding window, in seconds.
+    """
+
+    def __init__(self, threshold: int, window: float):
+        self.threshold = threshold
+        self.window = window
+        self.started_at: float | None = None
+        # The number of joins in the current flood, including those that started it.
+        self.joins = 0
+        self._timestamps: deque[float] = deque()
+
+    def record(self) -> bool:
+        """Record a join and return whether it is part of a flood."""
+        was_flooding = self.started_at is not None
+        self._timestamps.append(time.monotonic())
+        flooding = self.is_flooding()
+        # The join starting a flood is already counted with the others in the window.
+        if flooding and was_flooding:
+            self.joins += 1
+        return flooding
+
+    def is_flooding(self) -> bool:
+        """Whether a flood is ongoing."""
+        now = time.monotonic()
+        while self._timestamps and now - self._timestamps[0] > self.window:
+            self._timestamps.popleft()
+
+        if self.started_at is None and len(self._timestamps) >= self.threshold:
+            self.started_at = now
+            self.joins = len(self._timestamps)
+            join_flood_active.set(1)
+        elif self.started_at is not None and len(self._timestamps) < self.threshold / 2:
+            self.started_at = None
+            join_flood_active.set(0)
+        return self.started_at is not None
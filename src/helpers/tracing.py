@@ -0,0 +1,102 @@
+"""Per-stage timing of the verification pipeline, exported as metrics and sampled to the debug log."""
+import asyncio
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from src.core import settings
+from src.helpers.circuit_breaker import CircuitOpenError
+from src.metrics import verification_stage_duration
+
+logger = logging.getLogger(__name__)
+
+
+class Stage:
+    """A running stage. Set `outcome` to label the observation, e.g. "cached" or "not_found"."""
+
+    __slots__ = ("name", "outcome")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.outcome = "ok"
+
+
+class VerificationTrace:
+    """The timings of the stages of a single verification."""
+
+    __slots__ = ("kind", "subject", "started_at", "stages")
+
+    def __init__(self, kind: str, subject: int):
+        self.kind = kind
+        self.subject = subject
+        self.started_at = time.perf_counter()
+        self.stages: list[tuple[str, float, str]] = []
+
+    def log(self) -> None:
+        """Write the timing breakdown to the debug log."""
+        total = time.perf_counter() - self.started_at
+        breakdown = ", ".join(f"{name}={elapsed * 1000:.0f}ms ({outcome})" for name, elapsed, outcome in self.stages)
+        logger.debug(
+            f"{self.kind.capitalize()} of {self.subject} took {total * 1000:.0f}ms: {breakdown or 'no stages'}.",
+            extra={"stages": self.stages, "total": total},
+        )
+
+
+# The trace of the verification being processed, if it was sampled. Tasks started by a verification inherit it.
+_current_trace: ContextVar[VerificationTrace | None] = ContextVar("verification_trace", default=None)
+
+
+@contextmanager
+def trace_verification(kind: str, subject: int) -> Iterator[None]:
+    """
+    Sample the verification run in this block, logging its stage breakdown at the end.
+
+    Blocks nested in a sampled verification, e.g. the identification at the end of a re-verification, add their stages
+    to the outer trace. Only a `VERIFICATION_TRACE_SAMPLE_RATE` fraction is traced, and nothing is traced unless debug
+    logging is enabled.
+    """
+    if _current_trace.get() is not None:
+        yield
+        return
+    if random.random() >= settings.VERIFICATION_TRACE_SAMPLE_RATE or not logger.isEnabledFor(logging.DEBUG):
+        yield
+        return
+
+    trace = VerificationTrace(kind, subject)
+    token = _current_trace.set(trace)
+    try:
+        yield
+    finally:
+        _current_trace.reset(token)
+        trace.log()
+
+
+def stage_outcome(exc: BaseException) -> str:
+    """The outcome label of a stage that failed with `exc`."""
+    if isinstance(exc, asyncio.TimeoutError):
+        return "timeout"
+    if isinstance(exc, asyncio.CancelledError):
+        return "cancelled"
+    if isinstance(exc, CircuitOpenError):
+        return "circuit_open"
+    return "error"
+
+
+@contextmanager
+def stage(name: str) -> Iterator[Stage]:
+    """Time a stage of the verification pipeline, labelled with its outcome."""
+    current = Stage(name)
+    started_at = time.perf_counter()
+    try:
+        yield current
+    except BaseException as exc:
+        current.outcome = stage_outcome(exc)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started_at
+        verification_stage_duration.labels(name, current.outcome).observe(elapsed)
+        if (trace := _current_trace.get()) is not None:
+            trace.stages.append((name, elapsed, current.outcome))
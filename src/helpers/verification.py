@@ -1,112 +1,170 @@
+import asyncio
 import logging
 from datetime import datetime
-from typing import Dict, List, Optional, cast
+from typing import Awaitable, Dict, List, Optional, TypeVar, cast
 
-import aiohttp
 import discord
-from discord import Forbidden, Member, Role, User
+from aiohttp import ClientError
+from discord import Member, Role, User
 from discord.ext.commands import GuildNotFound, MemberNotFound
 
 from src.bot import Bot
 from src.core import settings
 from src.helpers.ban import ban_member
+from src.helpers.cache import MISSING, TTLCache
+from src.helpers.htb_api import BAN_ENDPOINT, IDENTIFIER_ENDPOINT, SEASON_ENDPOINT, htb_api
+from src.helpers.roles import reconcile_roles
+from src.helpers.season import season_rank_cache
+from src.helpers.singleflight import SingleFlight
+from src.helpers.tracing import stage, stage_outcome, trace_verification
 
 logger = logging.getLogger(__name__)
 
+# Maps an account identifier to its HTB user details, or to None if the identifier is unknown to HTB.
+user_details_cache = TTLCache(
+    "user_details", ttl=settings.USER_DETAILS_CACHE_TTL, max_size=settings.USER_DETAILS_CACHE_MAX_SIZE
+)
+
+# Concurrent lookups of the same identifier or HTB user share a single request.
+htb_api_flights = SingleFlight("htb_api")
+# Concurrent identifications of the same Discord user and HTB account share a single run, so roles are edited once.
+identification_flights = SingleFlight("identification")
+
+# Returned by `_fetch_or_degrade` when an upstream fetch failed, as None is a valid result of most fetches.
+FETCH_FAILED = object()
+
+T = TypeVar("T")
+
 
 async def get_user_details(account_identifier: str) -> Optional[Dict]:
     """Get user details from HTB."""
+    with stage("user_details") as current:
+        response = user_details_cache.get(account_identifier)
+        if response is not MISSING:
+            current.outcome = "cached"
+            return response
+
+        response = await htb_api_flights.do(
+            ("identifier", account_identifier), lambda: _fetch_user_details(account_identifier)
+        )
+        if response is None:
+            current.outcome = "not_found"
+        return response
+
+
+async def _fetch_user_details(account_identifier: str) -> Optional[Dict]:
     acc_id_url = f"{settings.API_URL}/discord/identifier/{account_identifier}?secret={settings.HTB_API_SECRET}"
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(acc_id_url) as r:
-            if r.status == 200:
-                response = await r.json()
-            elif r.status == 404:
-                logger.debug("Account identifier has been regenerated since last identification. Cannot re-verify.")
-                response = None
-            else:
-                logger.error(f"Non-OK HTTP status code returned from identifier lookup: {r.status}.")
-                response = None
+    r = await htb_api.get(acc_id_url, endpoint=IDENTIFIER_ENDPOINT)
+    if r.status == 200:
+        response = r.data
+        user_details_cache.set(account_identifier, response)
+    elif r.status == 404:
+        logger.debug("Account identifier has been regenerated since last identification. Cannot re-verify.")
+        response = None
+        # Regenerated identifiers never come back, so they are remembered for longer.
+        user_details_cache.set(account_identifier, response, ttl=settings.USER_DETAILS_CACHE_NEGATIVE_TTL)
+    else:
+        logger.error(f"Non-OK HTTP status code returned from identifier lookup: {r.status}.")
+        response = None
 
     return response
 
 
+def invalidate_user_details(account_identifier: str) -> None:
+    """Drop the cached HTB user details of an account identifier, e.g. when a user re-identifies."""
+    user_details_cache.invalidate(account_identifier)
+
+
 async def get_season_rank(htb_uid: int) -> str | None:
     """Get season rank from HTB."""
+    rank = season_rank_cache.get(htb_uid)
+    if rank is not MISSING:
+        return rank
+
+    return await htb_api_flights.do(("season_rank", htb_uid), lambda: _fetch_season_rank(htb_uid))
+
+
+async def _fetch_season_rank(htb_uid: int) -> str | None:
     headers = {"Authorization": f"Bearer {settings.HTB_API_KEY}"}
     season_api_url = f"{settings.API_V4_URL}/season/end/0/{htb_uid}"
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(season_api_url, headers=headers) as r:
-            if r.status == 200:
-                response = await r.json()
-            elif r.status == 404:
-                logger.error("Invalid Season ID.")
-                response = None
-            else:
-                logger.error(f"Non-OK HTTP status code returned from identifier lookup: {r.status}.")
-                response = None
-
-    if not response["data"]:
+    r = await htb_api.get(season_api_url, headers=headers, endpoint=SEASON_ENDPOINT)
+    if r.status == 200:
+        response = r.data
+    elif r.status == 404:
+        logger.error("Invalid Season ID.")
+        return None
+    else:
+        logger.error(f"Non-OK HTTP status code returned from identifier lookup: {r.status}.")
+        return None
+
+    if not response or not response.get("data"):
         rank = None
     else:
         try:
             rank = response["data"]["season"]["tier"]
         except TypeError as exc:
             logger.error("Could not get season rank from HTB.", exc_info=exc)
-            rank = None
+            return None
+
+    # Unranked users may place at any time, so they are checked again sooner.
+    season_rank_cache.set(htb_uid, rank, ttl=None if rank else settings.SEASON_RANK_CACHE_NEGATIVE_TTL)
     return rank
 
 
 async def _check_for_ban(uid: str) -> Optional[Dict]:
-    async with aiohttp.ClientSession() as session:
-        token_url = f"{settings.API_URL}/discord/{uid}/banned?secret={settings.HTB_API_SECRET}"
-        async with session.get(token_url) as r:
-            if r.status == 200:
-                ban_details = await r.json()
-            else:
-                logger.error(
-                    f"Could not fetch ban details for uid {uid}: "
-                    f"non-OK status code returned ({r.status}). Body: {r.content}"
-                )
-                ban_details = None
+    return await htb_api_flights.do(("ban", uid), lambda: _fetch_ban_details(uid))
 
-    return ban_details
 
-async def process_certification(certid: str, name: str):
-    cert_api_url = f"{settings.API_V4_URL}/certificate/lookup"
-    params = {'id': certid, 'name': name}
-    async with aiohttp.ClientSession() as session:
-        async with session.get(cert_api_url, params=params) as r:
-            if r.status == 200:
-                response = await r.json()
-            elif r.status == 404:
-                return False
-            else:
-                logger.error(f"Non-OK HTTP status code returned from identifier lookup: {r.status}.")
-                response = None
-    try:
-        certRawName = response["certificates"][0]["name"]
-    except IndexError:
-        return False
-    if certRawName == "HTB Certified Bug Bounty Hunter":
-        cert = "CBBH"
-    elif certRawName == "HTB Certified Penetration Testing Specialist":
-        cert = "CPTS"
-    elif certRawName == "HTB Certified Defensive Security Analyst":
-        cert = "CDSA"
-    elif certRawName == "HTB Certified Web Exploitation Expert":
-        cert = "CWEE"
+async def _fetch_ban_details(uid: str) -> Optional[Dict]:
+    token_url = f"{settings.API_URL}/discord/{uid}/banned?secret={settings.HTB_API_SECRET}"
+    r = await htb_api.get(token_url, endpoint=BAN_ENDPOINT)
+    if r.status == 200:
+        ban_details = r.data
     else:
-        cert = False
-    return cert
+        logger.error(f"Could not fetch ban details for uid {uid}: non-OK status code returned ({r.status}).")
+        ban_details = None
+
+    return ban_details
+
+
+async def _fetch_or_degrade(fetch: Awaitable[T], what: str, timeout: float) -> T | object:
+    """
+    Await an upstream fetch within `timeout` seconds, returning `FETCH_FAILED` instead of raising on failure.
+
+    The fetch is timed as a verification stage named after `what`, e.g. "season rank" as `season_rank`.
+    """
+    with stage(what.replace(" ", "_")) as current:
+        try:
+            return await asyncio.wait_for(fetch, timeout=timeout)
+        except asyncio.TimeoutError:
+            current.outcome = "timeout"
+            logger.warning(f"Timed out after {timeout}s while fetching {what} from HTB.")
+        except ClientError as exc:
+            current.outcome = stage_outcome(exc)
+            logger.warning(f"Could not fetch {what} from HTB.", exc_info=exc)
+    return FETCH_FAILED
 
 
 async def process_identification(
     htb_user_details: Dict[str, str], user: Optional[Member | User], bot: Bot
 ) -> Optional[List[Role]]:
     """Returns roles to assign if identification was successfully processed."""
+    if user is None:
+        raise GuildNotFound(f"Could not identify member {user} in guild.")
+
+    # Only runs for the same HTB account share a flight, so an /identify with another account is never dropped.
+    key = (user.id, htb_user_details["user_id"])
+    with trace_verification("identification", user.id):
+        return await identification_flights.do(
+            key, lambda: _process_identification(htb_user_details, user=user, bot=bot)
+        )
+
+
+async def _process_identification(
+    htb_user_details: Dict[str, str], user: Optional[Member | User], bot: Bot
+) -> Optional[List[Role]]:
     htb_uid = htb_user_details["user_id"]
     if isinstance(user, Member):
         member = user
@@ -119,8 +177,17 @@ async def process_identification(
             raise MemberNotFound(str(user.id))
     else:
         raise GuildNotFound(f"Could not identify member {user} in guild.")
-    season_rank = await get_season_rank(htb_uid)
-    banned_details = await _check_for_ban(htb_uid)
+    # Both lookups are independent, so they are fetched concurrently.
+    season_rank, banned_details = await asyncio.gather(
+        _fetch_or_degrade(get_season_rank(htb_uid), "season rank", settings.HTB_SEASON_RANK_TIMEOUT),
+        _fetch_or_degrade(_check_for_ban(htb_uid), "ban details", settings.HTB_BAN_CHECK_TIMEOUT),
+    )
+    # Without a season rank the current season role is kept, rather than dropped, until the next verification.
+    keep_season_role = season_rank is FETCH_FAILED
+    if keep_season_role:
+        season_rank = None
+    if banned_details is FETCH_FAILED:
+        banned_details = None
 
     if banned_details is not None and banned_details["banned"]:
         # If user is banned, this field must be a string
@@ -140,81 +207,44 @@ async def process_identification(
         await guild.get_channel(settings.channels.VERIFY_LOGS).send(embed=embed)
         return None
 
+    resolver = settings.role_resolver
     to_remove = []
-
     for role in member.roles:
-        if role.id in settings.role_groups.get("ALL_RANKS") + settings.role_groups.get("ALL_POSITIONS"):
-            to_remove.append(guild.get_role(role.id))
+        if keep_season_role and role.id in resolver.season_role_ids:
+            continue
+        if role.id in resolver.identification_role_ids:
+            to_remove.append(role)
 
     to_assign = []
-    logger.debug(
-        "Getting role 'rank':", extra={
-            "role_id": settings.get_post_or_rank(htb_user_details["rank"]),
-            "role_obj": guild.get_role(settings.get_post_or_rank(htb_user_details["rank"])),
-            "htb_rank": htb_user_details["rank"],
-        }, )
-    if htb_user_details["rank"] not in ["Deleted", "Moderator", "Ambassador", "Admin", "Staff"]:
-        to_assign.append(guild.get_role(settings.get_post_or_rank(htb_user_details["rank"])))
+    rank = htb_user_details["rank"]
+    if rank not in ["Deleted", "Moderator", "Ambassador", "Admin", "Staff"]:
+        rank_role = resolver.resolve(guild, resolver.post_or_rank.get(rank))
+        logger.debug("Getting role 'rank':", extra={"role_obj": rank_role, "htb_rank": rank})
+        to_assign.append(rank_role)
     if season_rank:
-        to_assign.append(guild.get_role(settings.get_season(season_rank)))
+        to_assign.append(resolver.resolve(guild, resolver.season.get(season_rank)))
     if htb_user_details["vip"]:
-        logger.debug(
-            'Getting role "VIP":', extra={"role_id": settings.roles.VIP, "role_obj": guild.get_role(settings.roles.VIP)}
-        )
-        to_assign.append(guild.get_role(settings.roles.VIP))
+        to_assign.append(resolver.resolve(guild, settings.roles.VIP))
     if htb_user_details["dedivip"]:
-        logger.debug(
-            'Getting role "VIP+":',
-            extra={"role_id": settings.roles.VIP_PLUS, "role_obj": guild.get_role(settings.roles.VIP_PLUS)}
-        )
-        to_assign.append(guild.get_role(settings.roles.VIP_PLUS))
+        to_assign.append(resolver.resolve(guild, settings.roles.VIP_PLUS))
     if htb_user_details["hof_position"] != "unranked":
-        position = int(htb_user_details["hof_position"])
-        pos_top = None
-        if position == 1:
-            pos_top = "1"
-        elif position <= 10:
-            pos_top = "10"
-        if pos_top:
-            logger.debug(f"User is Hall of Fame rank {position}. Assigning role Top-{pos_top}...")
-            logger.debug(
-                'Getting role "HoF role":', extra={
-                    "role_id": settings.get_post_or_rank(pos_top),
-                    "role_obj": guild.get_role(settings.get_post_or_rank(pos_top)), "hof_val": pos_top,
-                }, )
-            to_assign.append(guild.get_role(settings.get_post_or_rank(pos_top)))
+        hof_role = resolver.resolve(guild, resolver.hof_role_id(htb_user_details["hof_position"]))
+        if hof_role:
+            logger.debug(f"User is Hall of Fame rank {htb_user_details['hof_position']}. Assigning {hof_role}...")
+            to_assign.append(hof_role)
         else:
-            logger.debug(f"User is position {position}. No Hall of Fame roles for them.")
+            logger.debug(f"User is position {htb_user_details['hof_position']}. No Hall of Fame roles for them.")
     if htb_user_details["machines"]:
-        logger.debug(
-            'Getting role "BOX_CREATOR":',
-            extra={"role_id": settings.roles.BOX_CREATOR, "role_obj": guild.get_role(settings.roles.BOX_CREATOR)}, )
-        to_assign.append(guild.get_role(settings.roles.BOX_CREATOR))
+        to_assign.append(resolver.resolve(guild, settings.roles.BOX_CREATOR))
     if htb_user_details["challenges"]:
-        logger.debug(
-            'Getting role "CHALLENGE_CREATOR":', extra={
-                "role_id": settings.roles.CHALLENGE_CREATOR,
-                "role_obj": guild.get_role(settings.roles.CHALLENGE_CREATOR),
-            }, )
-        to_assign.append(guild.get_role(settings.roles.CHALLENGE_CREATOR))
-
-    if member.nick != htb_user_details["user_name"]:
-        try:
-            await member.edit(nick=htb_user_details["user_name"])
-        except Forbidden as e:
-            logger.error(f"Exception whe trying to edit the nick-name of the user: {e}")
+        to_assign.append(resolver.resolve(guild, settings.roles.CHALLENGE_CREATOR))
 
     logger.debug("All roles to_assign:", extra={"to_assign": to_assign})
     # We don't need to remove any roles that are going to be assigned again
     to_remove = list(set(to_remove) - set(to_assign))
     logger.debug("All roles to_remove:", extra={"to_remove": to_remove})
-    if to_remove:
-        await member.remove_roles(*to_remove, atomic=True)
-    else:
-        logger.debug("No roles need to be removed")
-    if to_assign:
-        await member.add_roles(*to_assign, atomic=True)
-    else:
-        logger.debug("No roles need to be assigned")
+    with stage("member_edit") as current:
+        if not await reconcile_roles(member, add=to_assign, remove=to_remove, nick=htb_user_details["user_name"]):
+            current.outcome = "unchanged"
 
     return to_assign
@@ -0,0 +1,142 @@
+"""A prioritised work queue that runs verifications on a bounded pool of workers."""
+import asyncio
+import itertools
+import logging
+import time
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Hashable
+
+from src.core import settings
+from src.metrics import (
+    verification_queue_deduplicated, verification_queue_depth, verification_queue_processing_time,
+    verification_queue_wait_time
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """Lanes of the verification queue. Lower values are served first."""
+
+    HIGH = 0  # User-initiated, e.g. /identify.
+    NORMAL = 1  # Event-driven, e.g. a member joining.
+    LOW = 2  # Passive refreshes, e.g. a member chatting.
+    SWEEP = 3  # Bulk re-verification of every link, only run when nothing else is waiting.
+
+
+# The lane of the job the current task is running. Work outside the queue, e.g. a moderation command, is interactive.
+current_priority: ContextVar[Priority] = ContextVar("current_priority", default=Priority.HIGH)
+
+
+class _Job:
+    __slots__ = ("priority", "seq", "key", "fn", "future", "enqueued_at", "superseded")
+
+    def __init__(
+        self, priority: Priority, seq: int, key: Hashable, fn: Callable[[], Awaitable[Any]], future: asyncio.Future,
+        enqueued_at: float,
+    ):
+        self.priority = priority
+        self.seq = seq
+        self.key = key
+        self.fn = fn
+        self.future = future
+        self.enqueued_at = enqueued_at
+        self.superseded = False
+
+    def __lt__(self, other: "_Job") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class VerificationQueue:
+    """
+    Runs verification jobs on a fixed number of workers, highest priority first.
+
+    Jobs are deduplicated by key (usually a Discord ID) while they wait: submitting a job for a key that is already
+    queued returns the future of the queued job. If the new job has a higher priority, it replaces the queued one
+    and both callers get its result. Workers are started lazily on the first submission.
+
+    Args:
+        workers (int): The number of jobs processed concurrently.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._queue: asyncio.PriorityQueue[_Job] = asyncio.PriorityQueue()
+        self._queued: dict[Hashable, _Job] = {}
+        self._seq = itertools.count()
+        self._tasks: list[asyncio.Task] = []
+
+    def submit(self, key: Hashable, fn: Callable[[], Awaitable[Any]], priority: Priority) -> asyncio.Future:
+        """Queue `fn()` for `key`, returning a future of its result. The future may be awaited or ignored."""
+        self._start()
+
+        queued = self._queued.get(key)
+        if queued is not None and priority >= queued.priority:
+            verification_queue_deduplicated.labels(priority.name).inc()
+            return queued.future
+
+        if queued is not None:
+            logger.debug(f"Raising queued verification for {key} from {queued.priority.name} to {priority.name}.")
+            verification_queue_deduplicated.labels(queued.priority.name).inc()
+            queued.superseded = True
+            verification_queue_depth.labels(queued.priority.name).dec()
+            future, enqueued_at = queued.future, queued.enqueued_at
+        else:
+            future, enqueued_at = asyncio.get_running_loop().create_future(), time.monotonic()
+            future.add_done_callback(self._retrieve_exception)
+
+        job = _Job(priority, next(self._seq), key, fn, future, enqueued_at)
+        self._queued[key] = job
+        self._queue.put_nowait(job)
+        verification_queue_depth.labels(priority.name).inc()
+        return future
+
+    def __len__(self) -> int:
+        return len(self._queued)
+
+    def _start(self) -> None:
+        self._tasks = [task for task in self._tasks if not task.done()]
+        while len(self._tasks) < self.workers:
+            self._tasks.append(asyncio.create_task(self._work()))
+
+    async def stop(self) -> None:
+        """Stop the workers. Queued jobs are dropped."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    async def _work(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.superseded:
+                    continue
+                del self._queued[job.key]
+                verification_queue_depth.labels(job.priority.name).dec()
+                verification_queue_wait_time.labels(job.priority.name).observe(time.monotonic() - job.enqueued_at)
+
+                token = current_priority.set(job.priority)
+                with verification_queue_processing_time.labels(job.priority.name).time():
+                    try:
+                        result = await job.fn()
+                    except Exception as exc:
+                        if not job.future.done():
+                            job.future.set_exception(exc)
+                    else:
+                        if not job.future.done():
+                            job.future.set_result(result)
+                    finally:
+                        current_priority.reset(token)
+            finally:
+                self._queue.task_done()
+
+    @staticmethod
+    def _retrieve_exception(future: asyncio.Future) -> None:
+        # Most submitters never await their future, so failures are logged here rather than lost.
+        if not future.cancelled() and (exc := future.exception()) is not None:
+            logger.error("Queued verification failed.", exc_info=exc)
+
+
+verification_queue = VerificationQueue(workers=settings.VERIFICATION_WORKERS)
@@ -1,7 +1,76 @@
-from prometheus_client import Counter, make_asgi_app
+from prometheus_client import Counter, Gauge, Histogram, make_asgi_app
 
 received_commands = Counter('commands_received', 'Count number of commands received.', ['command', ])
 completed_commands = Counter('commands_completed', 'Count number of commands completed.', ['command', ])
 errored_commands = Counter('commands_errored', 'Count number of commands errored.', ['command', ])
+command_latency = Histogram(
+    'commands_latency_seconds', 'Time taken to complete commands, in seconds.', ['command', ],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+cache_hits = Counter('cache_hits', 'Count number of cache hits.', ['cache', ])
+cache_misses = Counter('cache_misses', 'Count number of cache misses.', ['cache', ])
+
+reverifications_suppressed = Counter(
+    'reverifications_suppressed', 'Count number of reverifications suppressed by a listener cooldown.', ['event', ]
+)
+
+join_flood_active = Gauge('join_flood_active', 'Whether members are joining faster than the join flood threshold.')
+
+join_flood_deferred = Gauge('join_flood_deferred', 'Number of joined members waiting for a deferred reverification.')
+
+singleflight_calls = Counter(
+    'singleflight_calls', 'Count number of calls made through a single-flight group.', ['group', ]
+)
+singleflight_deduplicated = Counter(
+    'singleflight_deduplicated', 'Count number of calls that joined an in-flight call.', ['group', ]
+)
+
+verification_queue_depth = Gauge(
+    'verification_queue_depth', 'Number of verifications waiting in the queue.', ['lane', ]
+)
+verification_queue_wait_time = Histogram(
+    'verification_queue_wait_seconds', 'Time verifications waited in the queue, in seconds.', ['lane', ],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300),
+)
+verification_queue_processing_time = Histogram(
+    'verification_queue_processing_seconds', 'Time taken to process queued verifications, in seconds.', ['lane', ],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+verification_queue_deduplicated = Counter(
+    'verification_queue_deduplicated', 'Count number of verifications merged into an already queued one.', ['lane', ]
+)
+
+verification_stage_duration = Histogram(
+    'verification_stage_seconds', 'Time taken by each stage of a verification, in seconds.', ['stage', 'outcome', ],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+discord_rate_limit_queued = Gauge(
+    'discord_rate_limit_queued', 'Number of Discord requests waiting for the client-side rate limiter.', ['route', ]
+)
+discord_rate_limit_delayed = Counter(
+    'discord_rate_limit_delayed', 'Count number of Discord requests held back to avoid a 429.', ['route', ]
+)
+discord_rate_limits_received = Counter(
+    'discord_rate_limits_received', 'Count number of 429 responses received from Discord.', ['path', ]
+)
+
+scheduled_jobs_finished = Counter(
+    'scheduled_jobs_finished', 'Count number of scheduled jobs finished, by outcome.', ['kind', 'state', ]
+)
+scheduled_jobs_deduplicated = Counter(
+    'scheduled_jobs_deduplicated', 'Count number of jobs not scheduled again as they already were.', ['kind', ]
+)
+
+circuit_breaker_state = Gauge(
+    'circuit_breaker_state', 'State of a circuit breaker: 0 closed, 1 half-open, 2 open.', ['breaker', ]
+)
+circuit_breaker_transitions = Counter(
+    'circuit_breaker_transitions', 'Count number of circuit breaker state transitions.', ['breaker', 'state', ]
+)
+circuit_breaker_rejected = Counter(
+    'circuit_breaker_rejected', 'Count number of calls rejected by an open circuit breaker.', ['breaker', ]
+)
 
 metrics_app = make_asgi_app()
@@ -1,9 +1,10 @@
 from discord import Bot
 
 from src.webhooks.handlers.academy import handler as academy_handler
+from src.webhooks.handlers.mp import handler as mp_handler
 from src.webhooks.types import Platform, WebhookBody
 
-handlers = {Platform.ACADEMY: academy_handler}
+handlers = {Platform.ACADEMY: academy_handler, Platform.MAIN: mp_handler}
 
 
 def can_handle(platform: Platform) -> bool:
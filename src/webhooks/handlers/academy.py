@@ -5,6 +5,7 @@ from discord.errors import NotFound
 from fastapi import HTTPException
 
 from src.core import settings
+from src.helpers.roles import reconcile_roles
 from src.webhooks.types import WebhookBody, WebhookEvent
 
 logger = logging.getLogger(__name__)
@@ -29,7 +30,7 @@ async def handler(body: WebhookBody, bot: Bot) -> dict:
         HTTPException: If an error occurs while processing the webhook event.
     """
     # TODO: Change it here so we pass the guild instead of the bot  # noqa: T000
-    guild = await bot.fetch_guild(settings.guild_ids[0])
+    guild = bot.get_guild(settings.guild_ids[0]) or await bot.fetch_guild(settings.guild_ids[0])
 
     try:
         discord_id = int(body.data["discord_id"])
@@ -41,34 +42,25 @@ async def handler(body: WebhookBody, bot: Bot) -> dict:
         logger.debug("User is not in the Discord server", exc_info=exc)
         raise HTTPException(status_code=400, detail="User is not in the Discord server") from exc
 
+    resolver = settings.role_resolver
     if body.event == WebhookEvent.ACCOUNT_LINKED:
-        roles_to_add = {settings.roles.ACADEMY_USER}
-        roles_to_add.update(settings.get_academy_cert_role(cert["id"]) for cert in body.data["certifications"])
+        role_ids_to_add = [settings.roles.ACADEMY_USER]
+        role_ids_to_add.extend(resolver.academy_cert.get(cert["id"]) for cert in body.data["certifications"])
 
-        # Filter out invalid role IDs
-        role_ids_to_add = {role_id for role_id in roles_to_add if role_id is not None}
-        roles_to_add = {guild.get_role(role_id) for role_id in role_ids_to_add}
-
-        await member.add_roles(*roles_to_add, atomic=True)
+        await reconcile_roles(member, add=resolver.resolve_many(guild, role_ids_to_add))
     elif body.event == WebhookEvent.CERTIFICATE_AWARDED:
         cert_id = body.data["certification"]["id"]
 
-        role = settings.get_academy_cert_role(cert_id)
+        role = resolver.academy_cert.get(cert_id)
         if not role:
             logger.debug(f"Role for certification: {cert_id} does not exist")
             raise HTTPException(status_code=400, detail=f"Role for certification: {cert_id} does not exist")
 
-        await member.add_roles(role, atomic=True)
+        await reconcile_roles(member, add=[resolver.resolve(guild, role)])
     elif body.event == WebhookEvent.ACCOUNT_UNLINKED:
-        current_role_ids = {role.id for role in member.roles}
-        cert_role_ids = {settings.get_academy_cert_role(cert_id) for _, cert_id in settings.academy_certificates}
-
-        common_role_ids = current_role_ids.intersection(cert_role_ids)
-
-        role_ids_to_remove = {settings.roles.ACADEMY_USER}.union(common_role_ids)
-        roles_to_remove = {guild.get_role(role_id) for role_id in role_ids_to_remove}
+        role_ids_to_remove = resolver.academy_cert_role_ids | {settings.roles.ACADEMY_USER}
 
-        await member.remove_roles(*roles_to_remove, atomic=True)
+        await reconcile_roles(member, remove=resolver.resolve_many(guild, role_ids_to_remove))
     else:
         logger.debug(f"Event {body.event} not implemented")
         raise HTTPException(status_code=501, detail=f"Event {body.event} not implemented")
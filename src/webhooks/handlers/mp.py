@@ -0,0 +1,78 @@
+import logging
+
+from discord import Bot
+from discord.errors import NotFound
+from fastapi import HTTPException
+
+from src.core import settings
+from src.helpers.links import get_htb_discord_link
+from src.helpers.roles import reconcile_roles
+from src.helpers.verification import invalidate_user_details
+from src.webhooks.types import WebhookBody, WebhookEvent
+
+logger = logging.getLogger(__name__)
+
+
+async def handler(body: WebhookBody, bot: Bot) -> dict:
+    """
+    Handles incoming main platform webhook events and performs actions accordingly.
+
+    Rank, Hall of Fame, subscription and name changes are pushed by HTB as they happen, so the affected role (or
+    nickname) is updated directly instead of waiting for the member to be re-verified. Event data uses the same
+    field names as the HTB user details: `rank`, `hof_position`, `vip`, `dedivip` and `user_name`.
+
+    Args:
+        body (WebhookBody): The data received from the webhook.
+        bot (Bot): The instance of the Discord bot.
+
+    Returns:
+        dict: A dictionary with a "success" key indicating whether the operation was successful.
+
+    Raises:
+        HTTPException: If an error occurs while processing the webhook event.
+    """
+    guild = bot.get_guild(settings.guild_ids[0]) or await bot.fetch_guild(settings.guild_ids[0])
+
+    try:
+        discord_id = int(body.data["discord_id"])
+        member = guild.get_member(discord_id) or await guild.fetch_member(discord_id)
+    except ValueError as exc:
+        logger.debug("Invalid Discord ID", exc_info=exc)
+        raise HTTPException(status_code=400, detail="Invalid Discord ID") from exc
+    except NotFound as exc:
+        logger.debug("User is not in the Discord server", exc_info=exc)
+        raise HTTPException(status_code=400, detail="User is not in the Discord server") from exc
+
+    resolver = settings.role_resolver
+    if body.event == WebhookEvent.RANK_UP:
+        rank = body.data["rank"]
+        # Staff ranks have no rank role, so the member only loses their previous one.
+        new_role = resolver.resolve(guild, resolver.post_or_rank[rank]) if rank in resolver.RANKS else None
+        rank_roles = resolver.resolve_many(guild, resolver.rank_role_ids)
+
+        await reconcile_roles(member, add=[new_role], remove=rank_roles)
+    elif body.event == WebhookEvent.HOF_CHANGE:
+        hof_roles = resolver.resolve_many(guild, resolver.groups["ALL_POSITIONS"])
+        new_role = resolver.resolve(guild, resolver.hof_role_id(body.data["hof_position"]))
+
+        await reconcile_roles(member, add=[new_role], remove=hof_roles)
+    elif body.event == WebhookEvent.SUBSCRIPTION_CHANGE:
+        to_add, to_remove = [], []
+        for subscription in ("vip", "dedivip"):
+            role = resolver.resolve(guild, resolver.post_or_rank[subscription])
+            (to_add if body.data.get(subscription) else to_remove).append(role)
+
+        await reconcile_roles(member, add=to_add, remove=to_remove)
+    elif body.event == WebhookEvent.NAME_CHANGE:
+        await reconcile_roles(member, nick=body.data["user_name"])
+    else:
+        logger.debug(f"Event {body.event} not implemented")
+        raise HTTPException(status_code=501, detail=f"Event {body.event} not implemented")
+
+    # The cached details are now stale. The link is not marked as verified: an event only carries the attribute that
+    # changed, so the ban status and season rank still need the next re-verification.
+    link = await get_htb_discord_link(member.id)
+    if link is not None:
+        invalidate_user_details(link.account_identifier)
+
+    return {"success": True}
@@ -0,0 +1,155 @@
+"""
+Benchmark the verification throughput against a local fake HTB API.
+
+Drives `process_identification` and `MessageHandler.process_reverification` at increasing concurrency, with mocked
+guild and member objects, and reports the throughput, p50/p99 latency and HTTP calls per verification.
+
+Usage:
+    python -m tests.benchmarks.verification_throughput --concurrency 1 10 50 --verifications 500 --latency 0.05
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from itertools import count
+from typing import Awaitable, Callable, NamedTuple
+from unittest import mock
+
+from src.cmds.automation.auto_verify import MessageHandler
+from src.database.models import HtbDiscordLink
+from src.helpers.htb_api import htb_api
+from src.helpers.rate_limit import MEMBER_EDIT_ROUTE, MEMBER_ROLE_ROUTE, RouteLimiter, member_limiter
+from src.helpers.season import season_rank_cache
+from src.helpers.verification import process_identification, user_details_cache
+from tests import helpers
+from tests.fake_htb_api import FakeHtbApi
+
+# HTB user IDs are never reused across runs, so every verification starts with cold caches.
+htb_uids = count(1)
+
+
+class BenchmarkResult(NamedTuple):
+    """The measurements of a run at a given concurrency."""
+
+    target: str
+    concurrency: int
+    verifications: int
+    errors: int
+    elapsed: float
+    latencies: list[float]
+    http_calls: int
+
+    def __str__(self) -> str:
+        p50, p99 = (statistics.quantiles(self.latencies, n=100)[i] * 1000 for i in (49, 98))
+        return (
+            f"{self.target:<15} {self.concurrency:>11} {self.verifications / self.elapsed:>10.1f} {p50:>8.1f} "
+            f"{p99:>8.1f} {self.http_calls / self.verifications:>10.2f} {self.errors:>6}"
+        )
+
+
+def make_guild() -> helpers.MockGuild:
+    """A guild that has every role it is asked for."""
+    roles = {}
+    guild = helpers.MockGuild()
+    guild.get_role = lambda role_id: roles.setdefault(role_id, helpers.MockRole(id=role_id))
+    return guild
+
+
+def make_member(guild: helpers.MockGuild, htb_uid: int, edit_latency: float) -> helpers.MockMember:
+    """A member without roles, whose edits take `edit_latency` seconds like a Discord request."""
+    async def edit(**kwargs) -> None:
+        await asyncio.sleep(edit_latency)
+
+    member = helpers.MockMember(id=htb_uid, roles=[], nick=None)
+    member.guild = guild
+    member.edit = mock.AsyncMock(side_effect=edit)
+    return member
+
+
+async def run(
+    target: str, verify: Callable[[helpers.MockMember], Awaitable], api: FakeHtbApi, concurrency: int,
+    verifications: int, edit_latency: float,
+) -> BenchmarkResult:
+    """Run `verifications` verifications of distinct members, `concurrency` at a time."""
+    guild = make_guild()
+    members = [make_member(guild, next(htb_uids), edit_latency) for _ in range(verifications)]
+    latencies = []
+    errors = 0
+    api.calls.clear()
+
+    async def worker() -> None:
+        nonlocal errors
+        while members:
+            member = members.pop()
+            started_at = time.perf_counter()
+            try:
+                await verify(member)
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started_at)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started_at
+    return BenchmarkResult(
+        target, concurrency, verifications, errors, elapsed, latencies, sum(api.calls.values())
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    bot = helpers.MockBot()
+
+    def get_link(discord_user_id: int) -> HtbDiscordLink:
+        return HtbDiscordLink(
+            account_identifier=FakeHtbApi.identifier(discord_user_id), discord_user_id=discord_user_id,
+            htb_user_id=discord_user_id,
+        )
+
+    async def identify(member: helpers.MockMember) -> None:
+        await process_identification(FakeHtbApi.user_details(member.id), user=member, bot=bot)
+
+    # Every benchmark member is in the same guild, so the per-guild edit budget would be all that is measured.
+    unlimited = RouteLimiter({MEMBER_EDIT_ROUTE: (10 ** 9, 1), MEMBER_ROLE_ROUTE: (10 ** 9, 1)})
+    limiter = member_limiter if args.discord_rate_limit else unlimited
+
+    async with FakeHtbApi(args.latency, args.error_rate, args.not_found_rate) as api:
+        with (
+            api.patch_settings(),
+            mock.patch("src.helpers.rate_limit.member_limiter", limiter),
+            mock.patch("src.cmds.automation.auto_verify.load_linked_users", mock.AsyncMock()),
+            mock.patch("src.cmds.automation.auto_verify.get_stale_htb_discord_links", mock.AsyncMock(return_value=[])),
+            mock.patch("src.cmds.automation.auto_verify.get_htb_discord_link", mock.AsyncMock(side_effect=get_link)),
+            mock.patch("src.cmds.automation.auto_verify.mark_htb_discord_link_verified", mock.AsyncMock()),
+        ):
+            handler = MessageHandler(bot)
+            targets = {
+                "identification": identify,
+                "reverification": lambda member: handler.process_reverification(member, force=True),
+            }
+
+            print(f"{'target':<15} {'concurrency':>11} {'verif/s':>10} {'p50 ms':>8} {'p99 ms':>8} "
+                  f"{'HTTP/verif':>10} {'errors':>6}")
+            for target, verify in targets.items():
+                for concurrency in args.concurrency:
+                    user_details_cache.clear()
+                    season_rank_cache.clear()
+                    print(await run(target, verify, api, concurrency, args.verifications, args.edit_latency))
+
+            handler.cog_unload()
+        await htb_api.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50, 100])
+    parser.add_argument("--verifications", type=int, default=500, help="verifications per concurrency level")
+    parser.add_argument("--latency", type=float, default=0.05, help="mean HTB API latency, in seconds")
+    parser.add_argument("--error-rate", type=float, default=0, help="fraction of HTB API requests failing with 503")
+    parser.add_argument("--not-found-rate", type=float, default=0, help="fraction of HTB API requests returning 404")
+    parser.add_argument("--edit-latency", type=float, default=0.1, help="latency of a member edit, in seconds")
+    parser.add_argument(
+        "--discord-rate-limit", action="store_true", help="keep the per-guild member edit budget (slow by design)"
+    )
+    logging.disable(logging.WARNING)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,132 @@
+"""
+A local stand-in for the HTB API endpoints used by the verification helpers, for benchmarks and manual testing.
+
+Usage:
+    async with FakeHtbApi(latency=0.05, error_rate=0.01) as api:
+        with api.patch_settings():
+            await get_user_details(api.identifier(1))
+"""
+import asyncio
+import random
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterator
+from unittest import mock
+
+from aiohttp import web
+
+from src.core import settings
+
+SEASON_TIERS = ("Holo", "Platinum", "Ruby", "Silver", "Bronze", None)
+RANKS = ("Noob", "Script Kiddie", "Hacker", "Pro Hacker", "Elite Hacker", "Guru", "Omniscient")
+
+
+class FakeHtbApi:
+    """
+    An aiohttp server implementing the identifier, season end, banned and certificate lookup endpoints.
+
+    Identifiers made with `identifier(htb_uid)` resolve to deterministic details of that HTB user; other identifiers
+    are unknown. Requests are counted per endpoint in `calls`.
+
+    Args:
+        latency (float): The mean response latency, in seconds. Each response takes between half and 1.5 times it.
+        error_rate (float): The fraction of requests (0-1) answered with a 503.
+        not_found_rate (float): The fraction of requests (0-1) answered with a 404, e.g. regenerated identifiers.
+        seed (int): The seed of the random generator, so runs are reproducible.
+    """
+
+    def __init__(self, latency: float = 0, error_rate: float = 0, not_found_rate: float = 0, seed: int = 0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.not_found_rate = not_found_rate
+        self.calls: Counter[str] = Counter()
+        self._random = random.Random(seed)
+        self._runner: web.AppRunner | None = None
+        self.url: str | None = None
+
+        self.app = web.Application()
+        self.app.router.add_get("/api/discord/identifier/{identifier}", self.identifier_lookup)
+        self.app.router.add_get("/api/discord/{uid}/banned", self.banned)
+        self.app.router.add_get("/api/v4/season/end/0/{uid}", self.season_end)
+        self.app.router.add_get("/api/v4/certificate/lookup", self.certificate_lookup)
+
+    @staticmethod
+    def identifier(htb_uid: int) -> str:
+        """The 60 character account identifier of an HTB user."""
+        return f"{htb_uid:060d}"
+
+    @staticmethod
+    def user_details(htb_uid: int) -> dict:
+        """The details of an HTB user, as returned by the identifier endpoint."""
+        return {
+            "user_id": htb_uid,
+            "user_name": f"user{htb_uid}",
+            "rank": RANKS[htb_uid % len(RANKS)],
+            "vip": htb_uid % 5 == 0,
+            "dedivip": htb_uid % 15 == 0,
+            "hof_position": htb_uid % 500 + 1 if htb_uid % 7 == 0 else "unranked",
+            "machines": htb_uid % 11 == 0,
+            "challenges": htb_uid % 13 == 0,
+        }
+
+    async def start(self) -> None:
+        """Start serving on a free local port."""
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = self._runner.addresses[0][:2]
+        self.url = f"http://{host}:{port}"
+
+    async def stop(self) -> None:
+        """Stop serving."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def __aenter__(self) -> "FakeHtbApi":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+    @contextmanager
+    def patch_settings(self) -> Iterator[None]:
+        """Point the HTB API URLs of the settings at this server."""
+        with (
+            mock.patch.object(settings, "API_URL", f"{self.url}/api"),
+            mock.patch.object(settings, "API_V4_URL", f"{self.url}/api/v4"),
+        ):
+            yield
+
+    async def _respond(self, endpoint: str, payload: dict) -> web.Response:
+        self.calls[endpoint] += 1
+        if self.latency:
+            await asyncio.sleep(self._random.uniform(self.latency / 2, self.latency * 1.5))
+
+        roll = self._random.random()
+        if roll < self.error_rate:
+            return web.json_response({"message": "Service Unavailable"}, status=503)
+        if roll < self.error_rate + self.not_found_rate:
+            return web.json_response({"message": "Not Found"}, status=404)
+        return web.json_response(payload)
+
+    async def identifier_lookup(self, request: web.Request) -> web.Response:
+        identifier = request.match_info["identifier"]
+        if len(identifier) != 60 or not identifier.isdigit():
+            self.calls["identifier"] += 1
+            return web.json_response({"message": "Not Found"}, status=404)
+
+        return await self._respond("identifier", self.user_details(int(identifier)))
+
+    async def banned(self, request: web.Request) -> web.Response:
+        return await self._respond("banned", {"banned": False, "ends_at": None})
+
+    async def season_end(self, request: web.Request) -> web.Response:
+        tier = SEASON_TIERS[int(request.match_info["uid"]) % len(SEASON_TIERS)]
+        return await self._respond("season_end", {"data": {"season": {"tier": tier}} if tier else {}})
+
+    async def certificate_lookup(self, request: web.Request) -> web.Response:
+        return await self._respond(
+            "certificate_lookup", {"certificates": [{"name": "HTB Certified Penetration Testing Specialist"}]}
+        )
@@ -0,0 +1,43 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from src.cmds.automation import auto_verify
+from src.core import settings
+from tests import helpers
+
+
+class TestMessageHandler:
+    """Test the `MessageHandler` cog."""
+
+    @pytest.fixture
+    def cog(self, bot):
+        with (
+            mock.patch("src.cmds.automation.auto_verify.load_linked_users", mock.AsyncMock()),
+            mock.patch("src.cmds.automation.auto_verify.get_stale_htb_discord_links", mock.AsyncMock(return_value=[])),
+        ):
+            cog = auto_verify.MessageHandler(bot)
+            yield cog
+            cog.cog_unload()
+
+    @pytest.mark.asyncio
+    async def test_failed_drain_restarts_while_joins_remain(self, bot, cog):
+        members = [helpers.MockMember(id=1), helpers.MockMember(id=2)]
+        bot.get_cached_member.side_effect = [RuntimeError(), members[1]]
+
+        with (
+            mock.patch.object(settings, "MEMBER_EDIT_PER", 0.001),
+            mock.patch.object(settings, "JOIN_FLOOD_DRAIN_RATE", 1000),
+            mock.patch.object(cog, "queue_reverification") as queue_reverification,
+        ):
+            for member in members:
+                cog.defer_join(member)
+            first_drain = cog._drain_task
+            with pytest.raises(RuntimeError):
+                await first_drain
+            await asyncio.wait_for(cog._drain_task, timeout=1)
+
+        assert cog._drain_task is not first_drain
+        queue_reverification.assert_called_once_with(members[1], auto_verify.Priority.LOW, force=True)
+        assert not cog.deferred_joins
@@ -1,9 +1,45 @@
+from unittest import mock
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
 from src.cmds.core import identify
+from src.helpers.verification_queue import Priority
+from tests import helpers
 
 
 class TestIdentifyCog:
     """Test the `Identify` cog."""
 
+    @pytest.mark.asyncio
+    async def test_identification_is_queued_per_htb_account(self, bot, ctx, session):
+        """Test that identifying with another HTB account is not answered by a queued job for the first one."""
+        member = helpers.MockMember(id=2)
+        ctx.user = member
+        bot.get_or_fetch_user = AsyncMock(return_value=member)
+        async with session() as db_session:
+            db_session.scalars.return_value = MagicMock()
+            db_session.scalars.return_value.first.return_value = None
+            db_session.scalars.return_value.all.return_value = []
+        queue = MagicMock()
+        queue.submit = AsyncMock()
+
+        with (
+            mock.patch("src.cmds.core.identify.AsyncSessionLocal", session),
+            mock.patch("src.cmds.core.identify.verification_queue", queue),
+            mock.patch("src.cmds.core.identify.mark_htb_discord_link_verified", AsyncMock()),
+            mock.patch("src.cmds.core.identify.linked_users", set()),
+        ):
+            cog = identify.IdentifyCog(bot)
+            for htb_user_id in (101, 102):
+                details = {"user_id": htb_user_id, "user_name": "user"}
+                with mock.patch("src.cmds.core.identify.get_user_details", AsyncMock(return_value=details)):
+                    await cog.identify.callback(cog, ctx, "a" * 60)
+
+        keys = [call.args[0] for call in queue.submit.call_args_list]
+        assert keys == [(2, 101), (2, 102)]
+        assert all(call.args[2] is Priority.HIGH for call in queue.submit.call_args_list)
+
     def test_setup(self, bot):
         """Test the setup method of the cog."""
         # Invoke the command
@@ -1,9 +1,44 @@
+import asyncio
+from unittest import mock
+
+import pytest
+from aiohttp import ClientConnectionError
+
 from src.cmds.core import verify
+from src.cmds.core.verify import VerifyCog
+from src.helpers.circuit_breaker import CircuitOpenError
 
 
 class TestVerifyCog:
     """Test the `Verify` cog."""
 
+    @pytest.mark.asyncio
+    async def test_verifycertification_htb_unavailable(self, bot, ctx):
+        cog = VerifyCog(bot)
+        lookup = mock.AsyncMock(side_effect=CircuitOpenError("certificate", retry_after=12.5))
+
+        with mock.patch("src.cmds.core.verify.process_certification", lookup):
+            await cog.verifycertification.callback(cog, ctx, "HTBCERT-1", "Jane Doe")
+
+        ctx.respond.assert_awaited_once()
+        assert "13 seconds" in ctx.respond.await_args.args[0]
+        assert ctx.respond.await_args.kwargs["ephemeral"]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("exc", [ClientConnectionError(), asyncio.TimeoutError()])
+    async def test_verifycertification_lookup_failed(self, bot, ctx, exc):
+        cog = VerifyCog(bot)
+
+        with (
+            mock.patch("src.cmds.core.verify.process_certification", mock.AsyncMock(side_effect=exc)),
+            mock.patch("src.cmds.core.verify.add_roles") as add_roles,
+        ):
+            await cog.verifycertification.callback(cog, ctx, "HTBCERT-1", "Jane Doe")
+
+        add_roles.assert_not_awaited()
+        assert "could not be reached" in ctx.respond.await_args.args[0]
+        assert ctx.respond.await_args.kwargs["ephemeral"]
+
     def test_setup(self, bot):
         """Test the setup method of the cog."""
         # Invoke the command
@@ -0,0 +1,57 @@
+import pytest
+
+from src.core import settings
+from tests import helpers
+
+
+class TestRoleResolver:
+
+    @pytest.fixture
+    def resolver(self):
+        return settings.role_resolver
+
+    def test_tables_are_read_only(self, resolver):
+        with pytest.raises(TypeError):
+            resolver.season["Holo"] = 1
+        assert isinstance(resolver.groups["ALL_RANKS"], frozenset)
+
+    def test_getters_delegate_to_tables(self, resolver):
+        assert settings.get_post_or_rank("Guru") == resolver.post_or_rank["Guru"] == settings.roles.GURU
+        assert settings.get_season("Ruby") == settings.roles.SEASON_RUBY
+        assert settings.get_cert("CPTS") == settings.roles.ACADEMY_CPTS
+        assert settings.get_academy_cert_role(
+            settings.academy_certificates.CERTIFIED_WEB_EXPLOITATION_EXPERT
+        ) == settings.roles.ACADEMY_CWEE
+        assert settings.get_post_or_rank("unknown") is None
+
+    @pytest.mark.parametrize(
+        "position, expected", [(1, "RANK_ONE"), ("10", "RANK_TEN"), (11, None), ("unranked", None)]
+    )
+    def test_hof_role_id(self, resolver, position, expected):
+        assert resolver.hof_role_id(position) == (getattr(settings.roles, expected) if expected else None)
+
+    def test_identification_roles(self, resolver):
+        assert settings.roles.SEASON_HOLO in resolver.identification_role_ids
+        assert settings.roles.RANK_ONE in resolver.identification_role_ids
+        assert settings.roles.BOX_CREATOR not in resolver.identification_role_ids
+
+    def test_resolve_is_cached_per_guild(self, resolver):
+        role = helpers.MockRole(id=settings.roles.GURU)
+        guild = helpers.MockGuild()
+        guild.get_role.return_value = role
+
+        assert resolver.resolve(guild, settings.roles.GURU) is role
+        assert resolver.resolve(guild, settings.roles.GURU) is role
+        guild.get_role.assert_called_once_with(settings.roles.GURU)
+
+        resolver.forget_guild(guild.id)
+        assert resolver.resolve(guild, settings.roles.GURU) is role
+        assert guild.get_role.call_count == 2
+
+    def test_missing_roles_are_not_cached(self, resolver):
+        guild = helpers.MockGuild()
+        guild.get_role.return_value = None
+
+        assert resolver.resolve(guild, settings.roles.GURU) is None
+        assert resolver.resolve_many(guild, [settings.roles.GURU, None]) == []
+        assert guild.get_role.call_count == 2
@@ -0,0 +1,72 @@
+import pytest
+from sqlalchemy import create_engine, or_, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql import Select
+
+from src.database.models import Ban, Base, HtbDiscordLink, Infraction, Mute, UserNote
+
+
+def query_plan(connection: Connection, stmt: Select) -> str:
+    compiled = stmt.compile(connection, compile_kwargs={"literal_binds": True})
+    return " ".join(row[-1] for row in connection.execute(text(f"EXPLAIN QUERY PLAN {compiled}")))
+
+
+@pytest.fixture(scope="module")
+def connection():
+    # SQLite plans use indexes the way MySQL does for these simple lookups, without needing a database server.
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with engine.connect() as connection:
+        yield connection
+
+
+class TestIndexes:
+    """The hot queries of the bot, as issued by the code, are served by an index rather than a table scan."""
+
+    @pytest.mark.parametrize(
+        "stmt, index", [
+            # ExpiryProcessor.run
+            (
+                select(Ban).filter(Ban.unbanned.is_(False)).filter(Ban.unban_time <= 1700000000),
+                "ix_ban_unbanned_unban_time",
+            ),
+            # ban_member and unban_member
+            (
+                select(Ban).filter(Ban.user_id == 1, Ban.unbanned.is_(False)).limit(1),
+                "ix_ban_user_id_unbanned",
+            ),
+            # ExpiryProcessor.run
+            (select(Mute).filter(Mute.unmute_time <= 1700000000), "ix_mute_unmute_time"),
+            # unmute_member
+            (select(Mute).filter(Mute.user_id == 1), "ix_mute_user_id"),
+            # /history
+            (select(Infraction).filter(Infraction.user_id == 1), "ix_infraction_user_id"),
+            (select(UserNote).filter(UserNote.user_id == 1), "ix_user_note_user_id"),
+            # get_htb_discord_link and /identify
+            (
+                select(HtbDiscordLink).where(HtbDiscordLink.discord_user_id == 1).order_by(HtbDiscordLink.id).limit(1),
+                "ix_htb_discord_link_discord_user_id",
+            ),
+            (select(HtbDiscordLink).filter(HtbDiscordLink.htb_user_id == 1), "ix_htb_discord_link_htb_user_id"),
+            (
+                select(HtbDiscordLink).filter(HtbDiscordLink.account_identifier == "a").order_by(
+                    HtbDiscordLink.id.desc()
+                ).limit(1),
+                "ix_htb_discord_link_account_identifier",
+            ),
+        ]
+    )
+    def test_query_uses_index(self, connection, stmt, index):
+        plan = query_plan(connection, stmt)
+        assert index in plan, plan
+
+    def test_whois_uses_both_link_indexes(self, connection):
+        stmt = select(HtbDiscordLink).filter(
+            or_(HtbDiscordLink.discord_user_id == 1, HtbDiscordLink.htb_user_id == 1)
+        )
+        plan = query_plan(connection, stmt)
+        assert "ix_htb_discord_link_discord_user_id" in plan and "ix_htb_discord_link_htb_user_id" in plan, plan
+
+    def test_linked_users_index_is_loaded_from_index_only(self, connection):
+        stmt = select(HtbDiscordLink.discord_user_id).distinct().order_by(HtbDiscordLink.discord_user_id)
+        assert "COVERING INDEX ix_htb_discord_link_discord_user_id" in query_plan(connection, stmt)
@@ -0,0 +1,51 @@
+from unittest import mock
+
+from src.helpers.cache import MISSING, TTLCache
+
+
+class TestTTLCache:
+
+    def test_get_missing(self):
+        cache = TTLCache("test", ttl=10, max_size=10)
+        assert cache.get("key") is MISSING
+        assert cache.get("key", None) is None
+
+    def test_set_and_get(self):
+        cache = TTLCache("test", ttl=10, max_size=10)
+        cache.set("key", "value")
+        assert cache.get("key") == "value"
+        assert "key" in cache
+
+    def test_negative_entry(self):
+        cache = TTLCache("test", ttl=10, max_size=10)
+        cache.set("key", None)
+        assert cache.get("key") is None
+
+    def test_expiry(self):
+        cache = TTLCache("test", ttl=10, max_size=10)
+        with mock.patch("src.helpers.cache.time.monotonic", return_value=100):
+            cache.set("key", "value")
+            cache.set("short", "value", ttl=1)
+        with mock.patch("src.helpers.cache.time.monotonic", return_value=105):
+            assert cache.get("key") == "value"
+            assert cache.get("short") is MISSING
+        with mock.patch("src.helpers.cache.time.monotonic", return_value=111):
+            assert cache.get("key") is MISSING
+        assert len(cache) == 0
+
+    def test_evicts_least_recently_used(self):
+        cache = TTLCache("test", ttl=10, max_size=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("a") == 1
+        assert cache.get("b") is MISSING
+        assert cache.get("c") == 3
+
+    def test_invalidate(self):
+        cache = TTLCache("test", ttl=10, max_size=10)
+        cache.set("key", "value")
+        cache.invalidate("key")
+        cache.invalidate("unknown")
+        assert cache.get("key") is MISSING
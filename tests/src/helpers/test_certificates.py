@@ -0,0 +1,109 @@
+import asyncio
+from unittest import mock
+
+import aioresponses
+import pytest
+from yarl import URL
+
+from src.core import settings
+from src.helpers.certificates import (
+    CertificationRow, certificate_cache, certification_report, parse_certification_csv, process_certification,
+    verify_certifications
+)
+from tests import helpers
+
+LOOKUP_URL = f"{settings.API_V4_URL}/certificate/lookup"
+
+
+def lookup_url(cert_id: str, full_name: str) -> URL:
+    return URL(LOOKUP_URL).with_query(id=cert_id, name=full_name)
+
+
+class TestProcessCertification:
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        certificate_cache.clear()
+        yield
+        certificate_cache.clear()
+
+    @pytest.mark.asyncio
+    async def test_certificate_is_mapped_and_cached(self):
+        url = lookup_url("HTBCERT-1", "Jane Doe")
+        with aioresponses.aioresponses() as m:
+            m.get(url, status=200, payload={"certificates": [{"name": "HTB Certified Defensive Security Analyst"}]})
+
+            assert await process_certification("HTBCERT-1", "Jane Doe") == "CDSA"
+            assert await process_certification("HTBCERT-1", "Jane Doe") == "CDSA"
+            assert len(m.requests[("GET", url)]) == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_lookups_share_a_request(self):
+        url = lookup_url("HTBCERT-1", "Jane Doe")
+        with aioresponses.aioresponses() as m:
+            m.get(url, status=200, payload={"certificates": [{"name": "HTB Certified Bug Bounty Hunter"}]})
+
+            results = await asyncio.gather(*(process_certification("HTBCERT-1", "Jane Doe") for _ in range(5)))
+            assert results == ["CBBH"] * 5
+            assert len(m.requests[("GET", url)]) == 1
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("status, payload", [(404, None), (200, {"certificates": []})])
+    async def test_unknown_certificate(self, status, payload):
+        with aioresponses.aioresponses() as m:
+            m.get(lookup_url("HTBCERT-1", "Jane Doe"), status=status, payload=payload)
+
+            assert await process_certification("HTBCERT-1", "Jane Doe") is None
+
+    @pytest.mark.asyncio
+    async def test_server_error_is_not_cached(self):
+        with aioresponses.aioresponses() as m:
+            m.get(lookup_url("HTBCERT-1", "Jane Doe"), status=500)
+
+            assert await process_certification("HTBCERT-1", "Jane Doe") is None
+            assert ("HTBCERT-1", "Jane Doe") not in certificate_cache
+
+
+class TestBulkCertification:
+
+    def test_parse_csv_skips_header(self):
+        content = "discord_id,cert_id,full_name\n1,HTBCERT-1,Jane Doe\n\n2, HTBCERT-2 ,John Doe\n".encode()
+
+        assert parse_certification_csv(content) == [
+            CertificationRow(1, "HTBCERT-1", "Jane Doe"), CertificationRow(2, "HTBCERT-2", "John Doe")
+        ]
+
+    @pytest.mark.parametrize("content", [b"1,HTBCERT-1\n", b"1,HTBCERT-1,Jane Doe\nabc,HTBCERT-2,John Doe\n"])
+    def test_parse_csv_rejects_invalid_rows(self, content):
+        with pytest.raises(ValueError):
+            parse_certification_csv(content)
+
+    @pytest.mark.asyncio
+    async def test_verify_certifications(self):
+        member = helpers.MockMember(id=1)
+        guild = helpers.MockGuild()
+        guild.get_member.side_effect = lambda id_: member if id_ == 1 else None
+        guild.get_role.side_effect = lambda role_id: helpers.MockRole(id=role_id)
+        rows = [
+            CertificationRow(1, "HTBCERT-1", "Jane Doe"),
+            CertificationRow(1, "HTBCERT-2", "Jane Doe"),
+            CertificationRow(1, "CERT-3", "Jane Doe"),
+            CertificationRow(2, "HTBCERT-4", "John Doe"),
+        ]
+        lookup = mock.AsyncMock(side_effect=lambda cert_id, _: "CPTS" if cert_id == "HTBCERT-1" else None)
+
+        with (
+            mock.patch("src.helpers.certificates.process_certification", lookup),
+            mock.patch("src.helpers.certificates.reconcile_roles", new_callable=mock.AsyncMock) as reconcile_roles,
+        ):
+            results = await verify_certifications(guild, rows, concurrency=2)
+
+        assert [result.status for result in results] == [
+            "verified", "not found", "invalid certificate ID", "not in server"
+        ]
+        reconcile_roles.assert_awaited_once()
+        assert reconcile_roles.await_args.kwargs["add"][0].id == settings.roles.ACADEMY_CPTS
+
+        report = certification_report(results).decode().splitlines()
+        assert report[0] == "discord_id,cert_id,full_name,certification,status"
+        assert report[1] == "1,HTBCERT-1,Jane Doe,CPTS,verified"
@@ -0,0 +1,94 @@
+from unittest import mock
+
+import pytest
+
+from src.helpers.circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState
+
+
+class TestCircuitBreaker:
+
+    @staticmethod
+    def make_breaker(**kwargs) -> CircuitBreaker:
+        options = dict(failure_rate=0.5, window=4, min_calls=4, reset_timeout=10, max_reset_timeout=30)
+        return CircuitBreaker("test", **(options | kwargs))
+
+    @staticmethod
+    def fail(breaker: CircuitBreaker, times: int = 1) -> None:
+        for _ in range(times):
+            breaker.record_failure(breaker.before_call())
+
+    def test_opens_at_failure_rate(self):
+        breaker = self.make_breaker()
+        breaker.record_success(breaker.before_call())
+        breaker.record_success(breaker.before_call())
+        self.fail(breaker)
+        assert breaker.state is CircuitState.CLOSED
+
+        self.fail(breaker)
+        assert breaker.state is CircuitState.OPEN
+        with pytest.raises(CircuitOpenError) as exc_info:
+            breaker.before_call()
+        assert 5 <= exc_info.value.retry_after <= 10
+
+    def test_does_not_open_below_min_calls(self):
+        breaker = self.make_breaker()
+        self.fail(breaker, 3)
+        assert breaker.state is CircuitState.CLOSED
+
+    def test_half_open_allows_a_single_probe(self):
+        breaker = self.make_breaker(min_calls=1)
+        self.fail(breaker)
+
+        with mock.patch("src.helpers.circuit_breaker.time.monotonic", return_value=breaker._open_until):
+            assert breaker.state is CircuitState.HALF_OPEN
+            probe = breaker.before_call()
+            with pytest.raises(CircuitOpenError):
+                breaker.before_call()
+
+            breaker.record_success(probe)
+            assert breaker.state is CircuitState.CLOSED
+            breaker.before_call()
+
+    def test_failed_probe_backs_off_exponentially(self):
+        breaker = self.make_breaker(min_calls=1)
+        now = 1000.0
+        delays = []
+
+        with (
+            mock.patch("src.helpers.circuit_breaker.time.monotonic", side_effect=lambda: now),
+            mock.patch("src.helpers.circuit_breaker.random.uniform", side_effect=lambda low, high: high),
+        ):
+            self.fail(breaker)
+            delays.append(breaker.retry_after())
+            for _ in range(3):
+                now = breaker._open_until
+                self.fail(breaker)
+                delays.append(breaker.retry_after())
+
+        assert delays == pytest.approx([10, 20, 30, 30])
+
+    def test_late_outcomes_are_ignored_while_open(self):
+        breaker = self.make_breaker(min_calls=1)
+        late = breaker.before_call()
+        self.fail(breaker)
+        open_until = breaker._open_until
+
+        breaker.record_failure(late)
+        breaker.record_success(late)
+        assert breaker.state is CircuitState.OPEN
+        assert breaker._open_until == open_until
+
+    def test_only_the_probe_ends_half_open(self):
+        breaker = self.make_breaker(min_calls=1)
+        late_success, late_failure = breaker.before_call(), breaker.before_call()
+        self.fail(breaker)
+
+        with mock.patch("src.helpers.circuit_breaker.time.monotonic", return_value=breaker._open_until):
+            probe = breaker.before_call()
+            # Calls started before the breaker opened finish while the probe is in flight.
+            breaker.record_success(late_success)
+            breaker.record_failure(late_failure)
+            assert breaker.state is CircuitState.HALF_OPEN
+
+            breaker.record_failure(probe)
+            assert breaker.state is CircuitState.OPEN
@@ -0,0 +1,144 @@
+import asyncio
+from unittest import mock
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.models import Ban, Mute
+from src.helpers.expiry import ExpiryProcessor
+from src.helpers.schedule import JobRegistry, JobState, TimerService
+from tests import helpers
+
+
+def scalars(*records):
+    result = MagicMock()
+    result.all.return_value = list(records)
+    return result
+
+
+class TestExpiryProcessor:
+
+    @pytest.fixture
+    def registry(self):
+        registry = JobRegistry(TimerService(), retention=60, max_size=10)
+        with mock.patch("src.helpers.expiry.job_registry", registry):
+            yield registry
+
+    @pytest.fixture
+    def db(self):
+        return AsyncMock(spec=AsyncSession)
+
+    @pytest.fixture
+    def processor(self, bot, guild, db):
+        bot.get_guild.return_value = guild
+        guild.chunked = True
+        guild.get_member.return_value = None
+        session_local = MagicMock()
+        session_local.return_value.__aenter__.return_value = db
+        with (
+            mock.patch("src.helpers.expiry.AsyncSessionLocal", session_local),
+            mock.patch("src.helpers.expiry.settings.guild_ids", [guild.id]),
+        ):
+            yield ExpiryProcessor(bot, concurrency=2)
+
+    @pytest.mark.asyncio
+    async def test_lifts_due_records_in_bulk(self, processor, registry, guild, db):
+        db.scalars.side_effect = [
+            scalars(Ban(id=1, user_id=10), Ban(id=2, user_id=20)), scalars(Mute(id=3, user_id=30)),
+        ]
+
+        assert await processor.run() == (2, 1)
+
+        assert guild.unban.await_count == 2
+        # Users are unbanned by ID, without fetching them.
+        assert {call.args[0].id for call in guild.unban.await_args_list} == {10, 20}
+        guild.fetch_member.assert_not_awaited()
+        # One UPDATE of the bans and one DELETE of the mutes, whatever the number of records.
+        assert db.execute.await_count == 2
+        db.commit.assert_awaited_once()
+        assert registry.state("unban", 1) is JobState.DONE
+        assert registry.state("unmute", 3) is JobState.DONE
+
+    @pytest.mark.asyncio
+    async def test_records_with_a_job_are_left_to_it(self, processor, registry, guild, db):
+        db.scalars.side_effect = [scalars(Ban(id=1, user_id=10)), scalars()]
+        registry.claim("unban", [1])
+
+        assert await processor.run() == (0, 0)
+
+        guild.unban.assert_not_awaited()
+        db.commit.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_failed_lift_is_not_committed(self, processor, registry, guild, db):
+        db.scalars.side_effect = [scalars(Ban(id=1, user_id=10), Ban(id=2, user_id=20)), scalars()]
+        guild.unban.side_effect = [RuntimeError(), None]
+
+        assert await processor.run() == (1, 0)
+
+        (stmt,), _ = db.execute.await_args
+        assert stmt.compile().params["id_1"] == [2]
+        assert registry.state("unban", 1) is JobState.FAILED
+        assert registry.state("unban", 2) is JobState.DONE
+
+    @pytest.mark.asyncio
+    async def test_claims_are_released_when_a_query_fails(self, processor, registry, guild, db):
+        db.scalars.side_effect = [scalars(Ban(id=1, user_id=10)), RuntimeError()]
+
+        with pytest.raises(RuntimeError):
+            await processor.run()
+
+        guild.unban.assert_not_awaited()
+        assert registry.state("unban", 1) is JobState.FAILED
+
+    @pytest.mark.asyncio
+    async def test_claims_are_released_when_cancelled(self, processor, registry, guild, db):
+        db.scalars.side_effect = [scalars(Ban(id=1, user_id=10)), scalars(Mute(id=2, user_id=20))]
+        started = asyncio.Event()
+
+        async def unban(_):
+            started.set()
+            await asyncio.Event().wait()
+
+        guild.unban.side_effect = unban
+        task = asyncio.create_task(processor.run())
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        db.commit.assert_not_awaited()
+        assert registry.state("unban", 1) is JobState.FAILED
+        assert registry.state("unmute", 2) is JobState.FAILED
+
+    @pytest.mark.asyncio
+    async def test_unmute_removes_role_from_cached_member(self, processor, registry, guild, db):
+        db.scalars.side_effect = [scalars(), scalars(Mute(id=1, user_id=10))]
+        member = helpers.MockMember(id=10)
+        role = helpers.MockRole()
+        member.get_role.return_value = role
+        guild.get_member.return_value = member
+
+        with mock.patch("src.helpers.expiry.remove_roles") as remove_roles:
+            assert await processor.run() == (0, 1)
+
+        remove_roles.assert_awaited_once_with(member, role)
+        guild.fetch_member.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_unmute_fetches_member_only_while_cache_is_incomplete(self, processor, registry, guild, db):
+        db.scalars.side_effect = [
+            scalars(), scalars(Mute(id=1, user_id=10)), scalars(), scalars(Mute(id=2, user_id=20)),
+        ]
+
+        with mock.patch("src.helpers.expiry.remove_roles") as remove_roles:
+            # Not in the cache of a chunked guild: the member left, so there is no role to remove.
+            await processor.run()
+            guild.fetch_member.assert_not_awaited()
+
+            guild.chunked = False
+            await processor.run()
+            guild.fetch_member.assert_awaited_once_with(20)
+
+        remove_roles.assert_awaited_once()
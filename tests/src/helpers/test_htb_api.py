@@ -0,0 +1,121 @@
+import unittest
+
+import aioresponses
+import pytest
+import yarl
+from aiohttp import ClientConnectionError
+
+from src.helpers.circuit_breaker import CircuitOpenError, CircuitState
+from src.helpers.htb_api import HtbApiClient
+
+URL = "https://labs.hackthebox.com/api/v4/some/endpoint"
+BREAKER_OPTIONS = dict(failure_rate=0.5, window=4, min_calls=2, reset_timeout=60, max_reset_timeout=60)
+
+
+class TestHtbApiClient(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.client = HtbApiClient(
+            pool_size=5, keepalive_timeout=5, timeout=5, retries=2, retry_backoff=0, breaker_options=BREAKER_OPTIONS
+        )
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    @pytest.mark.asyncio
+    async def test_get_success(self):
+        with aioresponses.aioresponses() as m:
+            m.get(URL, status=200, payload={"some_key": "some_value"})
+
+            result = await self.client.get(URL)
+            self.assertEqual(result.status, 200)
+            self.assertEqual(result.data, {"some_key": "some_value"})
+
+    @pytest.mark.asyncio
+    async def test_get_reuses_session(self):
+        with aioresponses.aioresponses() as m:
+            m.get(URL, status=200, payload={}, repeat=True)
+
+            await self.client.get(URL)
+            session = self.client.session
+            await self.client.get(URL)
+            self.assertIs(self.client.session, session)
+
+    @pytest.mark.asyncio
+    async def test_get_retries_unavailable(self):
+        with aioresponses.aioresponses() as m:
+            m.get(URL, status=503)
+            m.get(URL, status=200, payload={"some_key": "some_value"})
+
+            result = await self.client.get(URL)
+            self.assertEqual(result.status, 200)
+            self.assertEqual(result.data, {"some_key": "some_value"})
+
+    @pytest.mark.asyncio
+    async def test_get_gives_up_after_retries(self):
+        with aioresponses.aioresponses() as m:
+            m.get(URL, status=503, repeat=True)
+
+            result = await self.client.get(URL)
+            self.assertEqual(result.status, 503)
+            self.assertIsNone(result.data)
+
+    @pytest.mark.asyncio
+    async def test_get_does_not_retry_client_errors(self):
+        with aioresponses.aioresponses() as m:
+            m.get(URL, status=404)
+
+            result = await self.client.get(URL)
+            self.assertEqual(result.status, 404)
+            self.assertIsNone(result.data)
+
+    @pytest.mark.asyncio
+    async def test_get_raises_connection_error(self):
+        with aioresponses.aioresponses() as m:
+            m.get(URL, exception=ClientConnectionError(), repeat=True)
+
+            with self.assertRaises(ClientConnectionError):
+                await self.client.get(URL)
+
+    @pytest.mark.asyncio
+    async def test_get_invalid_json(self):
+        with aioresponses.aioresponses() as m:
+            m.get(URL, status=200, body="not json")
+
+            result = await self.client.get(URL)
+            self.assertEqual(result.status, 200)
+            self.assertIsNone(result.data)
+
+    @pytest.mark.asyncio
+    async def test_breaker_opens_on_failures(self):
+        with aioresponses.aioresponses() as m:
+            m.get(URL, status=503, repeat=True)
+
+            await self.client.get(URL, endpoint="failing")
+            await self.client.get(URL, endpoint="failing")
+            self.assertEqual(self.client.breaker("failing").state, CircuitState.OPEN)
+
+            with self.assertRaises(CircuitOpenError):
+                await self.client.get(URL, endpoint="failing")
+            # Only the calls before the breaker opened reached the API.
+            self.assertEqual(len(m.requests[("GET", yarl.URL(URL))]), 2 * (self.client.retries + 1))
+
+    @pytest.mark.asyncio
+    async def test_breakers_are_per_endpoint(self):
+        with aioresponses.aioresponses() as m:
+            m.get(URL, exception=ClientConnectionError(), repeat=True)
+            for _ in range(2):
+                with self.assertRaises(ClientConnectionError):
+                    await self.client.get(URL, endpoint="failing")
+
+        self.assertGreater(self.client.retry_after("failing"), 0)
+        self.assertEqual(self.client.retry_after("other"), 0)
+
+    @pytest.mark.asyncio
+    async def test_not_found_is_not_a_failure(self):
+        with aioresponses.aioresponses() as m:
+            m.get(URL, status=404, repeat=True)
+            for _ in range(4):
+                await self.client.get(URL, endpoint="lookup")
+
+        self.assertEqual(self.client.breaker("lookup").state, CircuitState.CLOSED)
@@ -0,0 +1,132 @@
+from datetime import datetime, timedelta
+from unittest import mock
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.core import settings
+from src.database.models import HtbDiscordLink
+from src.helpers.links import (
+    LinkedUserIndex, get_htb_discord_link, invalidate_htb_discord_link, is_recently_verified, link_cache,
+    mark_htb_discord_link_verified
+)
+
+
+class TestGetHtbDiscordLink:
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        link_cache.clear()
+        yield
+        link_cache.clear()
+
+    @pytest.mark.asyncio
+    async def test_link_is_cached(self, session):
+        link = HtbDiscordLink(id=1, account_identifier="a" * 60, discord_user_id=1, htb_user_id=2)
+        async with session() as db_session:
+            db_session.scalars.return_value = MagicMock()
+            db_session.scalars.return_value.first.return_value = link
+
+        with mock.patch("src.helpers.links.AsyncSessionLocal", session):
+            assert await get_htb_discord_link(1) is link
+            assert await get_htb_discord_link(1) is link
+
+        async with session() as db_session:
+            db_session.scalars.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_missing_link_is_cached(self, session):
+        async with session() as db_session:
+            db_session.scalars.return_value = MagicMock()
+            db_session.scalars.return_value.first.return_value = None
+
+        with mock.patch("src.helpers.links.AsyncSessionLocal", session):
+            assert await get_htb_discord_link(1) is None
+            assert await get_htb_discord_link(1) is None
+
+        async with session() as db_session:
+            db_session.scalars.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_invalidate(self, session):
+        async with session() as db_session:
+            db_session.scalars.return_value = MagicMock()
+            db_session.scalars.return_value.first.return_value = None
+
+        with mock.patch("src.helpers.links.AsyncSessionLocal", session):
+            await get_htb_discord_link(1)
+            invalidate_htb_discord_link(1)
+            await get_htb_discord_link(1)
+
+        async with session() as db_session:
+            assert db_session.scalars.await_count == 2
+
+
+class TestLastVerified:
+
+    def test_never_verified(self):
+        link = HtbDiscordLink(discord_user_id=1, last_verified_at=None)
+        assert not is_recently_verified(link)
+
+    def test_recently_verified(self):
+        link = HtbDiscordLink(discord_user_id=1, last_verified_at=datetime.utcnow() - timedelta(seconds=5))
+        assert is_recently_verified(link)
+
+    def test_stale(self):
+        last_verified_at = datetime.utcnow() - timedelta(seconds=settings.REVERIFY_FRESHNESS + 5)
+        link = HtbDiscordLink(discord_user_id=1, last_verified_at=last_verified_at)
+        assert not is_recently_verified(link)
+
+    @pytest.mark.asyncio
+    async def test_mark_verified(self, session):
+        link = HtbDiscordLink(discord_user_id=1, last_verified_at=None)
+        with mock.patch("src.helpers.links.AsyncSessionLocal", session):
+            await mark_htb_discord_link_verified(link)
+
+        assert is_recently_verified(link)
+        async with session() as db_session:
+            db_session.execute.assert_awaited_once()
+            db_session.commit.assert_awaited_once()
+
+
+class TestLinkedUserIndex:
+
+    def test_not_loaded(self):
+        index = LinkedUserIndex()
+        assert not index.loaded
+        assert 1 not in index
+
+    def test_load(self):
+        index = LinkedUserIndex()
+        index.load([3, 1, 2, 2])
+        assert index.loaded
+        assert len(index) == 3
+        assert all(id_ in index for id_ in (1, 2, 3))
+        assert 4 not in index
+
+    def test_add_and_discard(self):
+        index = LinkedUserIndex()
+        index.load([1, 2])
+        index.add(3)
+        index.discard(1)
+        assert 3 in index
+        assert 1 not in index
+        assert len(index) == 2
+
+    def test_merge(self):
+        index = LinkedUserIndex(merge_threshold=2)
+        index.load([1, 5])
+        index.add(3)
+        index.discard(5)
+        assert list(index._ids) == [1, 3]
+        assert 3 in index
+        assert 5 not in index
+
+    def test_changes_while_loading_are_kept(self):
+        index = LinkedUserIndex()
+        index.add(10)
+        index.discard(1)
+        index.load([1, 2])
+        assert 10 in index
+        assert 1 not in index
+        assert 2 in index
@@ -0,0 +1,130 @@
+import asyncio
+import logging
+from unittest import mock
+
+import pytest
+from prometheus_client import REGISTRY
+
+from src.helpers.rate_limit import (
+    MEMBER_ROLE_ROUTE, RateLimitLogCounter, RouteLimiter, TokenBucket, add_roles, edit_member
+)
+from src.helpers.verification_queue import Priority, VerificationQueue
+from tests import helpers
+
+
+class TestTokenBucket:
+
+    @pytest.mark.asyncio
+    async def test_burst_is_not_delayed(self):
+        bucket = TokenBucket("test_burst", rate=3, per=10)
+
+        with mock.patch("src.helpers.rate_limit.asyncio.sleep") as sleep:
+            for _ in range(3):
+                await bucket.acquire()
+
+        sleep.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_waits_for_refill_over_budget(self):
+        now = 100.0
+
+        async def sleep(delay):
+            nonlocal now
+            now += delay
+
+        with (
+            mock.patch("src.helpers.rate_limit.time.monotonic", side_effect=lambda: now),
+            mock.patch("src.helpers.rate_limit.asyncio.sleep", side_effect=sleep) as sleep_mock,
+        ):
+            bucket = TokenBucket("test_refill", rate=2, per=10)
+            await bucket.acquire(2)
+            await bucket.acquire()
+
+        # One token refills every 5 seconds.
+        sleep_mock.assert_awaited_once_with(5)
+        delayed = REGISTRY.get_sample_value("discord_rate_limit_delayed_total", {"route": "test_refill"})
+        assert delayed == 1
+
+    @pytest.mark.asyncio
+    async def test_waiters_are_served_by_priority(self):
+        bucket = TokenBucket("test_priority", rate=1, per=0.01)
+        await bucket.acquire()
+        served = []
+
+        async def acquire(name, priority):
+            await bucket.acquire(priority=priority)
+            served.append(name)
+
+        tasks = [
+            asyncio.create_task(acquire("sweep", Priority.SWEEP)),
+            asyncio.create_task(acquire("low", Priority.LOW)),
+        ]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(acquire("identify", Priority.HIGH)))
+        await asyncio.gather(*tasks)
+
+        assert served == ["identify", "low", "sweep"]
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_hands_over(self):
+        bucket = TokenBucket("test_cancel", rate=1, per=0.01)
+        await bucket.acquire()
+
+        first = asyncio.create_task(bucket.acquire())
+        second = asyncio.create_task(bucket.acquire(priority=Priority.LOW))
+        await asyncio.sleep(0)
+        first.cancel()
+
+        await asyncio.wait_for(second, timeout=1)
+        assert not bucket._waiters
+
+
+class TestRouteLimiter:
+
+    def test_buckets_are_per_guild(self):
+        limiter = RouteLimiter({MEMBER_ROLE_ROUTE: (5, 10)})
+        assert limiter.bucket(MEMBER_ROLE_ROUTE, 1) is limiter.bucket(MEMBER_ROLE_ROUTE, 1)
+        assert limiter.bucket(MEMBER_ROLE_ROUTE, 1) is not limiter.bucket(MEMBER_ROLE_ROUTE, 2)
+
+    @pytest.mark.asyncio
+    async def test_queued_jobs_wait_by_their_lane(self):
+        member = helpers.MockMember()
+        member.guild = helpers.MockGuild()
+        limiter = mock.Mock(spec=RouteLimiter)
+        queue = VerificationQueue(workers=1)
+
+        with mock.patch("src.helpers.rate_limit.member_limiter", limiter):
+            await queue.submit(member.id, lambda: edit_member(member, nick="a"), Priority.SWEEP)
+            await edit_member(member, nick="b")
+        await queue.stop()
+
+        priorities = [call.kwargs["priority"] for call in limiter.acquire.await_args_list]
+        assert priorities == [Priority.SWEEP, Priority.HIGH]
+
+    @pytest.mark.asyncio
+    async def test_add_roles_spends_a_token_per_role(self):
+        member = helpers.MockMember()
+        member.guild = helpers.MockGuild()
+        roles = [helpers.MockRole(id=1), helpers.MockRole(id=2)]
+        limiter = RouteLimiter({MEMBER_ROLE_ROUTE: (5, 10)})
+
+        with mock.patch("src.helpers.rate_limit.member_limiter", limiter):
+            await add_roles(member, *roles, reason="test")
+
+        member.add_roles.assert_awaited_once_with(*roles, reason="test")
+        assert limiter.bucket(MEMBER_ROLE_ROUTE, member.guild.id)._tokens == pytest.approx(3, abs=0.01)
+
+
+class TestRateLimitLogCounter:
+
+    def test_counts_rate_limit_records(self):
+        path = "/guilds/{guild_id}/members/{user_id}"
+        before = REGISTRY.get_sample_value("discord_rate_limits_received_total", {"path": path}) or 0
+        record = logging.LogRecord(
+            "discord.http", logging.WARNING, __file__, 1,
+            'We are being rate limited. Retrying in %.2f seconds. Handled under the bucket "%s"',
+            (1.5, f"None:1:{path}"), None,
+        )
+
+        assert RateLimitLogCounter().filter(record)
+        assert REGISTRY.get_sample_value("discord_rate_limits_received_total", {"path": path}) == before + 1
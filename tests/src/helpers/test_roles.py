@@ -0,0 +1,70 @@
+import pytest
+from discord import Forbidden
+
+from src.helpers.roles import reconcile_roles
+from tests import helpers
+
+
+class MockResponse:
+    def __init__(self, status, reason):
+        self.status = status
+        self.reason = reason
+
+
+class TestReconcileRoles:
+
+    @staticmethod
+    def _role_ids(roles) -> set[int]:
+        # The mocked @everyone role has ID 0 rather than the guild ID.
+        return {role.id for role in roles} - {0}
+
+    @pytest.mark.asyncio
+    async def test_no_change(self):
+        role = helpers.MockRole(id=1)
+        member = helpers.MockMember(roles=[role], nick="nick")
+
+        assert not await reconcile_roles(member, add=[role], nick="nick")
+        member.edit.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_add_and_remove_in_one_edit(self):
+        kept, removed, added = helpers.MockRole(id=1), helpers.MockRole(id=2), helpers.MockRole(id=3)
+        member = helpers.MockMember(roles=[kept, removed])
+
+        assert await reconcile_roles(member, add=[added, None], remove=[removed, None])
+        member.edit.assert_awaited_once()
+        assert self._role_ids(member.edit.await_args.kwargs["roles"]) == {1, 3}
+
+    @pytest.mark.asyncio
+    async def test_role_in_add_and_remove_is_kept(self):
+        role = helpers.MockRole(id=1)
+        member = helpers.MockMember(roles=[role])
+
+        assert not await reconcile_roles(member, add=[role], remove=[role])
+        member.edit.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_nick_only(self):
+        member = helpers.MockMember(nick="old")
+
+        assert await reconcile_roles(member, nick="new")
+        member.edit.assert_awaited_once_with(nick="new", reason=None)
+
+    @pytest.mark.asyncio
+    async def test_forbidden_nick_still_edits_roles(self):
+        role = helpers.MockRole(id=1)
+        member = helpers.MockMember(nick="old")
+        member.edit.side_effect = [Forbidden(MockResponse(403, "Forbidden"), "Missing Permissions"), None]
+
+        assert await reconcile_roles(member, add=[role], nick="new")
+        assert member.edit.await_count == 2
+        assert "nick" not in member.edit.await_args.kwargs
+        assert self._role_ids(member.edit.await_args.kwargs["roles"]) == {1}
+
+    @pytest.mark.asyncio
+    async def test_forbidden_nick_only_is_not_raised(self):
+        member = helpers.MockMember(nick="old")
+        member.edit.side_effect = Forbidden(MockResponse(403, "Forbidden"), "Missing Permissions")
+
+        assert not await reconcile_roles(member, nick="new")
+        member.edit.assert_awaited_once_with(nick="new", reason=None)
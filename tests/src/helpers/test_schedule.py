@@ -0,0 +1,134 @@
+import asyncio
+from datetime import datetime, timedelta
+from unittest import mock
+
+import pytest
+
+from src.helpers.schedule import JobRegistry, JobState, TimerService
+
+
+class TestTimerService:
+
+    @pytest.mark.asyncio
+    async def test_runs_jobs_in_deadline_order(self):
+        timers = TimerService()
+        ran = []
+        now = datetime.now()
+
+        for key, delay in (("late", 0.03), ("early", 0.01), ("past", -60)):
+            job = mock.AsyncMock(side_effect=lambda k=key: ran.append(k))
+            timers.schedule(key, now + timedelta(seconds=delay), job)
+        assert len(timers) == 3
+
+        await asyncio.sleep(0.1)
+        assert ran == ["past", "early", "late"]
+        assert len(timers) == 0
+        await timers.stop()
+
+    @pytest.mark.asyncio
+    async def test_cancelled_job_does_not_run(self):
+        timers = TimerService()
+        job = mock.AsyncMock()
+
+        timers.schedule(("unban", 1), datetime.now() + timedelta(seconds=0.01), job)
+        assert timers.cancel(("unban", 1))
+        assert not timers.cancel(("unban", 1))
+
+        await asyncio.sleep(0.05)
+        job.assert_not_awaited()
+        assert timers.next_deadline() is None
+        await timers.stop()
+
+    @pytest.mark.asyncio
+    async def test_rescheduling_a_key_replaces_its_job(self):
+        timers = TimerService()
+        first, second = mock.AsyncMock(), mock.AsyncMock()
+        later = datetime.now() + timedelta(hours=1)
+
+        timers.schedule(("unmute", 1), datetime.now() + timedelta(seconds=0.01), first)
+        timers.schedule(("unmute", 1), later, second)
+
+        await asyncio.sleep(0.05)
+        first.assert_not_awaited()
+        assert ("unmute", 1) in timers
+        assert timers.next_deadline() == datetime.fromtimestamp(later.timestamp())
+        await timers.stop()
+
+    @pytest.mark.asyncio
+    async def test_failing_job_does_not_stop_the_service(self):
+        timers = TimerService()
+        job = mock.AsyncMock()
+
+        timers.schedule("failing", datetime.now(), mock.AsyncMock(side_effect=RuntimeError()))
+        timers.schedule("next", datetime.now() + timedelta(seconds=0.01), job)
+
+        await asyncio.sleep(0.05)
+        job.assert_awaited_once()
+        await timers.stop()
+
+
+class TestJobRegistry:
+
+    @pytest.mark.asyncio
+    async def test_scheduling_is_idempotent(self):
+        registry = JobRegistry(TimerService(), retention=60, max_size=10)
+        first, second = mock.AsyncMock(), mock.AsyncMock()
+        run_at = datetime.now() + timedelta(seconds=0.01)
+
+        assert registry.schedule("unban", 1, run_at, first)
+        assert not registry.schedule("unban", 1, run_at, second)
+        assert registry.state("unban", 1) is JobState.PENDING
+
+        await asyncio.sleep(0.05)
+        first.assert_awaited_once()
+        second.assert_not_awaited()
+        assert registry.state("unban", 1) is JobState.DONE
+        # A later pass finding the record again does not run it twice.
+        assert not registry.schedule("unban", 1, run_at, second)
+        await registry.timers.stop()
+
+    @pytest.mark.asyncio
+    async def test_running_job_is_not_replaced(self):
+        registry = JobRegistry(TimerService(), retention=60, max_size=10)
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def job():
+            started.set()
+            await release.wait()
+
+        registry.schedule("unmute", 1, datetime.now(), job)
+        await started.wait()
+        assert registry.state("unmute", 1) is JobState.RUNNING
+        assert not registry.schedule("unmute", 1, datetime.now(), mock.AsyncMock(), replace=True)
+
+        release.set()
+        await asyncio.sleep(0)
+        await registry.timers.stop()
+
+    @pytest.mark.asyncio
+    async def test_failed_job_is_retried_after_retention(self):
+        registry = JobRegistry(TimerService(), retention=60, max_size=10)
+
+        registry.schedule("unban", 1, datetime.now(), mock.AsyncMock(side_effect=RuntimeError()))
+        await asyncio.sleep(0.01)
+        assert registry.state("unban", 1) is JobState.FAILED
+        assert not registry.schedule("unban", 1, datetime.now(), mock.AsyncMock())
+
+        with mock.patch("src.helpers.cache.time.monotonic", return_value=10 ** 9):
+            assert registry.state("unban", 1) is None
+        await registry.timers.stop()
+
+    @pytest.mark.asyncio
+    async def test_replace_reschedules_pending_job(self):
+        registry = JobRegistry(TimerService(), retention=60, max_size=10)
+        first, second = mock.AsyncMock(), mock.AsyncMock()
+
+        registry.schedule("unban", 1, datetime.now() + timedelta(hours=1), first)
+        assert registry.schedule("unban", 1, datetime.now(), second, replace=True)
+
+        await asyncio.sleep(0.01)
+        first.assert_not_awaited()
+        second.assert_awaited_once()
+        assert len(registry) == 0
+        await registry.timers.stop()
@@ -0,0 +1,100 @@
+from unittest import mock
+
+import pytest
+
+from src.core import settings
+from src.helpers import season
+from src.helpers.cache import MISSING
+from src.helpers.season import (
+    refresh_current_season, season_rank_cache, set_current_season, warm_up_season_ranks,
+)
+from tests import helpers
+
+
+class AsyncRows:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for row in self.rows:
+            yield row
+
+
+class TestSeasonRankCache:
+
+    @pytest.fixture(autouse=True)
+    def reset(self):
+        season_rank_cache.clear()
+        season._current_season_id = None
+        season._roles_match_season = False
+        yield
+        season_rank_cache.clear()
+        season._current_season_id = None
+        season._roles_match_season = False
+
+    def test_same_season_keeps_cache(self):
+        set_current_season(1)
+        season_rank_cache.set(1337, "Holo")
+        set_current_season(1)
+        assert season_rank_cache.get(1337) == "Holo"
+
+    def test_season_change_flushes_cache(self):
+        set_current_season(1)
+        season_rank_cache.set(1337, "Holo")
+        set_current_season(2)
+        assert season_rank_cache.get(1337) is MISSING
+
+    @pytest.mark.asyncio
+    async def test_warm_up_from_member_roles(self, bot, session):
+        ranked = helpers.MockMember(id=1, roles=[helpers.MockRole(id=settings.roles.SEASON_RUBY)])
+        unranked = helpers.MockMember(id=2, roles=[])
+        members = {ranked.id: ranked, unranked.id: unranked}
+        guild = helpers.MockGuild()
+        guild.get_member = lambda id_: members.get(id_)
+        bot.get_guild.return_value = guild
+
+        async with session() as db_session:
+            db_session.stream.return_value = AsyncRows([(1, 101), (2, 102), (3, 103)])
+
+        season._roles_match_season = True
+        with mock.patch("src.helpers.season.AsyncSessionLocal", session):
+            warmed_up = await warm_up_season_ranks(bot)
+
+        assert warmed_up == 1
+        assert season_rank_cache.get(101) == "Ruby"
+        assert season_rank_cache.get(102) is MISSING
+        assert season_rank_cache.get(103) is MISSING
+
+    @pytest.mark.asyncio
+    async def test_restart_in_same_season_allows_warm_up(self, session):
+        async with session() as db_session:
+            db_session.scalar.return_value = 1
+
+        with (
+            mock.patch("src.helpers.season.AsyncSessionLocal", session),
+            mock.patch.object(settings, "CURRENT_SEASON_ID", 1),
+        ):
+            await refresh_current_season()
+
+        assert season._roles_match_season
+        db_session.merge.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_season_change_while_down_skips_warm_up(self, bot, session):
+        async with session() as db_session:
+            db_session.scalar.return_value = 1
+
+        with (
+            mock.patch("src.helpers.season.AsyncSessionLocal", session),
+            mock.patch.object(settings, "CURRENT_SEASON_ID", 2),
+        ):
+            await refresh_current_season()
+            assert await warm_up_season_ranks(bot) == 0
+
+        # The new season is remembered for the next restart.
+        (saved,), _ = db_session.merge.await_args
+        assert saved.id == 2
+        db_session.stream.assert_not_called()
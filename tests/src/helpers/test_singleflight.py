@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from src.helpers.singleflight import SingleFlight
+
+
+class TestSingleFlight:
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_are_coalesced(self):
+        flights = SingleFlight("test")
+        calls = 0
+
+        async def fn():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return calls
+
+        results = await asyncio.gather(*(flights.do("key", fn) for _ in range(5)))
+        assert results == [1] * 5
+        assert calls == 1
+        assert len(flights) == 0
+
+    @pytest.mark.asyncio
+    async def test_different_keys_run_separately(self):
+        flights = SingleFlight("test")
+
+        async def fn(value):
+            await asyncio.sleep(0)
+            return value
+
+        results = await asyncio.gather(flights.do("a", lambda: fn(1)), flights.do("b", lambda: fn(2)))
+        assert results == [1, 2]
+
+    @pytest.mark.asyncio
+    async def test_sequential_calls_are_not_coalesced(self):
+        flights = SingleFlight("test")
+        calls = 0
+
+        async def fn():
+            nonlocal calls
+            calls += 1
+
+        await flights.do("key", fn)
+        await flights.do("key", fn)
+        assert calls == 2
+
+    @pytest.mark.asyncio
+    async def test_exception_is_shared(self):
+        flights = SingleFlight("test")
+
+        async def fn():
+            await asyncio.sleep(0)
+            raise ValueError("failed")
+
+        results = await asyncio.gather(flights.do("key", fn), flights.do("key", fn), return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+        assert len(flights) == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_others(self):
+        flights = SingleFlight("test")
+
+        async def fn():
+            await asyncio.sleep(0.01)
+            return "done"
+
+        first = asyncio.ensure_future(flights.do("key", fn))
+        second = asyncio.ensure_future(flights.do("key", fn))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await second == "done"
@@ -0,0 +1,128 @@
+from unittest import mock
+
+import pytest
+import pytest_asyncio
+
+from src.database.models import HtbDiscordLink, ReverificationSweep
+from src.helpers.sweep import ReverificationSweeper, SweepAlreadyRunningError
+from src.helpers.verification_queue import VerificationQueue
+
+
+def make_links(*ids: int) -> list[HtbDiscordLink]:
+    return [
+        HtbDiscordLink(id=id_, account_identifier="a" * 60, discord_user_id=id_, htb_user_id=id_) for id_ in ids
+    ]
+
+
+class TestReverificationSweeper:
+
+    @pytest_asyncio.fixture
+    async def queue(self):
+        queue = VerificationQueue(workers=2)
+        with mock.patch("src.helpers.sweep.verification_queue", queue):
+            yield queue
+        await queue.stop()
+
+    @staticmethod
+    def make_sweep(**kwargs) -> ReverificationSweep:
+        values = dict(id=1, moderator_id=1, last_link_id=0, processed=0, failed=0, total=5, cancelled=False)
+        return ReverificationSweep(**(values | kwargs))
+
+    @pytest.mark.asyncio
+    async def test_sweep_checkpoints_each_chunk(self, bot, session, queue):
+        sweeper = ReverificationSweeper(bot, rate=1000, chunk_size=2)
+        sweep = self.make_sweep()
+        fetch_chunk = mock.AsyncMock(side_effect=[make_links(1, 2), make_links(3, 4), make_links(5), []])
+
+        with (
+            mock.patch("src.helpers.sweep.AsyncSessionLocal", session),
+            mock.patch.object(sweeper, "_fetch_chunk", fetch_chunk),
+            mock.patch.object(sweeper, "_verify_link", mock.AsyncMock(side_effect=lambda link: link.id != 3)),
+        ):
+            sweeper._launch(sweep)
+            await sweeper._task
+
+        assert [call.args[0] for call in fetch_chunk.await_args_list] == [0, 2, 4, 5]
+        assert sweep.last_link_id == 5
+        assert sweep.processed == 5
+        assert sweep.failed == 1
+        assert sweep.finished_at is not None
+        assert not sweep.cancelled
+
+    @pytest.mark.asyncio
+    async def test_sweep_resumes_after_checkpoint(self, bot, session, queue):
+        sweeper = ReverificationSweeper(bot, rate=1000, chunk_size=2)
+        sweep = self.make_sweep(last_link_id=4, processed=4)
+        async with session() as db_session:
+            db_session.scalars.return_value = mock.MagicMock()
+            db_session.scalars.return_value.first.return_value = sweep
+        fetch_chunk = mock.AsyncMock(side_effect=[make_links(5), []])
+
+        with (
+            mock.patch("src.helpers.sweep.AsyncSessionLocal", session),
+            mock.patch.object(sweeper, "_fetch_chunk", fetch_chunk),
+            mock.patch.object(sweeper, "_verify_link", mock.AsyncMock(return_value=True)),
+        ):
+            assert await sweeper.resume() is sweep
+            await sweeper._task
+
+        assert fetch_chunk.await_args_list[0].args[0] == 4
+        assert sweep.processed == 5
+
+    @pytest.mark.asyncio
+    async def test_stop_marks_sweep_cancelled(self, bot, session, queue):
+        sweeper = ReverificationSweeper(bot, rate=0.001, chunk_size=2)
+        sweep = self.make_sweep()
+
+        with (
+            mock.patch("src.helpers.sweep.AsyncSessionLocal", session),
+            mock.patch.object(sweeper, "_fetch_chunk", mock.AsyncMock(return_value=make_links(1, 2))),
+            mock.patch.object(sweeper, "_verify_link", mock.AsyncMock(return_value=True)),
+        ):
+            sweeper._launch(sweep)
+            assert sweeper.running
+            assert await sweeper.stop() is sweep
+
+        assert not sweeper.running
+        assert sweep.cancelled
+        assert sweep.finished_at is not None
+        assert sweep.processed == 0
+
+    @pytest.mark.asyncio
+    async def test_start_while_running_raises(self, bot, session, queue):
+        sweeper = ReverificationSweeper(bot, rate=0.001, chunk_size=2)
+        sweep = self.make_sweep()
+
+        with (
+            mock.patch("src.helpers.sweep.AsyncSessionLocal", session),
+            mock.patch.object(sweeper, "_fetch_chunk", mock.AsyncMock(return_value=make_links(1, 2))),
+            mock.patch.object(sweeper, "_verify_link", mock.AsyncMock(return_value=True)),
+        ):
+            sweeper._launch(sweep)
+            with pytest.raises(SweepAlreadyRunningError) as exc_info:
+                await sweeper.start(moderator_id=1)
+            await sweeper.stop()
+
+        assert exc_info.value.sweep is sweep
+
+    @pytest.mark.asyncio
+    async def test_crashed_sweep_is_marked_failed(self, bot, session, queue):
+        sweeper = ReverificationSweeper(bot, rate=1000, chunk_size=2)
+        sweep = self.make_sweep()
+
+        with (
+            mock.patch("src.helpers.sweep.AsyncSessionLocal", session),
+            mock.patch.object(sweeper, "_fetch_chunk", mock.AsyncMock(side_effect=RuntimeError("database gone"))),
+        ):
+            sweeper._launch(sweep)
+            with pytest.raises(RuntimeError):
+                await sweeper._task
+            await sweeper._failure
+
+        assert not sweeper.running
+        assert sweep.error == "database gone"
+        assert sweep.finished_at is not None
+        assert not sweep.cancelled
+
+    def test_eta_is_none_when_idle(self, bot):
+        assert ReverificationSweeper(bot).eta() is None
@@ -0,0 +1,67 @@
+from unittest import mock
+
+from src.helpers.throttle import JoinFloodDetector, ListenerCooldown
+
+
+class TestListenerCooldown:
+
+    def test_allows_rate_per_window(self):
+        cooldown = ListenerCooldown("test", rate=2, per=60, max_size=10)
+        with mock.patch("src.helpers.throttle.time.monotonic", return_value=100):
+            assert cooldown.is_allowed(1)
+            assert cooldown.is_allowed(1)
+            assert not cooldown.is_allowed(1)
+            assert cooldown.is_allowed(2)
+
+    def test_window_resets(self):
+        cooldown = ListenerCooldown("test", rate=1, per=60, max_size=10)
+        with mock.patch("src.helpers.throttle.time.monotonic", return_value=100):
+            assert cooldown.is_allowed(1)
+            assert not cooldown.is_allowed(1)
+        with mock.patch("src.helpers.throttle.time.monotonic", return_value=160):
+            assert cooldown.is_allowed(1)
+
+    def test_buckets_are_bounded(self):
+        cooldown = ListenerCooldown("test", rate=1, per=60, max_size=2)
+        for key in range(5):
+            cooldown.is_allowed(key)
+        assert len(cooldown) == 2
+        # The oldest bucket was evicted, so its next event is allowed again.
+        assert cooldown.is_allowed(0)
+        assert not cooldown.is_allowed(4)
+
+    def test_reset(self):
+        cooldown = ListenerCooldown("test", rate=1, per=60, max_size=10)
+        assert cooldown.is_allowed(1)
+        cooldown.reset(1)
+        assert cooldown.is_allowed(1)
+
+
+class TestJoinFloodDetector:
+
+    def test_flood_starts_at_threshold(self):
+        detector = JoinFloodDetector(threshold=3, window=60)
+        with mock.patch("src.helpers.throttle.time.monotonic", return_value=100):
+            assert not detector.record()
+            assert not detector.record()
+            assert detector.record()
+            assert detector.record()
+        # The joins that started the flood are counted too.
+        assert detector.joins == 4
+
+    def test_joins_outside_window_do_not_count(self):
+        detector = JoinFloodDetector(threshold=3, window=60)
+        for now in (100, 140, 180, 220):
+            with mock.patch("src.helpers.throttle.time.monotonic", return_value=now):
+                assert not detector.record()
+
+    def test_flood_ends_below_half_threshold(self):
+        detector = JoinFloodDetector(threshold=4, window=60)
+        for now in (100, 110, 120, 130):
+            with mock.patch("src.helpers.throttle.time.monotonic", return_value=now):
+                detector.record()
+        # Two joins are still within the window, which is not below half the threshold.
+        with mock.patch("src.helpers.throttle.time.monotonic", return_value=175):
+            assert detector.is_flooding()
+        with mock.patch("src.helpers.throttle.time.monotonic", return_value=185):
+            assert not detector.is_flooding()
@@ -0,0 +1,77 @@
+import asyncio
+import logging
+from unittest import mock
+
+import pytest
+from prometheus_client import REGISTRY
+
+from src.helpers.circuit_breaker import CircuitOpenError
+from src.helpers.tracing import stage, trace_verification
+
+
+def observations(stage_name: str, outcome: str) -> float:
+    labels = {"stage": stage_name, "outcome": outcome}
+    return REGISTRY.get_sample_value("verification_stage_seconds_count", labels) or 0
+
+
+class TestStage:
+
+    def test_stage_is_observed_with_outcome(self):
+        before = observations("test_outcome", "cached")
+
+        with stage("test_outcome") as current:
+            current.outcome = "cached"
+
+        assert observations("test_outcome", "cached") == before + 1
+
+    @pytest.mark.parametrize(
+        "exc, outcome", [
+            (asyncio.TimeoutError(), "timeout"),
+            (CircuitOpenError("htb_api_identifier", 5), "circuit_open"),
+            (ValueError(), "error"),
+        ]
+    )
+    def test_failed_stage_is_labelled_by_exception(self, exc, outcome):
+        before = observations("test_failure", outcome)
+
+        with pytest.raises(type(exc)):
+            with stage("test_failure"):
+                raise exc
+
+        assert observations("test_failure", outcome) == before + 1
+
+
+class TestTraceVerification:
+
+    @pytest.mark.asyncio
+    async def test_sampled_trace_logs_breakdown(self, caplog):
+        caplog.set_level(logging.DEBUG, logger="src.helpers.tracing")
+
+        async def fetch():
+            with stage("user_details"):
+                await asyncio.sleep(0)
+
+        with mock.patch("src.helpers.tracing.settings.VERIFICATION_TRACE_SAMPLE_RATE", 1):
+            with trace_verification("reverification", 1):
+                # Stages of tasks started by the verification belong to its trace.
+                await asyncio.gather(fetch(), asyncio.create_task(fetch()))
+                with trace_verification("identification", 1):
+                    with stage("member_edit") as current:
+                        current.outcome = "unchanged"
+
+        records = [record for record in caplog.records if record.name == "src.helpers.tracing"]
+        assert len(records) == 1
+        assert records[0].getMessage().startswith("Reverification of 1 took")
+        assert [(name, outcome) for name, _, outcome in records[0].stages] == [
+            ("user_details", "ok"), ("user_details", "ok"), ("member_edit", "unchanged"),
+        ]
+
+    def test_unsampled_trace_logs_nothing(self, caplog):
+        caplog.set_level(logging.DEBUG, logger="src.helpers.tracing")
+
+        with mock.patch("src.helpers.tracing.settings.VERIFICATION_TRACE_SAMPLE_RATE", 0):
+            with trace_verification("reverification", 1):
+                with stage("user_details"):
+                    pass
+
+        assert not [record for record in caplog.records if record.name == "src.helpers.tracing"]
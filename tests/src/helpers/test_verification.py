@@ -1,14 +1,30 @@
+import asyncio
 import unittest
+from unittest import mock
 
 import aioresponses
 import pytest
+from aiohttp import ClientError
+from discord.ext.commands import GuildNotFound
+from yarl import URL
 
 from src.core import settings
-from src.helpers.verification import get_user_details
+from src.helpers.htb_api import htb_api
+from src.helpers.verification import (
+    get_user_details, invalidate_user_details, process_identification, user_details_cache
+)
+from tests import helpers
 
 
 class TestGetUserDetails(unittest.IsolatedAsyncioTestCase):
 
+    def setUp(self):
+        user_details_cache.clear()
+
+    async def asyncTearDown(self):
+        # Each test runs in its own event loop, so the session opened by the shared client is closed with it.
+        await htb_api.close()
+
     @pytest.mark.asyncio
     async def test_get_user_details_success(self):
         account_identifier = "some_identifier"
@@ -48,3 +64,199 @@ class TestGetUserDetails(unittest.IsolatedAsyncioTestCase):
 
             result = await get_user_details(account_identifier)
             self.assertIsNone(result)
+
+    @pytest.mark.asyncio
+    async def test_get_user_details_cached(self):
+        account_identifier = "some_identifier"
+
+        with aioresponses.aioresponses() as m:
+            m.get(
+                f"{settings.API_URL}/discord/identifier/{account_identifier}?secret={settings.HTB_API_SECRET}",
+                status=200,
+                payload={"some_key": "some_value"},
+            )
+
+            await get_user_details(account_identifier)
+            result = await get_user_details(account_identifier)
+            self.assertEqual(result, {"some_key": "some_value"})
+            url = f"{settings.API_URL}/discord/identifier/{account_identifier}?secret={settings.HTB_API_SECRET}"
+            self.assertEqual(len(m.requests[("GET", URL(url))]), 1)
+
+    @pytest.mark.asyncio
+    async def test_get_user_details_404_cached(self):
+        account_identifier = "some_identifier"
+
+        with aioresponses.aioresponses() as m:
+            m.get(
+                f"{settings.API_URL}/discord/identifier/{account_identifier}?secret={settings.HTB_API_SECRET}",
+                status=404,
+            )
+
+            await get_user_details(account_identifier)
+            result = await get_user_details(account_identifier)
+            self.assertIsNone(result)
+            url = f"{settings.API_URL}/discord/identifier/{account_identifier}?secret={settings.HTB_API_SECRET}"
+            self.assertEqual(len(m.requests[("GET", URL(url))]), 1)
+
+    @pytest.mark.asyncio
+    async def test_get_user_details_error_not_cached(self):
+        account_identifier = "some_identifier"
+
+        with aioresponses.aioresponses() as m:
+            m.get(
+                f"{settings.API_URL}/discord/identifier/{account_identifier}?secret={settings.HTB_API_SECRET}",
+                status=500,
+            )
+            m.get(
+                f"{settings.API_URL}/discord/identifier/{account_identifier}?secret={settings.HTB_API_SECRET}",
+                status=200,
+                payload={"some_key": "some_value"},
+            )
+
+            self.assertIsNone(await get_user_details(account_identifier))
+            result = await get_user_details(account_identifier)
+            self.assertEqual(result, {"some_key": "some_value"})
+
+    @pytest.mark.asyncio
+    async def test_invalidate_user_details(self):
+        account_identifier = "some_identifier"
+
+        with aioresponses.aioresponses() as m:
+            m.get(
+                f"{settings.API_URL}/discord/identifier/{account_identifier}?secret={settings.HTB_API_SECRET}",
+                status=404,
+            )
+            m.get(
+                f"{settings.API_URL}/discord/identifier/{account_identifier}?secret={settings.HTB_API_SECRET}",
+                status=200,
+                payload={"some_key": "some_value"},
+            )
+
+            self.assertIsNone(await get_user_details(account_identifier))
+            invalidate_user_details(account_identifier)
+            result = await get_user_details(account_identifier)
+            self.assertEqual(result, {"some_key": "some_value"})
+
+
+class TestProcessIdentification:
+
+    @staticmethod
+    def _htb_user_details(**kwargs) -> dict:
+        details = {
+            "user_id": 1337, "user_name": "member", "rank": "Hacker", "vip": False, "dedivip": False,
+            "hof_position": "unranked", "machines": 0, "challenges": 0,
+        }
+        details.update(kwargs)
+        return details
+
+    @staticmethod
+    def _member_with_roles(*role_ids: int) -> helpers.MockMember:
+        roles = {role_id: helpers.MockRole(id=role_id) for role_id in (
+            settings.roles.HACKER, settings.roles.SEASON_RUBY, settings.roles.SEASON_HOLO, *role_ids
+        )}
+        guild = helpers.MockGuild()
+        guild.get_role = lambda role_id: roles.get(role_id)
+        member = helpers.MockMember(roles=[roles[role_id] for role_id in role_ids], nick="member")
+        member.guild = guild
+        return member
+
+    @pytest.mark.asyncio
+    async def test_fetches_run_concurrently(self, bot):
+        member = self._member_with_roles()
+        started = []
+
+        async def fetch(htb_uid):
+            started.append(htb_uid)
+            await asyncio.sleep(0)
+            # Both fetches must have started before either completes.
+            assert len(started) == 2
+
+        with (
+            mock.patch("src.helpers.verification.get_season_rank", side_effect=fetch),
+            mock.patch("src.helpers.verification._check_for_ban", side_effect=fetch),
+        ):
+            await process_identification(self._htb_user_details(), user=member, bot=bot)
+
+    @pytest.mark.asyncio
+    async def test_season_failure_keeps_season_role(self, bot):
+        member = self._member_with_roles(settings.roles.SEASON_RUBY)
+
+        with (
+            mock.patch("src.helpers.verification.get_season_rank", side_effect=ClientError()),
+            mock.patch("src.helpers.verification._check_for_ban", return_value={"banned": False}),
+        ):
+            to_assign = await process_identification(self._htb_user_details(), user=member, bot=bot)
+
+        assert [role.id for role in to_assign] == [settings.roles.HACKER]
+        edited = {role.id for role in member.edit.await_args.kwargs["roles"]}
+        assert edited - {0} == {settings.roles.HACKER, settings.roles.SEASON_RUBY}
+
+    @pytest.mark.asyncio
+    async def test_season_rank_replaces_season_role(self, bot):
+        member = self._member_with_roles(settings.roles.SEASON_RUBY)
+
+        with (
+            mock.patch("src.helpers.verification.get_season_rank", return_value="Holo"),
+            mock.patch("src.helpers.verification._check_for_ban", return_value={"banned": False}),
+        ):
+            to_assign = await process_identification(self._htb_user_details(), user=member, bot=bot)
+
+        assert {role.id for role in to_assign} == {settings.roles.HACKER, settings.roles.SEASON_HOLO}
+        edited = {role.id for role in member.edit.await_args.kwargs["roles"]}
+        assert edited - {0} == {settings.roles.HACKER, settings.roles.SEASON_HOLO}
+
+    @pytest.mark.asyncio
+    async def test_no_edit_when_roles_are_up_to_date(self, bot):
+        member = self._member_with_roles(settings.roles.HACKER, settings.roles.SEASON_RUBY)
+
+        with (
+            mock.patch("src.helpers.verification.get_season_rank", return_value="Ruby"),
+            mock.patch("src.helpers.verification._check_for_ban", return_value={"banned": False}),
+        ):
+            await process_identification(self._htb_user_details(), user=member, bot=bot)
+
+        member.edit.assert_not_awaited()
+        member.add_roles.assert_not_awaited()
+        member.remove_roles.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_ban_check_timeout_does_not_abort(self, bot):
+        member = self._member_with_roles()
+
+        async def slow_ban_check(htb_uid):
+            await asyncio.sleep(1)
+
+        with (
+            mock.patch("src.helpers.verification.get_season_rank", return_value=None),
+            mock.patch("src.helpers.verification._check_for_ban", side_effect=slow_ban_check),
+            mock.patch.object(settings, "HTB_BAN_CHECK_TIMEOUT", 0.01),
+        ):
+            to_assign = await process_identification(self._htb_user_details(), user=member, bot=bot)
+
+        assert [role.id for role in to_assign] == [settings.roles.HACKER]
+
+    @pytest.mark.asyncio
+    async def test_missing_user_raises_guild_not_found(self, bot):
+        with pytest.raises(GuildNotFound):
+            await process_identification(self._htb_user_details(), user=None, bot=bot)
+
+    @pytest.mark.asyncio
+    async def test_other_account_is_not_coalesced(self, bot):
+        member = self._member_with_roles()
+        fetched = []
+
+        async def fetch(htb_uid):
+            fetched.append(htb_uid)
+            await asyncio.sleep(0)
+
+        with (
+            mock.patch("src.helpers.verification.get_season_rank", side_effect=fetch),
+            mock.patch("src.helpers.verification._check_for_ban", return_value={"banned": False}),
+        ):
+            await asyncio.gather(
+                process_identification(self._htb_user_details(), user=member, bot=bot),
+                process_identification(self._htb_user_details(), user=member, bot=bot),
+                process_identification(self._htb_user_details(user_id=42), user=member, bot=bot),
+            )
+
+        assert sorted(fetched) == [42, 1337]
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from src.helpers.verification_queue import Priority, VerificationQueue
+
+
+class TestVerificationQueue:
+
+    @pytest.mark.asyncio
+    async def test_jobs_run_by_priority(self):
+        queue = VerificationQueue(workers=1)
+        order = []
+        gate = asyncio.Event()
+
+        async def block():
+            await gate.wait()
+
+        async def record(name):
+            order.append(name)
+
+        blocker = queue.submit("blocker", block, Priority.LOW)
+        await asyncio.sleep(0)  # Let the worker pick up the blocker.
+        futures = [
+            queue.submit("low", lambda: record("low"), Priority.LOW),
+            queue.submit("normal", lambda: record("normal"), Priority.NORMAL),
+            queue.submit("high", lambda: record("high"), Priority.HIGH),
+        ]
+        gate.set()
+        await asyncio.gather(blocker, *futures)
+        await queue.stop()
+
+        assert order == ["high", "normal", "low"]
+
+    @pytest.mark.asyncio
+    async def test_queued_key_is_deduplicated(self):
+        queue = VerificationQueue(workers=1)
+        calls = 0
+
+        async def fn():
+            nonlocal calls
+            calls += 1
+            return calls
+
+        first = queue.submit(1, fn, Priority.LOW)
+        second = queue.submit(1, fn, Priority.LOW)
+        assert first is second
+        assert len(queue) == 1
+
+        assert await first == 1
+        assert calls == 1
+        await queue.stop()
+
+    @pytest.mark.asyncio
+    async def test_higher_priority_replaces_queued_job(self):
+        queue = VerificationQueue(workers=1)
+
+        async def fn(value):
+            return value
+
+        low = queue.submit(1, lambda: fn("low"), Priority.LOW)
+        high = queue.submit(1, lambda: fn("high"), Priority.HIGH)
+        assert low is high
+
+        assert await low == "high"
+        assert len(queue) == 0
+        await queue.stop()
+
+    @pytest.mark.asyncio
+    async def test_exception_is_propagated(self):
+        queue = VerificationQueue(workers=1)
+
+        async def fn():
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError):
+            await queue.submit(1, fn, Priority.HIGH)
+
+        # The worker survives the failure.
+        async def ok():
+            return True
+
+        assert await queue.submit(2, ok, Priority.HIGH)
+        await queue.stop()
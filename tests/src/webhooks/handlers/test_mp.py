@@ -0,0 +1,106 @@
+from datetime import datetime
+from unittest import mock
+
+import pytest
+from fastapi import HTTPException
+
+from src.core import settings
+from src.webhooks.handlers import mp
+from src.webhooks.types import Platform, WebhookBody, WebhookEvent
+from tests import helpers
+
+
+class TestMainPlatformHandler:
+
+    @pytest.fixture
+    def guild(self, bot):
+        guild = helpers.MockGuild()
+        guild.get_role.side_effect = lambda role_id: helpers.MockRole(id=role_id) if role_id else None
+        bot.get_guild.return_value = guild
+        return guild
+
+    @pytest.fixture
+    def member(self, guild):
+        member = helpers.MockMember(id=1)
+        guild.get_member.return_value = member
+        return member
+
+    @pytest.fixture(autouse=True)
+    def patches(self):
+        with (
+            mock.patch("src.webhooks.handlers.mp.reconcile_roles", new_callable=mock.AsyncMock) as reconcile_roles,
+            mock.patch("src.webhooks.handlers.mp.get_htb_discord_link", new_callable=mock.AsyncMock, return_value=None),
+        ):
+            yield reconcile_roles
+
+    @staticmethod
+    def _body(event: WebhookEvent, **data) -> WebhookBody:
+        return WebhookBody(platform=Platform.MAIN, event=event, data={"discord_id": 1, **data})
+
+    @staticmethod
+    def _ids(roles) -> set[int]:
+        return {role.id for role in roles if role is not None}
+
+    @pytest.mark.asyncio
+    async def test_rank_up_replaces_rank_role(self, bot, guild, member, patches):
+        assert await mp.handler(self._body(WebhookEvent.RANK_UP, rank="Guru"), bot) == {"success": True}
+
+        kwargs = patches.await_args.kwargs
+        assert self._ids(kwargs["add"]) == {settings.roles.GURU}
+        assert settings.roles.PRO_HACKER in self._ids(kwargs["remove"])
+
+    @pytest.mark.asyncio
+    async def test_staff_rank_only_removes_rank_roles(self, bot, guild, member, patches):
+        await mp.handler(self._body(WebhookEvent.RANK_UP, rank="Staff"), bot)
+
+        assert self._ids(patches.await_args.kwargs["add"]) == set()
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "position, expected", [(1, {settings.roles.RANK_ONE}), (7, {settings.roles.RANK_TEN}), ("unranked", set())]
+    )
+    async def test_hof_change(self, bot, guild, member, patches, position, expected):
+        await mp.handler(self._body(WebhookEvent.HOF_CHANGE, hof_position=position), bot)
+
+        kwargs = patches.await_args.kwargs
+        assert self._ids(kwargs["add"]) == expected
+        assert self._ids(kwargs["remove"]) == {settings.roles.RANK_ONE, settings.roles.RANK_TEN}
+
+    @pytest.mark.asyncio
+    async def test_subscription_change(self, bot, guild, member, patches):
+        await mp.handler(self._body(WebhookEvent.SUBSCRIPTION_CHANGE, vip=True, dedivip=False), bot)
+
+        kwargs = patches.await_args.kwargs
+        assert self._ids(kwargs["add"]) == {settings.roles.VIP}
+        assert self._ids(kwargs["remove"]) == {settings.roles.VIP_PLUS}
+
+    @pytest.mark.asyncio
+    async def test_name_change(self, bot, guild, member, patches):
+        await mp.handler(self._body(WebhookEvent.NAME_CHANGE, user_name="new"), bot)
+
+        patches.assert_awaited_once_with(member, nick="new")
+
+    @pytest.mark.asyncio
+    async def test_unsupported_event(self, bot, guild, member):
+        with pytest.raises(HTTPException) as exc_info:
+            await mp.handler(self._body(WebhookEvent.CONTENT_RELEASED), bot)
+
+        assert exc_info.value.status_code == 501
+
+    @pytest.mark.asyncio
+    async def test_event_only_invalidates_cached_details(self, bot, guild, member, session):
+        verified_at = datetime(2024, 1, 1)
+        link = mock.Mock(account_identifier="a" * 60, last_verified_at=verified_at)
+
+        with (
+            mock.patch("src.webhooks.handlers.mp.get_htb_discord_link", new_callable=mock.AsyncMock, return_value=link),
+            mock.patch("src.webhooks.handlers.mp.invalidate_user_details") as invalidate_user_details,
+            mock.patch("src.helpers.links.AsyncSessionLocal", session),
+        ):
+            await mp.handler(self._body(WebhookEvent.NAME_CHANGE, user_name="new"), bot)
+
+        invalidate_user_details.assert_called_once_with(link.account_identifier)
+        # A partial event must not postpone the re-verification of the ban status and season rank.
+        async with session() as db_session:
+            db_session.execute.assert_not_awaited()
+        assert link.last_verified_at == verified_at
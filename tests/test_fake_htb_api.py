@@ -0,0 +1,27 @@
+import pytest
+
+from src.helpers.verification import get_season_rank, get_user_details, user_details_cache
+from tests.fake_htb_api import FakeHtbApi
+
+
+class TestFakeHtbApi:
+    """Tests for the local stand-in of the HTB API."""
+
+    def setup_method(self):
+        user_details_cache.clear()
+
+    @pytest.mark.asyncio
+    async def test_serves_user_details(self):
+        async with FakeHtbApi() as api:
+            with api.patch_settings():
+                details = await get_user_details(api.identifier(42))
+
+        assert details == FakeHtbApi.user_details(42)
+        assert api.calls["identifier"] == 1
+
+    @pytest.mark.asyncio
+    async def test_not_found_rate(self):
+        async with FakeHtbApi(not_found_rate=1) as api:
+            with api.patch_settings():
+                assert await get_user_details(api.identifier(43)) is None
+                assert await get_season_rank(43) is None